@@ -0,0 +1,49 @@
+from agents.category_identification_agent import SFNCategoryIdentificationAgent
+from agents.combined_mapping_agent import SFNCombinedMappingAgent
+from agents.column_mapping_agent import SFNColumnMappingAgent
+from agents.speculative_mapping_agent import SFNSpeculativeMappingAgent
+from utils.shared_resources import get_shared
+
+
+def get_category_agent() -> SFNCategoryIdentificationAgent:
+    """
+    Return the process-wide category identification agent, with configs refreshed if they changed.
+    """
+    agent = get_shared('category_agent', SFNCategoryIdentificationAgent)
+    agent.reload_config()
+    return agent
+
+
+def get_mapping_agent() -> SFNColumnMappingAgent:
+    """
+    Return the process-wide column mapping agent, with configs refreshed if they changed.
+    """
+    agent = get_shared('mapping_agent', SFNColumnMappingAgent)
+    agent.reload_config()
+    return agent
+
+
+def get_speculative_agent() -> SFNSpeculativeMappingAgent:
+    """
+    Return the process-wide speculative mapping agent built on the pooled agents.
+    """
+    agent = get_shared(
+        'speculative_agent',
+        lambda: SFNSpeculativeMappingAgent(category_agent=get_category_agent(), mapping_agent=get_mapping_agent())
+    )
+    agent.category_agent.reload_config()
+    agent.mapping_agent.reload_config()
+    return agent
+
+
+def get_combined_agent() -> SFNCombinedMappingAgent:
+    """
+    Return the process-wide combined category and mapping agent built on the pooled agents.
+    """
+    agent = get_shared(
+        'combined_agent',
+        lambda: SFNCombinedMappingAgent(category_agent=get_category_agent(), mapping_agent=get_mapping_agent())
+    )
+    agent.category_agent.reload_config()
+    agent.mapping_agent.reload_config()
+    return agent
@@ -1,21 +1,43 @@
-from typing import List
+import asyncio
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
 from sfn_blueprint import SFNAgent
 from sfn_blueprint import Task
-from sfn_blueprint import SFNOpenAIClient
 import os
-from sfn_blueprint import SFNPromptManager
+from config.app_config import APP_CONFIG
 from config.model_config import MODEL_CONFIG
+from utils.async_client import SFNAsyncClientProvider
+from utils.category_classifier import get_category_classifier
+from utils.column_profiler import format_profiles, get_column_profiler
+from utils.llm_cache import SFNLLMCache
+from utils.llm_router import get_llm_router
+from utils.metrics import get_metrics, record_usage
+from utils.schema_registry import get_schema_registry
+from utils.shared_resources import get_openai_client, get_prompt_manager
 
 class SFNCategoryIdentificationAgent(SFNAgent):
     def __init__(self):
         super().__init__(name="Category Identification", role="Data Categorizer")
-        self.client = SFNOpenAIClient()
+        self.client = get_openai_client()
         self.model_config = MODEL_CONFIG["category_identifier"]
         parent_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../'))
-        prompt_config_path = os.path.join(parent_path, 'config', 'prompt_config.json')
-        self.prompt_manager = SFNPromptManager(prompt_config_path)
+        self.prompt_config_path = os.path.join(parent_path, 'config', 'prompt_config.json')
+        self.cache = SFNLLMCache()
+        self.async_client = SFNAsyncClientProvider(self.client)
+        self.router = get_llm_router() if APP_CONFIG["llm_router"]["enabled"] else None
+        self.metrics = get_metrics()
+        self.profiler = get_column_profiler()
+        self.classifier = get_category_classifier()
+        self.reload_config()
         # self.prompt_manager = SFNPromptManager(prompts_config_path="config/prompt_config.json")
+
+    def reload_config(self):
+        """
+        Refresh the prompt manager and target schemas from the process-wide caches;
+        they are rebuilt only if their files changed.
+        """
+        self.prompt_manager = get_prompt_manager(self.prompt_config_path)
+        self.schemas = get_schema_registry().load()
     
     def execute_task(self, task: Task) -> str:
         """
@@ -28,20 +50,158 @@ class SFNCategoryIdentificationAgent(SFNAgent):
             raise ValueError("Task data must be a pandas DataFrame")
 
         columns = task.data.columns.tolist()
-        category = self._identify_category(columns)
+        category = self.classify(columns)
+        if category is None:
+            category = self._identify_category(columns, self._column_profiles(task.data))
         return category
 
-    def _identify_category(self, columns: List[str]) -> str:
+    async def aexecute_task(self, task: Task) -> str:
+        """
+        Async variant of execute_task; the LLM call does not block the event loop.
+        
+        :param task: Task object containing the DataFrame to be categorized
+        :return: Identified category as a string
+        """
+        if not isinstance(task.data, pd.DataFrame):
+            raise ValueError("Task data must be a pandas DataFrame")
+
+        category = self.classify(task.data.columns.tolist())
+        if category is not None:
+            return category
+        return await self.aidentify_with_llm(task.data)
+
+    async def aidentify_with_llm(self, df: pd.DataFrame) -> str:
+        """
+        Identify the category through the LLM, skipping the local classifier.
+
+        :param df: Loaded data (or a sample of it)
+        :return: Identified category as a string
+        """
+        profiles = await asyncio.to_thread(self._column_profiles, df)
+        return await self._aidentify_category(df.columns.tolist(), profiles)
+
+    def classify(self, columns: List[str]) -> Optional[str]:
+        """
+        Answer from the local classifier when it is confident; None leaves the decision to the LLM.
+
+        :param columns: List of column names in the dataset
+        :return: Category name or None
+        """
+        with self.metrics.span('category_classify'):
+            prediction = self.classifier.predict(columns)
+        self.metrics.increment('category_classifier', result='local' if prediction['confident'] else 'fallback')
+        return prediction['category'] if prediction['confident'] else None
+
+    def _column_profiles(self, df: pd.DataFrame) -> Dict:
+        # Profiles of very wide schemas would crowd out the column names in the prompt
+        if len(df.columns) > APP_CONFIG["profiling"]["max_category_columns"]:
+            return {}
+        return self.profiler.profile(df)
+
+    def _identify_category(self, columns: List[str], profiles: Optional[Dict] = None) -> str:
         """
         Identify the category of the data based on the column names.
         
         :param columns: List of column names in the dataset
+        :param profiles: Optional column profiles from SFNColumnProfiler, added to the prompt
         :return: Identified category as a string
         """
-        # Get prompts using PromptManager
-        system_prompt,user_prompt = self.prompt_manager.get_prompt(agent_type='category_identifier', llm_provider='openai', columns=columns)
+        system_prompt, user_prompt, cache_key = self._prepare_request(columns, profiles)
+        category = self.cache.get(cache_key)
+        from_cache = category is not None
+        if not from_cache:
+            if self.router is not None:
+                category = self._route_category(columns, profiles)
+            else:
+                with self.metrics.span('llm_call', **self._llm_labels()):
+                    response = self.client.chat.completions.create(**self._completion_kwargs(system_prompt, user_prompt))
+                record_usage(response.usage, **self._llm_labels())
+                category = response.choices[0].message.content.strip().lower()
+
+        normalized = self._normalize_category(category)
+        # Only answers naming a known category are cached, so a bad answer is not replayed for the whole TTL
+        if normalized != "none of these" and not from_cache:
+            self.cache.set(cache_key, category)
+        return normalized
+
+    async def _aidentify_category(self, columns: List[str], profiles: Optional[Dict] = None) -> str:
+        """
+        Async variant of _identify_category.
         
-        response = self.client.chat.completions.create(
+        :param columns: List of column names in the dataset
+        :param profiles: Optional column profiles from SFNColumnProfiler, added to the prompt
+        :return: Identified category as a string
+        """
+        system_prompt, user_prompt, cache_key = self._prepare_request(columns, profiles)
+        category = self.cache.get(cache_key)
+        from_cache = category is not None
+        if not from_cache:
+            if self.router is not None:
+                category = await asyncio.to_thread(self._route_category, columns, profiles)
+            else:
+                with self.metrics.span('llm_call', **self._llm_labels()):
+                    response = await self.async_client.get().chat.completions.create(
+                        **self._completion_kwargs(system_prompt, user_prompt)
+                    )
+                record_usage(response.usage, **self._llm_labels())
+                category = response.choices[0].message.content.strip().lower()
+
+        normalized = self._normalize_category(category)
+        if normalized != "none of these" and not from_cache:
+            self.cache.set(cache_key, category)
+        return normalized
+
+    def _route_category(self, columns: List[str], profiles: Optional[Dict] = None) -> str:
+        """
+        Identify the category through the provider router; the first answer naming a known category wins.
+        """
+        result = self.router.complete(
+            lambda llm_provider: self._render_prompt(columns, llm_provider, profiles),
+            self.model_config,
+            validate=lambda content: self._normalize_category(content.lower()) != "none of these",
+            agent_type='category_identifier'
+        )
+        return result['content'].lower()
+
+    def _render_prompt(self, columns: List[str], llm_provider: str = 'openai',
+                       profiles: Optional[Dict] = None, types_only: bool = False) -> Tuple[str, str]:
+        # Get prompts using PromptManager
+        with self.metrics.span('prompt_render', agent='category_identifier'):
+            return self.prompt_manager.get_prompt(
+                agent_type='category_identifier',
+                llm_provider=llm_provider,
+                columns=columns,
+                categories=self._format_categories(columns),
+                column_profiles=format_profiles(profiles, columns, types_only)
+            )
+
+    def _format_categories(self, columns: List[str]) -> str:
+        # Only the categories closest to the column names are offered, so the prompt does not grow with the registry
+        categories = self.schemas.rank_categories(columns, APP_CONFIG["schema_registry"]["max_prompt_categories"])
+        return ", ".join(
+            f"{category} (e.g., {self.schemas.describe(category)})" if self.schemas.describe(category) else category
+            for category in categories
+        )
+
+    def _llm_labels(self) -> Dict:
+        return {'agent': 'category_identifier', 'provider': 'openai', 'model': self.model_config["model"]}
+
+    def _prepare_request(self, columns: List[str], profiles: Optional[Dict] = None) -> Tuple[str, str, str]:
+        system_prompt, user_prompt = self._render_prompt(columns, profiles=profiles)
+        # Key on the column names and profile types only, so a recurring feed hits the cache
+        key_prompt = self._render_prompt(columns, profiles=profiles, types_only=True)[1] if profiles else user_prompt
+
+        cache_key = self.cache.make_key(
+            agent_type='category_identifier',
+            model_config=self.model_config,
+            system_prompt=system_prompt,
+            user_prompt=key_prompt,
+            prompt_version=self.prompt_manager.prompts_config.get('version')
+        )
+        return system_prompt, user_prompt, cache_key
+
+    def _completion_kwargs(self, system_prompt: str, user_prompt: str) -> Dict:
+        return dict(
             model=self.model_config["model"],
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -53,9 +213,6 @@ class SFNCategoryIdentificationAgent(SFNAgent):
             stop=self.model_config["stop"]
         )
 
-        category = response.choices[0].message.content.strip().lower()
-        return self._normalize_category(category)
-
     def _normalize_category(self, category: str) -> str:
         """
         Normalize the category returned by the OpenAI model to match expected categories.
@@ -63,10 +220,14 @@ class SFNCategoryIdentificationAgent(SFNAgent):
         :param category: Category string returned by the model
         :return: Normalized category string
         """
-        valid_categories = ["billing", "usage", "support", "other"]
-        
-        for valid_category in valid_categories:
+        # The answer is lower-cased; registry categories keep their own spelling
+        valid_categories = {name.lower(): name for name in self.schemas.categories + ["other"]}
+        if category in valid_categories:
+            return valid_categories[category]
+
+        # Longest names first, so a category whose name contains another one is not shadowed by it
+        for valid_category in sorted(valid_categories, key=len, reverse=True):
             if valid_category in category:
-                return valid_category
+                return valid_categories[valid_category]
         
         return "none of these"
\ No newline at end of file
@@ -1,34 +1,92 @@
-from typing import Dict, List
+import asyncio
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 import pandas as pd
 from sfn_blueprint import SFNAgent
-from sfn_blueprint import Task
-from sfn_blueprint import SFNOpenAIClient
+from sfn_blueprint import Task, setup_logger
 import os
 import json
-from sfn_blueprint import SFNPromptManager
-from sfn_blueprint import MODEL_CONFIG
+from config.app_config import APP_CONFIG
+from config.model_config import MODEL_CONFIG
+from utils.async_client import SFNAsyncClientProvider
+from utils.column_matcher import SFNColumnPreMatcher
+from utils.column_profiler import format_profiles, get_column_profiler
+from utils.llm_cache import SFNLLMCache
+from utils.llm_router import get_llm_router
+from utils.metrics import get_metrics, record_usage
+from utils.schema_registry import get_schema_registry
+from utils.shared_resources import get_openai_client, get_prompt_manager, get_shared
+from utils.streaming_json import SFNIncrementalMappingParser
+
+# Callback receiving each validated (standard column, input column) pair as soon as it is known
+PairCallback = Callable[[str, Optional[str]], None]
 
 class SFNColumnMappingAgent(SFNAgent):
     def __init__(self):
         super().__init__(name="Column Mapping", role="Data Mapper")
-        self.client = SFNOpenAIClient()
+        self.client = get_openai_client()
         self.model_config = MODEL_CONFIG["column_mapper"]
         parent_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../'))
-        prompt_config_path = os.path.join(parent_path, 'config', 'prompt_config.json')
-        standard_columns_path = os.path.join(parent_path, 'config', 'standard_columns_config.json')
-        self.prompt_manager = SFNPromptManager(prompt_config_path)
-        
-        # Load standard columns configuration
-        with open(standard_columns_path, 'r') as f:
-            self.standard_columns = json.load(f)
+        self.prompt_config_path = os.path.join(parent_path, 'config', 'prompt_config.json')
+        self.cache = SFNLLMCache()
+        self.async_client = SFNAsyncClientProvider(self.client)
+        self.pre_matcher = SFNColumnPreMatcher()
+        self.router = get_llm_router() if APP_CONFIG["llm_router"]["enabled"] else None
+        self.metrics = get_metrics()
+        # One logger per process; setup_logger stacks a handler on every call
+        self.logger, _ = get_shared('logger', setup_logger)
+        self.profiler = get_column_profiler()
+        self.task_context = {}
+        self.reload_config()
+
+    def reload_config(self):
+        """
+        Refresh the prompt manager and standard columns from the process-wide caches;
+        files are only re-read and the schema registry recompiled when they changed on disk.
+        """
+        self.prompt_manager = get_prompt_manager(self.prompt_config_path)
+        self.schemas = get_schema_registry().load()
+        self.standard_columns = self.schemas.standard_columns
 
     def execute_task(self, task: Task) -> Dict[str, str]:
         """
         Execute the column mapping task.
         
-        :param task: Task object containing the DataFrame and category to be mapped
+        :param task: Task object containing the DataFrame and category to be mapped; an optional
+                     'on_mapping' callback streams the completion and receives each validated pair
+                     as it arrives (always on the calling thread)
         :return: Dictionary mapping input columns to standard columns
         """
+        input_columns, category = self._validate_task(task)
+        standard_columns = self.standard_columns[category]
+        on_pair = task.data.get('on_mapping')
+        df = task.data['dataframe']
+
+        # Reuse a confirmed mapping from the registry and only map the columns that drifted
+        if task.data.get('base_mapping') is not None:
+            return self._map_delta_columns(input_columns, task.data['base_mapping'], category,
+                                           task.data.get('delta_columns'), on_pair, df)
+        
+        return self._map_columns(input_columns, standard_columns, category, on_pair, df)
+
+    async def aexecute_task(self, task: Task) -> Dict[str, str]:
+        """
+        Async variant of execute_task; the LLM call does not block the event loop.
+        
+        :param task: Task object containing the DataFrame and category to be mapped
+        :return: Dictionary mapping standard columns to input columns
+        """
+        input_columns, category = self._validate_task(task)
+
+        if task.data.get('base_mapping') is not None:
+            return await asyncio.to_thread(self.execute_task, task)
+
+        return await self._amap_columns(input_columns, self.standard_columns[category], category,
+                                        task.data['dataframe'])
+
+    def _validate_task(self, task: Task) -> Tuple[List[str], str]:
         if not isinstance(task.data, dict) or 'dataframe' not in task.data or 'category' not in task.data:
             raise ValueError("Task data must be a dictionary containing 'dataframe' and 'category' keys")
 
@@ -41,60 +99,551 @@ class SFNColumnMappingAgent(SFNAgent):
         if category not in self.standard_columns:
             raise ValueError(f"Invalid category: {category}")
 
-        input_columns = df.columns.tolist()
-        standard_columns = self.standard_columns[category]
-        
-        return self._map_columns(input_columns, standard_columns, category)
+        return df.columns.tolist(), category
 
-    def _map_columns(self, input_columns: List[str], standard_columns: List[str], category: str) -> Dict[str, str]:
+    def _map_delta_columns(self, input_columns: List[str], base_mapping: Dict[str, Optional[str]],
+                           category: str, delta_columns: Optional[List[str]] = None,
+                           on_pair: Optional[PairCallback] = None, df: Optional[pd.DataFrame] = None) -> Dict[str, str]:
         """
-        Map input columns to standard columns using the LLM.
+        Merge a previously confirmed mapping with an LLM mapping of the delta columns only.
         
         :param input_columns: List of input column names
-        :param standard_columns: List of standard column names for the category
+        :param base_mapping: Stored mapping of standard columns to input columns
         :param category: Category of the data (billing, usage, or support)
-        :return: Dictionary mapping input columns to standard columns
+        :param delta_columns: Input columns not covered by the stored mapping; defaults to every unmapped input column
+        :param on_pair: Optional callback receiving each pair as soon as it is known
+        :param df: Optional data the input columns come from; its column profiles are added to the prompt
+        :return: Dictionary mapping standard columns to input columns
         """
-        # Store context for validation
-        self.task_context = {
+        mandatory_columns = self.standard_columns[category]['mandatory']
+        optional_columns = self.standard_columns[category]['optional']
+        input_set = set(input_columns)
+
+        # Keep stored mappings whose input column is still present in the data
+        mapping = {col: None for col in mandatory_columns + optional_columns}
+        for std_col, input_col in base_mapping.items():
+            if std_col in mapping and input_col in input_set:
+                mapping[std_col] = input_col
+        used_inputs = set(col for col in mapping.values() if col is not None)
+        if on_pair is not None:
+            for std_col, input_col in mapping.items():
+                if input_col is not None:
+                    on_pair(std_col, input_col)
+
+        if delta_columns is None:
+            delta_columns = input_columns
+        delta_columns = [col for col in delta_columns if col in input_set and col not in used_inputs]
+        remaining_columns = {
+            'mandatory': [col for col in mandatory_columns if mapping[col] is None],
+            'optional': [col for col in optional_columns if mapping[col] is None]
+        }
+
+        if delta_columns and (remaining_columns['mandatory'] or remaining_columns['optional']):
+            delta_mapping = self._map_columns(delta_columns, remaining_columns, category, on_pair, df)
+            for std_col, input_col in delta_mapping.items():
+                if mapping.get(std_col) is None and input_col is not None and input_col not in used_inputs:
+                    mapping[std_col] = input_col
+                    used_inputs.add(input_col)
+
+        self.task_context = self._build_context(input_columns, self.standard_columns[category], category)
+        return mapping
+
+    def _build_context(self, input_columns: List[str], standard_columns: Dict[str, List[str]],
+                       category: str) -> Dict:
+        return {
             'input_columns': input_columns,
-            'mandatory_columns': self.standard_columns[category]['mandatory'],
-            'optional_columns': self.standard_columns[category]['optional'],
+            'mandatory_columns': standard_columns['mandatory'],
+            'optional_columns': standard_columns['optional'],
             'category': category
         }
+
+    def _map_columns(self, input_columns: List[str], standard_columns: Dict[str, List[str]], category: str,
+                     on_pair: Optional[PairCallback] = None, df: Optional[pd.DataFrame] = None) -> Dict[str, str]:
+        """
+        Map input columns to standard columns, resolving obvious matches locally
+        and sending only the unresolved residue to the LLM.
         
-        # Get prompts using PromptManager
-        system_prompt, user_prompt = self.prompt_manager.get_prompt(
+        :param input_columns: List of input column names
+        :param standard_columns: Dictionary with the 'mandatory' and 'optional' standard columns to map to
+        :param category: Category of the data (billing, usage, or support)
+        :param on_pair: Optional callback; local matches are pushed at once and LLM pairs as they stream in
+        :param df: Optional data the input columns come from; its column profiles are added to the prompt
+        :return: Dictionary mapping standard columns to input columns
+        """
+        prematched, residue_inputs, residue_standard = self.pre_matcher.match(input_columns, standard_columns)
+        if on_pair is not None:
+            for std_col, input_col in prematched.items():
+                on_pair(std_col, input_col)
+        llm_mapping = {}
+        if residue_inputs and (residue_standard['mandatory'] or residue_standard['optional']):
+            # Only the columns the LLM will see are profiled
+            profiles = self._column_profiles(df, residue_inputs)
+            batches = self._split_into_batches(residue_inputs, profiles)
+            if len(batches) == 1:
+                llm_mapping = self._request_mapping(residue_inputs, residue_standard, category, on_pair, profiles)
+            else:
+                # Wide schema: map token-budgeted batches concurrently and merge the partial mappings
+                llm_mapping = self._merge_batch_mappings(
+                    self._request_batches(batches, residue_standard, category, on_pair, profiles), residue_inputs
+                )
+        return self._merge_prematched(input_columns, standard_columns, category, prematched, llm_mapping)
+
+    def _request_batches(self, batches: List[List[str]], standard_columns: Dict[str, List[str]], category: str,
+                         on_pair: Optional[PairCallback] = None,
+                         profiles: Optional[Dict] = None) -> List[Dict[str, str]]:
+        max_workers = min(len(batches), APP_CONFIG["wide_schema"]["max_workers"])
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            if on_pair is None:
+                return list(executor.map(
+                    lambda batch: self._request_mapping(batch, standard_columns, category, profiles=profiles), batches
+                ))
+
+            # Relay streamed pairs through a queue so the callback runs on the calling thread
+            # (UI frameworks such as Streamlit cannot be updated from worker threads)
+            pairs = queue.Queue()
+            futures = [
+                executor.submit(self._request_mapping, batch, standard_columns, category,
+                                lambda std_col, input_col: pairs.put((std_col, input_col)), profiles)
+                for batch in batches
+            ]
+            while not all(future.done() for future in futures) or not pairs.empty():
+                try:
+                    on_pair(*pairs.get(timeout=0.05))
+                except queue.Empty:
+                    pass
+            return [future.result() for future in futures]
+
+    async def _amap_columns(self, input_columns: List[str], standard_columns: Dict[str, List[str]],
+                            category: str, df: Optional[pd.DataFrame] = None) -> Dict[str, str]:
+        """
+        Async variant of _map_columns.
+        
+        :param input_columns: List of input column names
+        :param standard_columns: Dictionary with the 'mandatory' and 'optional' standard columns to map to
+        :param category: Category of the data (billing, usage, or support)
+        :param df: Optional data the input columns come from; its column profiles are added to the prompt
+        :return: Dictionary mapping standard columns to input columns
+        """
+        prematched, residue_inputs, residue_standard = self.pre_matcher.match(input_columns, standard_columns)
+        llm_mapping = {}
+        if residue_inputs and (residue_standard['mandatory'] or residue_standard['optional']):
+            profiles = await asyncio.to_thread(self._column_profiles, df, residue_inputs)
+            batches = self._split_into_batches(residue_inputs, profiles)
+            partial_mappings = await asyncio.gather(
+                *[self._arequest_mapping(batch, residue_standard, category, profiles) for batch in batches]
+            )
+            llm_mapping = self._merge_batch_mappings(partial_mappings, residue_inputs)
+        return self._merge_prematched(input_columns, standard_columns, category, prematched, llm_mapping)
+
+    def _column_profiles(self, df: Optional[pd.DataFrame], input_columns: List[str]) -> Dict:
+        if df is None:
+            return {}
+        return self.profiler.profile(df, input_columns)
+
+    def fits_single_prompt(self, input_columns: List[str], profiles: Optional[Dict] = None) -> bool:
+        """
+        Whether the input columns (and their profiles) fit the token budget of a single prompt.
+        """
+        return len(self._split_into_batches(input_columns, profiles)) == 1
+
+    def offered_columns(self, input_columns: List[str], category: str) -> Dict[str, List[str]]:
+        """
+        The standard columns of a category that a prompt for these input columns offers the LLM.
+
+        :param input_columns: Input column names of the request
+        :param category: Category of the data
+        :return: Dictionary with the 'mandatory' and 'optional' standard columns, pruned for large categories
+        """
+        return self._prune_standard_columns(input_columns, self.standard_columns[category], category)
+
+    def resolve_llm_mapping(self, raw_mapping: Dict, input_columns: List[str], category: str) -> Dict[str, Optional[str]]:
+        """
+        Validate an LLM mapping of the input columns to a category and combine it with the local matches.
+
+        Pairs are validated like any mapping response; confident local matches win over the
+        LLM and every input column is used at most once, as in the regular mapping path.
+
+        :param raw_mapping: Decoded mapping of standard columns to input columns from the LLM
+        :param input_columns: List of input column names
+        :param category: Category of the data
+        :return: Dictionary mapping every standard column of the category to an input column or None
+        """
+        standard_columns = self.standard_columns[category]
+        context = self._build_context(input_columns, standard_columns, category)
+        llm_mapping = self._parse_mapping_response(json.dumps(raw_mapping), context)
+
+        prematched, _, _ = self.pre_matcher.match(input_columns, standard_columns)
+        used_inputs = set(prematched.values())
+        mapping = {}
+        for std_col in standard_columns['mandatory'] + standard_columns['optional']:
+            input_col = prematched.get(std_col)
+            if input_col is None:
+                input_col = llm_mapping.get(std_col)
+                if input_col in used_inputs:
+                    input_col = None
+                if input_col is not None:
+                    used_inputs.add(input_col)
+            mapping[std_col] = input_col
+        self.task_context = context
+        return mapping
+
+    def _split_into_batches(self, input_columns: List[str], profiles: Optional[Dict] = None) -> List[List[str]]:
+        """
+        Split input columns into batches whose estimated prompt size stays within the token budget.
+        
+        :param input_columns: List of input column names
+        :param profiles: Optional column profiles; their prompt lines count towards the budget
+        :return: List of column batches, in input order
+        """
+        config = APP_CONFIG["wide_schema"]
+        budget_chars = config["max_input_tokens_per_batch"] * config["chars_per_token"]
+        batches, current, current_chars = [], [], 0
+        for col in input_columns:
+            # repr() plus the list separator is what the column costs in the rendered prompt
+            col_chars = len(repr(col)) + 2
+            if profiles and col in profiles:
+                col_chars += len(format_profiles(profiles, [col]))
+            if current and current_chars + col_chars > budget_chars:
+                batches.append(current)
+                current, current_chars = [], 0
+            current.append(col)
+            current_chars += col_chars
+        if current:
+            batches.append(current)
+        return batches
+
+    def _merge_batch_mappings(self, partial_mappings: List[Dict[str, str]], input_columns: List[str]) -> Dict[str, str]:
+        """
+        Merge partial mappings from several batches.
+        
+        When more than one batch claims the same standard column, the claim whose input column
+        scores highest against it in the local matcher wins; ties go to the earliest input column.
+        
+        :param partial_mappings: Mappings returned for each batch
+        :param input_columns: All input columns that were batched, in input order
+        :return: Dictionary mapping standard columns to input columns
+        """
+        if len(partial_mappings) == 1:
+            return partial_mappings[0]
+
+        position = {col: index for index, col in enumerate(input_columns)}
+        claims = {}
+        for partial in partial_mappings:
+            for std_col, input_col in partial.items():
+                claims.setdefault(std_col, [])
+                if input_col is not None:
+                    claims[std_col].append(input_col)
+
+        merged = {}
+        for std_col, candidates in claims.items():
+            if not candidates:
+                merged[std_col] = None
+                continue
+            merged[std_col] = min(
+                candidates,
+                key=lambda col: (-self.pre_matcher.score(col, std_col), position.get(col, len(position)))
+            )
+        return merged
+
+    def _merge_prematched(self, input_columns: List[str], standard_columns: Dict[str, List[str]], category: str,
+                          prematched: Dict[str, str], llm_mapping: Dict[str, str]) -> Dict[str, str]:
+        # Local matches are locked in; the LLM only ever saw the residue, so the two cannot collide.
+        # An input column the LLM assigned twice keeps its first assignment, mandatory columns first
+        mapping = {}
+        used_inputs = set(prematched.values())
+        for std_col in standard_columns['mandatory'] + standard_columns['optional']:
+            input_col = prematched.get(std_col)
+            if input_col is None:
+                input_col = llm_mapping.get(std_col)
+                if input_col in used_inputs:
+                    input_col = None
+                if input_col is not None:
+                    used_inputs.add(input_col)
+            mapping[std_col] = input_col
+        self.task_context = self._build_context(input_columns, standard_columns, category)
+        return mapping
+
+    def _request_mapping(self, input_columns: List[str], standard_columns: Dict[str, List[str]],
+                         category: str, on_pair: Optional[PairCallback] = None,
+                         profiles: Optional[Dict] = None) -> Dict[str, str]:
+        """
+        Map input columns to standard columns using the LLM.
+        
+        :param input_columns: List of input column names
+        :param standard_columns: Dictionary with the 'mandatory' and 'optional' standard columns to map to
+        :param category: Category of the data (billing, usage, or support)
+        :param on_pair: Optional callback; when given, the completion is streamed and parsed incrementally
+        :param profiles: Optional column profiles added to the prompt
+        :return: Dictionary mapping standard columns to input columns
+        """
+        context, system_prompt, user_prompt, cache_key, model_config = self._prepare_request(
+            input_columns, standard_columns, category, profiles
+        )
+        mapping_str = self.cache.get(cache_key)
+        from_cache = mapping_str is not None
+        if not from_cache:
+            if on_pair is not None:
+                return self._stream_mapping(context, system_prompt, user_prompt, cache_key, model_config, on_pair)
+            mapping_str = self._complete_mapping(context, system_prompt, user_prompt, model_config)
+
+        # Parse and validate the mapping from the response
+        mapping = self._parse_mapping_response(mapping_str, context)
+        # Only responses that parse to a mapping are cached, so a bad answer is not replayed for the whole TTL
+        if mapping and not from_cache:
+            self.cache.set(cache_key, mapping_str)
+        if on_pair is not None:
+            for std_col, input_col in mapping.items():
+                on_pair(std_col, input_col)
+        return mapping
+
+    def _complete_mapping(self, context: Dict, system_prompt: str, user_prompt: str, model_config: Dict) -> str:
+        """
+        Request the whole mapping in one completion, through the router when it is enabled.
+
+        :return: Response text
+        """
+        if self.router is not None:
+            return self._route_mapping(context, model_config)
+        with self.metrics.span('llm_call', **self._llm_labels(model_config)):
+            response = self.client.chat.completions.create(
+                **self._completion_kwargs(system_prompt, user_prompt, model_config)
+            )
+        record_usage(response.usage, **self._llm_labels(model_config))
+        return response.choices[0].message.content.strip()
+
+    def _open_stream(self, context: Dict, system_prompt: str, user_prompt: str, model_config: Dict):
+        if self.router is not None:
+            return self.router.open_stream(lambda llm_provider: self._render_prompt(context, llm_provider),
+                                           model_config, agent_type='column_mapper')
+        stream = self.client.chat.completions.create(
+            stream=True, stream_options={"include_usage": True},
+            timeout=APP_CONFIG["llm_router"]["deadline_seconds"],
+            **self._completion_kwargs(system_prompt, user_prompt, model_config)
+        )
+        return stream, self._llm_labels(model_config)
+
+    def _stream_mapping(self, context: Dict, system_prompt: str, user_prompt: str, cache_key: str,
+                        model_config: Dict, on_pair: PairCallback) -> Dict[str, str]:
+        """
+        Stream the completion and validate each pair as soon as it closes.
+        
+        The stream is opened through the router, so a provider that cannot start it falls
+        through to the next one. A stream that breaks before its first pair is replaced by a
+        regular (retried, hedged) completion; one cut off later (output limit or connection
+        error) returns every pair completed before the cut. Only complete responses are cached.
+        
+        :return: Dictionary mapping standard columns to input columns
+        """
+        standard_columns, input_columns = self._validation_sets(context)
+        parser = SFNIncrementalMappingParser()
+        mapping, chunks, used_inputs = {}, [], set()
+        labels = self._llm_labels(model_config)
+        start = time.perf_counter()
+        try:
+            stream, labels = self._open_stream(context, system_prompt, user_prompt, model_config)
+            with self.metrics.span('llm_call', streamed=True, **labels):
+                for chunk in stream:
+                    # The last chunk carries the token usage of the whole completion and no choices
+                    if getattr(chunk, 'usage', None) is not None:
+                        record_usage(chunk.usage, **labels)
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    chunks.append(chunk.choices[0].delta.content)
+                    for std_col, input_col in parser.feed(chunks[-1]):
+                        if std_col in mapping or std_col not in standard_columns:
+                            continue
+                        if input_col is not None and (input_col not in input_columns or input_col in used_inputs):
+                            continue
+                        if not mapping:
+                            self.metrics.record_span('llm_first_pair', time.perf_counter() - start, **labels)
+                        mapping[std_col] = input_col
+                        if input_col is not None:
+                            used_inputs.add(input_col)
+                        on_pair(std_col, input_col)
+        except Exception as e:
+            if mapping:
+                self.metrics.increment('llm_stream_truncations', **labels)
+                self.logger.warning(f"Mapping stream interrupted, keeping {len(mapping)} completed pairs: {e}")
+                return mapping
+            self.metrics.increment('llm_stream_fallbacks', **labels)
+            self.logger.warning(f"Mapping stream failed before its first pair, requesting it in one piece: {e}")
+            mapping_str = self._complete_mapping(context, system_prompt, user_prompt, model_config)
+            mapping = self._parse_mapping_response(mapping_str, context)
+            for std_col, input_col in mapping.items():
+                on_pair(std_col, input_col)
+            if mapping:
+                self.cache.set(cache_key, mapping_str)
+            return mapping
+
+        mapping_str = ''.join(chunks).strip()
+        if not parser.started:
+            # Not JSON at all: fall back to the regular parser and its line-based fallback
+            mapping = self._parse_mapping_response(mapping_str, context)
+            for std_col, input_col in mapping.items():
+                on_pair(std_col, input_col)
+        if mapping and (parser.complete or not parser.started):
+            self.cache.set(cache_key, mapping_str)
+        return mapping
+
+    async def _arequest_mapping(self, input_columns: List[str], standard_columns: Dict[str, List[str]],
+                                category: str, profiles: Optional[Dict] = None) -> Dict[str, str]:
+        """
+        Async variant of _request_mapping.
+        
+        :param input_columns: List of input column names
+        :param standard_columns: Dictionary with the 'mandatory' and 'optional' standard columns to map to
+        :param category: Category of the data (billing, usage, or support)
+        :param profiles: Optional column profiles added to the prompt
+        :return: Dictionary mapping standard columns to input columns
+        """
+        context, system_prompt, user_prompt, cache_key, model_config = self._prepare_request(
+            input_columns, standard_columns, category, profiles
+        )
+        mapping_str = self.cache.get(cache_key)
+        from_cache = mapping_str is not None
+        if not from_cache:
+            if self.router is not None:
+                mapping_str = await asyncio.to_thread(self._route_mapping, context, model_config)
+            else:
+                with self.metrics.span('llm_call', **self._llm_labels(model_config)):
+                    response = await self.async_client.get().chat.completions.create(
+                        **self._completion_kwargs(system_prompt, user_prompt, model_config)
+                    )
+                record_usage(response.usage, **self._llm_labels(model_config))
+                mapping_str = response.choices[0].message.content.strip()
+
+        mapping = self._parse_mapping_response(mapping_str, context)
+        if mapping and not from_cache:
+            self.cache.set(cache_key, mapping_str)
+        return mapping
+
+    def _prepare_request(self, input_columns: List[str], standard_columns: Dict[str, List[str]],
+                         category: str, profiles: Optional[Dict] = None) -> Tuple[Dict, str, str, str, Dict]:
+        standard_columns = self._prune_standard_columns(input_columns, standard_columns, category)
+        # Store context for validation; the local copy keeps concurrent calls on a shared agent isolated
+        context = self._build_context(input_columns, standard_columns, category)
+        context['column_profiles'] = profiles or {}
+        self.task_context = context
+        
+        system_prompt, user_prompt = self._render_prompt(context)
+        # Key on the column names and profile types only, so a recurring feed hits the cache
+        key_prompt = self._render_prompt(context, types_only=True)[1] if profiles else user_prompt
+
+        # Never let the output limit truncate the JSON: one entry per offered standard column must fit
+        model_config = dict(self.model_config)
+        model_config["max_tokens"] = max(
+            self.model_config["max_tokens"],
+            self.estimate_output_tokens(input_columns, standard_columns)
+        )
+
+        cache_key = self.cache.make_key(
             agent_type='column_mapper',
-            llm_provider='openai',
-            input_columns=input_columns,
-            mandatory_columns=self.standard_columns[category]['mandatory'],
-            optional_columns=self.standard_columns[category]['optional'],
-            category=category
+            model_config=model_config,
+            system_prompt=system_prompt,
+            user_prompt=key_prompt,
+            prompt_version=self.prompt_manager.prompts_config.get('version')
+        )
+        return context, system_prompt, user_prompt, cache_key, model_config
+
+    def _prune_standard_columns(self, input_columns: List[str], standard_columns: Dict[str, List[str]],
+                                category: str) -> Dict[str, List[str]]:
+        """
+        Offer only the standard columns the input columns plausibly map to.
+
+        Large categories keep their mandatory columns plus the optional columns that are among
+        the top-k most similar (by character n-grams) for at least one input column, so the
+        prompt stays the same size however many columns a schema defines. Requests with an
+        input name that resembles no standard column keep every column.
+
+        :param input_columns: Input column names of the request
+        :param standard_columns: Dictionary with the 'mandatory' and 'optional' standard columns
+        :param category: Category of the data, for metrics
+        :return: Dictionary in the same layout, possibly with fewer optional columns
+        """
+        config = APP_CONFIG["schema_registry"]
+        if len(standard_columns['mandatory']) + len(standard_columns['optional']) < config["prune_above_columns"]:
+            return standard_columns
+        optional = self.schemas.top_candidates(input_columns, standard_columns['optional'], config["top_k"],
+                                               config["min_similarity"])
+        self.metrics.increment('prompt_pruned_columns', len(standard_columns['optional']) - len(optional),
+                               category=category)
+        return {'mandatory': standard_columns['mandatory'], 'optional': optional}
+
+    def _render_prompt(self, context: Dict, llm_provider: str = 'openai', types_only: bool = False) -> Tuple[str, str]:
+        # Get prompts using PromptManager
+        with self.metrics.span('prompt_render', agent='column_mapper'):
+            return self.prompt_manager.get_prompt(
+                agent_type='column_mapper',
+                llm_provider=llm_provider,
+                input_columns=context['input_columns'],
+                mandatory_columns=context['mandatory_columns'],
+                optional_columns=context['optional_columns'],
+                category=context['category'],
+                column_profiles=format_profiles(context.get('column_profiles'), context['input_columns'], types_only)
+            )
+
+    def _llm_labels(self, model_config: Optional[Dict] = None) -> Dict:
+        return {'agent': 'column_mapper', 'provider': 'openai', 'model': (model_config or self.model_config)["model"]}
+
+    def _route_mapping(self, context: Dict, model_config: Dict) -> str:
+        """
+        Request the mapping through the provider router; the first response that parses to a mapping wins.
+        """
+        result = self.router.complete(
+            lambda llm_provider: self._render_prompt(context, llm_provider),
+            model_config,
+            validate=lambda content: bool(self._parse_mapping_response(content, context)),
+            agent_type='column_mapper'
         )
+        return result['content']
+
+    def estimate_output_tokens(self, input_columns: List[str], standard_columns: Dict[str, List[str]]) -> int:
+        """
+        Output tokens a JSON mapping with one entry per offered standard column can take.
+        """
+        chars_per_token = APP_CONFIG["wide_schema"]["chars_per_token"]
+        longest_input = max((len(str(col)) for col in input_columns), default=0)
+        # Each entry is '"StandardColumn": "input column",' plus whitespace
+        entry_chars = [len(col) + longest_input + 10 for col in standard_columns['mandatory'] + standard_columns['optional']]
+        return int(sum(entry_chars) / chars_per_token * 1.25) + 20
 
-        response = self.client.chat.completions.create(
-            model=self.model_config["model"],
+    def _completion_kwargs(self, system_prompt: str, user_prompt: str, model_config: Optional[Dict] = None) -> Dict:
+        model_config = model_config or self.model_config
+        return dict(
+            model=model_config["model"],
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=self.model_config["temperature"],
-            max_tokens=self.model_config["max_tokens"],
-            n=self.model_config["n"],
-            stop=self.model_config["stop"]
+            temperature=model_config["temperature"],
+            max_tokens=model_config["max_tokens"],
+            n=model_config["n"],
+            stop=model_config["stop"]
         )
-        # Parse and validate the mapping from the response
-        mapping_str = response.choices[0].message.content.strip()
-        return self._parse_mapping_response(mapping_str)
 
-    def _parse_mapping_response(self, mapping_str: str) -> Dict[str, str]:
+    def _validation_sets(self, context: Dict) -> Tuple[set, set]:
+        # Validate against the standard columns that were actually offered in the prompt
+        mandatory_columns = set(context.get('mandatory_columns', []))
+        optional_columns = set(context.get('optional_columns', []))
+        # Get input DataFrame columns
+        input_columns = set(context.get('input_columns', []))
+        return mandatory_columns.union(optional_columns), input_columns
+
+    def _parse_mapping_response(self, mapping_str: str, context: Optional[Dict] = None) -> Dict[str, str]:
         """
         Parse and validate the mapping response from the LLM.
         
         :param mapping_str: String response from the LLM containing the mapping
-        :return: Dictionary mapping input columns to standard columns
+        :param context: Validation context built by _build_context; defaults to the last task context
+        :return: Dictionary mapping standard columns to input columns
         """
+        context = context if context is not None else self.task_context
+        with self.metrics.span('parse_response', agent='column_mapper'):
+            return self._parse_mapping_str(mapping_str, context)
+
+    def _parse_mapping_str(self, mapping_str: str, context: Dict) -> Dict[str, str]:
+        standard_columns, input_columns = self._validation_sets(context)
+
         try:
             # Clean the response string to extract only the JSON content
             cleaned_str = mapping_str.strip()
@@ -110,15 +659,8 @@ class SFNColumnMappingAgent(SFNAgent):
             raw_mapping = json.loads(cleaned_str)
             # Clean and validate the mapping
             cleaned_mapping = {}
+            dropped = {'unknown_input': 0, 'unknown_standard': 0}
             
-            # Get the category's standard columns
-            category = self.task_context.get('category', '')
-            mandatory_columns = set(self.standard_columns[category]['mandatory'])
-            optional_columns = set(self.standard_columns[category]['optional'])
-            standard_columns = mandatory_columns.union(optional_columns)
-            
-            # Get input DataFrame columns
-            input_columns = set(self.task_context.get('input_columns', []))
             for mapped_col,input_col in raw_mapping.items():
                 # Skip null mappings
                 if mapped_col is None:
@@ -127,47 +669,60 @@ class SFNColumnMappingAgent(SFNAgent):
                 # Validate that input column exists in the DataFrame
                 if input_col != None and input_col not in input_columns:
                     print(f"Input column '{input_col}' not found in DataFrame")
+                    dropped['unknown_input'] += 1
                     continue
                     
                 # Validate that mapped column exists in standard columns
                 if mapped_col not in standard_columns:
+                    dropped['unknown_standard'] += 1
                     continue
                     
                 cleaned_mapping[mapped_col] = input_col
 
+            for reason, count in dropped.items():
+                self.metrics.increment('parse_dropped_pairs', count, reason=reason)
+
             return cleaned_mapping
                 
         except json.JSONDecodeError as e:
             print(f"Failed to parse JSON response: {e}")
+            self.metrics.increment('parse_fallbacks', agent='column_mapper')
             # Fallback parsing logic if the response isn't in JSON format
             mapping = {}
             lines = mapping_str.split('\n')
             for line in lines:
                 if '->' in line:
-                    input_col, mapped_col = line.split('->')
+                    input_col, mapped_col = line.split('->', 1)
                     input_col = input_col.strip()
                     mapped_col = mapped_col.strip()
                     
                     # Apply the same validation as above
                     if input_col in input_columns and mapped_col in standard_columns:
-                        mapping[input_col] = mapped_col           
+                        mapping[mapped_col] = input_col
             return mapping
             
 
         
-    def get_mapping_stats(self, mapping: Dict[str, str]) -> Dict[str, int]:
+    def get_mapping_stats(self, mapping: Dict[str, str], input_columns: Optional[List[str]] = None,
+                          category: Optional[str] = None) -> Dict[str, int]:
         """
         Get statistics about the mapping results.
         
-        :param mapping: The cleaned mapping dictionary
+        :param mapping: The cleaned mapping dictionary (standard column -> input column)
+        :param input_columns: Input columns of the dataset; defaults to the last task context
+        :param category: Category of the data; defaults to the last task context
         :return: Dictionary with mapping statistics
         """
-        input_columns = set(self.task_context.get('input_columns', []))
-        mandatory_columns = set(self.task_context.get('mandatory_columns', []))
-        optional_columns = set(self.task_context.get('optional_columns', []))
+        if input_columns is not None and category is not None:
+            context = self._build_context(input_columns, self.standard_columns[category], category)
+        else:
+            context = self.task_context
+        input_columns = set(context.get('input_columns', []))
+        mandatory_columns = set(context.get('mandatory_columns', []))
+        optional_columns = set(context.get('optional_columns', []))
         
-        mapped_inputs = set(mapping.keys())
-        mapped_standards = set(mapping.values())
+        mapped_inputs = set(input_col for input_col in mapping.values() if input_col is not None)
+        mapped_standards = set(std_col for std_col, input_col in mapping.items() if input_col is not None)
         
         mapped_mandatory = set(col for col in mapped_standards if col in mandatory_columns)
         
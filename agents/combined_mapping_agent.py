@@ -0,0 +1,185 @@
+import json
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+from sfn_blueprint import SFNAgent
+from sfn_blueprint import Task
+from config.app_config import APP_CONFIG
+from config.model_config import MODEL_CONFIG
+from agents.category_identification_agent import SFNCategoryIdentificationAgent
+from agents.column_mapping_agent import SFNColumnMappingAgent
+from utils.column_profiler import format_profiles
+from utils.metrics import get_metrics, record_usage
+
+
+class SFNCombinedMappingAgent(SFNAgent):
+    """
+    Identifies the category and maps the columns for that category in a single LLM round trip.
+
+    The structured response is validated with the category agent's normalization and the
+    mapping agent's response parser. When it does not validate (unparseable JSON, unknown
+    category, or a schema too wide for one prompt), the two-step path is used instead.
+    Meant for headless use where nobody confirms the category before mapping.
+    """
+
+    def __init__(self, category_agent: Optional[SFNCategoryIdentificationAgent] = None,
+                 mapping_agent: Optional[SFNColumnMappingAgent] = None):
+        super().__init__(name="Combined Mapping", role="Data Categorizer and Mapper")
+        self.category_agent = category_agent or SFNCategoryIdentificationAgent()
+        self.mapping_agent = mapping_agent or SFNColumnMappingAgent()
+        self.model_config = MODEL_CONFIG["combined_mapper"]
+        self.metrics = get_metrics()
+
+    def execute_task(self, task: Task) -> Dict:
+        """
+        Execute the combined category identification and mapping task.
+
+        :param task: Task object containing the DataFrame to be categorized and mapped
+        :return: Dictionary with the 'category', its 'mapping' (None when the category has no
+                 standard columns) and the 'source' ('combined' or 'two_step')
+        """
+        if not isinstance(task.data, pd.DataFrame):
+            raise ValueError("Task data must be a pandas DataFrame")
+
+        input_columns = task.data.columns.tolist()
+        profiles = self.mapping_agent.profiler.profile(task.data, input_columns)
+        # A schema that needs batching cannot be categorized and mapped in a single prompt
+        if self.mapping_agent.fits_single_prompt(input_columns, profiles):
+            result = self._request_combined(input_columns, profiles)
+            if result is not None:
+                return {**result, 'source': 'combined'}
+
+        return {**self._two_step(task.data), 'source': 'two_step'}
+
+    def _request_combined(self, input_columns: List[str], profiles: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Request the category and mapping in one call.
+
+        :param input_columns: List of input column names
+        :param profiles: Optional column profiles added to the prompt
+        :return: Dictionary with 'category' and 'mapping', or None if the response did not validate
+        """
+        category_columns, system_prompt, user_prompt, cache_key, model_config = self._prepare_request(
+            input_columns, profiles
+        )
+        cache = self.mapping_agent.cache
+        response_str = cache.get(cache_key)
+        from_cache = response_str is not None
+        if not from_cache and self.mapping_agent.router is not None:
+            response_str = self.mapping_agent.router.complete(
+                lambda llm_provider: self._render_prompt(input_columns, category_columns, llm_provider, profiles),
+                model_config,
+                validate=lambda content: self._parse_combined_response(content, input_columns) is not None,
+                agent_type='combined_mapper'
+            )['content']
+        elif not from_cache:
+            labels = {'agent': 'combined_mapper', 'provider': 'openai', 'model': model_config["model"]}
+            with self.metrics.span('llm_call', **labels):
+                response = self.mapping_agent.client.chat.completions.create(
+                    **self._completion_kwargs(system_prompt, user_prompt, model_config)
+                )
+            record_usage(response.usage, **labels)
+            response_str = response.choices[0].message.content.strip()
+
+        result = self._parse_combined_response(response_str, input_columns)
+        # Only responses that validated are cached, so a bad answer is not replayed
+        if result is not None and not from_cache:
+            cache.set(cache_key, response_str)
+        return result
+
+    def _render_prompt(self, input_columns: List[str], category_columns: Dict[str, Dict[str, List[str]]],
+                       llm_provider: str = 'openai', profiles: Optional[Dict] = None,
+                       types_only: bool = False) -> Tuple[str, str]:
+        sections = "\n".join(
+            f"{category}:\nMandatory: {columns['mandatory']}\nOptional: {columns['optional']}"
+            for category, columns in category_columns.items()
+        )
+        with self.metrics.span('prompt_render', agent='combined_mapper'):
+            return self.mapping_agent.prompt_manager.get_prompt(
+                agent_type='combined_mapper',
+                llm_provider=llm_provider,
+                input_columns=input_columns,
+                category_columns=sections,
+                column_profiles=format_profiles(profiles, input_columns, types_only)
+            )
+
+    def _prepare_request(self, input_columns: List[str], profiles: Optional[Dict] = None
+                         ) -> Tuple[Dict, str, str, str, Dict]:
+        # Only the categories closest to the input columns are offered, so the prompt does not grow with
+        # the registry; their standard columns are pruned once here and reused by every provider's render
+        categories = self.mapping_agent.schemas.rank_categories(
+            input_columns, APP_CONFIG["schema_registry"]["max_prompt_categories"]
+        )
+        category_columns = {category: self.mapping_agent.offered_columns(input_columns, category)
+                            for category in categories}
+        system_prompt, user_prompt = self._render_prompt(input_columns, category_columns, profiles=profiles)
+        # Key on the column names and profile types only, so a recurring feed hits the cache
+        key_prompt = (self._render_prompt(input_columns, category_columns, profiles=profiles, types_only=True)[1]
+                      if profiles else user_prompt)
+
+        # Room for the category plus a full mapping for the largest category
+        model_config = dict(self.model_config)
+        model_config["max_tokens"] = max(
+            self.model_config["max_tokens"],
+            max((self.mapping_agent.estimate_output_tokens(input_columns, columns)
+                 for columns in category_columns.values()), default=0) + 20
+        )
+
+        cache_key = self.mapping_agent.cache.make_key(
+            agent_type='combined_mapper',
+            model_config=model_config,
+            system_prompt=system_prompt,
+            user_prompt=key_prompt,
+            prompt_version=self.mapping_agent.prompt_manager.prompts_config.get('version')
+        )
+        return category_columns, system_prompt, user_prompt, cache_key, model_config
+
+    def _completion_kwargs(self, system_prompt: str, user_prompt: str, model_config: Dict) -> Dict:
+        return dict(
+            model=model_config["model"],
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=model_config["temperature"],
+            max_tokens=model_config["max_tokens"],
+            n=model_config["n"],
+            stop=model_config["stop"]
+        )
+
+    def _parse_combined_response(self, response_str: str, input_columns: List[str]) -> Optional[Dict]:
+        """
+        Validate the combined response.
+
+        :param response_str: String response from the LLM
+        :param input_columns: List of input column names
+        :return: Dictionary with 'category' and 'mapping', or None if the response is not usable
+        """
+        cleaned_str = response_str.replace('```json', '').replace('```', '')
+        start_idx, end_idx = cleaned_str.find('{'), cleaned_str.rfind('}')
+        try:
+            response = json.loads(cleaned_str[start_idx:end_idx + 1])
+        except (json.JSONDecodeError, ValueError):
+            self.metrics.increment('parse_fallbacks', agent='combined_mapper')
+            return None
+        if not isinstance(response, dict) or not isinstance(response.get('category'), str):
+            return None
+
+        category = self.category_agent._normalize_category(response['category'].strip().lower())
+        if category == "none of these":
+            return None
+        if category not in self.mapping_agent.standard_columns:
+            # A valid category without standard columns (e.g. 'other') has nothing to map
+            return {'category': category, 'mapping': None}
+
+        raw_mapping = response.get('mapping')
+        if not isinstance(raw_mapping, dict):
+            return None
+        return {'category': category,
+                'mapping': self.mapping_agent.resolve_llm_mapping(raw_mapping, input_columns, category)}
+
+    def _two_step(self, df: pd.DataFrame) -> Dict:
+        category = self.category_agent.execute_task(Task("Identify category", data=df))
+        if category not in self.mapping_agent.standard_columns:
+            return {'category': category, 'mapping': None}
+        mapping = self.mapping_agent.execute_task(Task("Map columns", data={'dataframe': df, 'category': category}))
+        return {'category': category, 'mapping': mapping}
@@ -0,0 +1,82 @@
+import asyncio
+from typing import Dict, Optional
+import pandas as pd
+from sfn_blueprint import SFNAgent
+from sfn_blueprint import Task, setup_logger
+from config.app_config import APP_CONFIG
+from agents.category_identification_agent import SFNCategoryIdentificationAgent
+from agents.column_mapping_agent import SFNColumnMappingAgent
+from utils.shared_resources import get_shared
+
+
+class SFNSpeculativeMappingAgent(SFNAgent):
+    """
+    Runs category identification and the column mapping for the likeliest categories
+    (the ones whose standard columns best match the column names) concurrently, so the mapping for whichever category gets confirmed is already
+    available. End-to-end latency is one LLM round trip instead of two. When the local
+    category classifier is confident, only that category is mapped.
+    """
+
+    def __init__(self, category_agent: Optional[SFNCategoryIdentificationAgent] = None,
+                 mapping_agent: Optional[SFNColumnMappingAgent] = None):
+        super().__init__(name="Speculative Mapping", role="Data Categorizer and Mapper")
+        self.category_agent = category_agent or SFNCategoryIdentificationAgent()
+        self.mapping_agent = mapping_agent or SFNColumnMappingAgent()
+        self.logger, _ = get_shared('logger', setup_logger)
+
+    def execute_task(self, task: Task) -> Dict:
+        """
+        Execute the speculative category identification and mapping task.
+
+        :param task: Task object containing the DataFrame to be categorized and mapped
+        :return: Dictionary with the identified 'category' and 'mappings' per category
+        """
+        return asyncio.run(self._run(task))
+
+    async def _run(self, task: Task) -> Dict:
+        # This loop is ours, so its async clients are closed before asyncio.run closes it
+        try:
+            return await self.aexecute_task(task)
+        finally:
+            await asyncio.gather(self.category_agent.async_client.aclose(),
+                                 self.mapping_agent.async_client.aclose())
+
+    async def aexecute_task(self, task: Task) -> Dict:
+        """
+        Async variant of execute_task.
+
+        :param task: Task object containing the DataFrame to be categorized and mapped
+        :return: Dictionary with the identified 'category' and 'mappings' per category
+        """
+        if not isinstance(task.data, pd.DataFrame):
+            raise ValueError("Task data must be a pandas DataFrame")
+
+        columns = task.data.columns.tolist()
+        category = self.category_agent.classify(columns)
+        if category is not None:
+            # Answered locally: there is nothing to speculate on, so only that category is mapped
+            categories = [category] if category in self.mapping_agent.schemas.standard_columns else []
+            identify = asyncio.sleep(0, result=category)
+        else:
+            categories = self.mapping_agent.schemas.rank_categories(
+                columns, APP_CONFIG["speculative_mapping"]["max_categories"]
+            )
+            identify = self.category_agent.aidentify_with_llm(task.data)
+        mapping_tasks = [
+            self.mapping_agent.aexecute_task(Task("Map columns", data={'dataframe': task.data, 'category': category}))
+            for category in categories
+        ]
+        results = await asyncio.gather(identify, *mapping_tasks, return_exceptions=True)
+
+        category = results[0]
+        if isinstance(category, Exception):
+            raise category
+
+        # A failed speculative mapping is left out; it is re-requested if that category is confirmed
+        mappings = {}
+        for category_name, mapping in zip(categories, results[1:]):
+            if isinstance(mapping, Exception):
+                self.logger.warning(f"Speculative mapping for category '{category_name}' failed: {mapping}")
+            else:
+                mappings[category_name] = mapping
+        return {'category': category, 'mappings': mappings}
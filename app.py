@@ -1,10 +1,21 @@
 import sys
 import os
+import time
+from pathlib import Path
 import streamlit as st
 from sfn_blueprint import SFNAgent, Task, SFNSessionManager
-from sfn_blueprint import SFNDataLoader, setup_logger, SFNDataPostProcessor
-from agents.category_identification_agent import SFNCategoryIdentificationAgent
-from agents.column_mapping_agent import SFNColumnMappingAgent
+from sfn_blueprint import setup_logger
+from agents.agent_pool import get_category_agent, get_mapping_agent, get_speculative_agent
+from config.app_config import APP_CONFIG
+from utils.category_classifier import get_category_classifier
+from utils.column_profiler import get_column_profiler, mandatory_population
+from utils.mapped_data_exporter import SFNMappedDataExporter, rename_map, renamed_view
+from utils.mapping_registry import SFNMappingRegistry
+from utils.mapping_review import SFNMappingReview
+from utils.metrics import get_metrics, record_mapping_stats
+from utils.sample_data_loader import SFNFullDataLoader, SFNSampleDataLoader
+from utils.shared_resources import get_shared
+from utils.type_normalizer import SFNTypeNormalizer
 from views.streamlit_views import StreamlitView
 
 
@@ -18,12 +29,19 @@ def run_app():
         view.display_title()
     with col2:
         if view.display_button("🔄", key="reset_button"):
+            SFNMappedDataExporter.remove((session.get('export_files') or {}).values())
             session.clear()
             view.rerun_script()
 
-    # Setup logger
-    logger, handler = setup_logger()
+    # Setup logger once per process; calling setup_logger on every rerun would stack handlers
+    rerun_start = time.perf_counter()
+    logger, handler = get_shared('logger', setup_logger)
     logger.info('Starting Column Mapping App')
+    registry = get_shared('mapping_registry', SFNMappingRegistry)
+    metrics = get_metrics()
+    # Exports of sessions that were abandoned instead of finished or reset are swept once per process
+    get_shared('stale_exports_swept', SFNMappedDataExporter.sweep_stale)
+    logger.info(f"Rerun setup took {(time.perf_counter() - rerun_start) * 1000:.1f} ms")
 
     # Step 1: Data Loading and Preview
     view.display_header("Step 1: Data Loading and Preview")
@@ -34,12 +52,22 @@ def run_app():
     if uploaded_file is not None:
         if session.get('df') is None:
             with view.display_spinner('Loading data...'):
-                data_loader = SFNDataLoader()
+                if APP_CONFIG["lazy_loading"]["enabled"]:
+                    # Steps 1-3 only need the header and a preview; the full file is read in Step 4
+                    data_loader = SFNSampleDataLoader()
+                    session.set('df_is_sample', True)
+                else:
+                    data_loader = SFNFullDataLoader()
                 load_task = Task("Load the uploaded file", data=uploaded_file)
-                df = data_loader.execute_task(load_task)
+                with metrics.span('data_load', source='app', sample=bool(session.get('df_is_sample'))):
+                    df = data_loader.execute_task(load_task)
                 session.set('df', df)
-                logger.info(f"Data loaded successfully. Shape: {df.shape}")
-                view.show_message(f"✅ Data loaded successfully. Shape: {df.shape}", "success")
+                if session.get('df_is_sample'):
+                    logger.info(f"Data header and sample loaded. Columns: {df.shape[1]}, sample rows: {df.shape[0]}")
+                    view.show_message(f"✅ Data loaded: {df.shape[1]} columns (previewing the first {df.shape[0]} rows)", "success")
+                else:
+                    logger.info(f"Data loaded successfully. Shape: {df.shape}")
+                    view.show_message(f"✅ Data loaded successfully. Shape: {df.shape}", "success")
                 
                 view.display_subheader("Data Preview")
                 view.display_dataframe(df.head())
@@ -49,12 +77,28 @@ def run_app():
         view.display_markdown("---")
 
         if not session.get('category_identified'):
-            with view.display_spinner('🤖 AI is analyzing your data to identify the category...'):
-                category_agent = SFNCategoryIdentificationAgent()
-                category_task = Task("Identify category", data=df)
-                identified_category = category_agent.execute_task(category_task)
-                session.set('identified_category', identified_category)
+            # A schema confirmed before skips the category LLM call
+            registry_match = registry.lookup(session.get('df').columns.tolist())
+            if registry_match is not None:
+                session.set('identified_category', registry_match['category'])
                 session.set('category_identified', True)
+                logger.info(f"Category reused from mapping registry: {registry_match['category']}")
+            elif APP_CONFIG["speculative_mapping"]["enabled"]:
+                with view.display_spinner('🤖 AI is analyzing your data to identify the category...'):
+                    # Mappings for every category are generated alongside the category itself
+                    speculative_agent = get_speculative_agent()
+                    speculative_task = Task("Identify category and map columns", data=session.get('df'))
+                    speculative_result = speculative_agent.execute_task(speculative_task)
+                    session.set('identified_category', speculative_result['category'])
+                    session.set('speculative_mappings', speculative_result['mappings'])
+                    session.set('category_identified', True)
+            else:
+                with view.display_spinner('🤖 AI is analyzing your data to identify the category...'):
+                    category_agent = get_category_agent()
+                    category_task = Task("Identify category", data=session.get('df'))
+                    identified_category = category_agent.execute_task(category_task)
+                    session.set('identified_category', identified_category)
+                    session.set('category_identified', True)
 
         if session.get('category_identified') and not session.get('category_confirmed'):
             view.show_message(f"🎯 AI suggested category: **{session.get('identified_category')}**", "info")
@@ -68,17 +112,24 @@ def run_app():
             if correct_category == "Yes":
                 if view.display_button("Confirm AI Suggestion"):
                     session.set('category', session.get('identified_category'))
+                    get_category_classifier().learn(session.get('df').columns.tolist(), session.get('category'))
                     session.set('category_confirmed', True)
                     logger.info(f"Category confirmed: {session.get('category')}")
                     view.rerun_script()
 
             elif correct_category == "No":
                 session.set('show_category_selection', True)
-                category_choices = ['billing', 'support', 'usage']
-                user_choice = view.radio_select("Please select the correct category:", category_choices)
+                category_choices = get_mapping_agent().schemas.categories
+                if len(category_choices) <= APP_CONFIG["schema_registry"]["max_prompt_categories"]:
+                    user_choice = view.radio_select("Please select the correct category:", category_choices)
+                else:
+                    # Large registries: a searchable dropdown instead of hundreds of radio buttons
+                    user_choice = view.select_box("Please select the correct category:", category_choices,
+                                                  key="category_choice")
                 
                 if view.display_button("Confirm Selected Category"):
                     session.set('category', user_choice)
+                    get_category_classifier().learn(session.get('df').columns.tolist(), user_choice)
                     session.set('category_confirmed', True)
                     logger.info(f"Category confirmed: {session.get('category')}")
                     view.rerun_script()
@@ -95,15 +146,57 @@ def run_app():
             view.display_markdown("---")
 
             if session.get('column_mapping') is None:
-                with view.display_spinner('🤖 AI is generating column mappings...'):
-                    mapping_agent = SFNColumnMappingAgent()
-                    mapping_task = Task("Map columns", data={
-                        'dataframe': session.get('df'),
-                        'category': session.get('category')
-                    })
-                    column_mapping = mapping_agent.execute_task(mapping_task)
-                    session.set('column_mapping', column_mapping)
-                    logger.info("Column mapping generated")
+                registry_match = registry.lookup(session.get('df').columns.tolist(), session.get('category'))
+                speculative_mappings = session.get('speculative_mappings') or {}
+                if registry_match is not None and registry_match['exact']:
+                    session.set('column_mapping', registry_match['mapping'])
+                    logger.info("Column mapping reused from mapping registry")
+                elif session.get('category') in speculative_mappings:
+                    session.set('column_mapping', speculative_mappings[session.get('category')])
+                    logger.info("Column mapping taken from speculative mapping")
+                else:
+                    with view.display_spinner('🤖 AI is generating column mappings...'):
+                        mapping_agent = get_mapping_agent()
+                        task_data = {
+                            'dataframe': session.get('df'),
+                            'category': session.get('category')
+                        }
+                        if registry_match is not None:
+                            # Near match: only the drifted columns go to the LLM
+                            task_data['base_mapping'] = registry_match['mapping']
+                            task_data['delta_columns'] = registry_match['delta_columns']
+                        if APP_CONFIG["streaming"]["enabled"]:
+                            # Show each mapping as soon as it is parsed from the streamed completion
+                            stream_placeholder = view.make_empty()
+                            streamed_pairs = {}
+                            mapping_start = time.perf_counter()
+
+                            def show_pair(std_col, input_col):
+                                if input_col is None:
+                                    return
+                                if not streamed_pairs:
+                                    logger.info(f"First mapping after {(time.perf_counter() - mapping_start) * 1000:.0f} ms")
+                                streamed_pairs[std_col] = input_col
+                                view.update_table(stream_placeholder, {
+                                    "Standard Column": list(streamed_pairs.keys()),
+                                    "Input Column": list(streamed_pairs.values())
+                                })
+
+                            task_data['on_mapping'] = show_pair
+                        mapping_task = Task("Map columns", data=task_data)
+                        column_mapping = mapping_agent.execute_task(mapping_task)
+                        if 'on_mapping' in task_data:
+                            # The editable table below takes over from the streamed preview
+                            stream_placeholder.empty()
+                        session.set('column_mapping', column_mapping)
+                        logger.info("Column mapping generated")
+                        record_mapping_stats(
+                            mapping_agent.get_mapping_stats(
+                                column_mapping, input_columns=session.get('df').columns.tolist(),
+                                category=session.get('category')
+                            ),
+                            category=session.get('category'), source='llm'
+                        )
 
             
             
@@ -114,7 +207,7 @@ def run_app():
                 mapped_std_cols = [col for col in standard_columns if column_mapping.get(col) is not None]
                 
                 # Get mandatory columns for the category
-                mapping_agent = SFNColumnMappingAgent()
+                mapping_agent = get_mapping_agent()
                 mandatory_columns = mapping_agent.standard_columns[session.get('category')]['mandatory']
                 
                 view.show_message(f"""🎯 AI has suggested mappings for 
@@ -128,50 +221,75 @@ def run_app():
                 selected_mappings = session.get('selected_mappings')
                 df_columns = session.get('df').columns.tolist()
 
-                # Track already mapped input columns
-                mapped_input_cols = [v for v in selected_mappings.values() if v is not None]
-                available_input_cols = [col for col in df_columns if col not in mapped_input_cols]
-
-                # First show and confirm recommended mappings
-                view.display_subheader("Review Suggested Mappings")
-                view.display_markdown("(# indicates mandatory standard columns mappings)")
-                
-                for std_col in mapped_std_cols:
-                    # Add asterisk for mandatory columns
-                    col_display = f"{std_col} #" if std_col in mandatory_columns else std_col
-                    recommended_col = selected_mappings[std_col]
-                    options = [recommended_col] + [col for col in available_input_cols if col != recommended_col] + [None]
-                    new_mapping = view.select_box(
-                        f"Standard Column: **{col_display}**",
-                        options=options,
-                        key=f"mapping_{std_col}"
+                if len(df_columns) >= APP_CONFIG["review"]["wide_schema_columns"]:
+                    # Wide schema: one paginated, filterable table instead of a selectbox per column
+                    view.display_subheader("Review Suggested Mappings")
+                    view.display_markdown("Edit the **Input Column** cell to change a mapping; clear it to leave the standard column unmapped.")
+                    review = SFNMappingReview(standard_columns, mandatory_columns, df_columns)
+                    review_filter = view.text_input("🔎 Filter by standard or input column", key="review_filter")
+                    review_rows = review.filter(selected_mappings, review_filter)
+                    page_count = review.page_count(len(review_rows))
+                    review_page = view.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count,
+                                                    value=1, key="review_page")
+                    edited_page = view.mapping_editor(
+                        review.page_frame(selected_mappings, review_rows, review_page),
+                        input_options=df_columns,
+                        key=f"review_editor_{review_filter}_{review_page}"
                     )
-                    selected_mappings[std_col] = new_mapping
-                    if new_mapping in available_input_cols:
-                        available_input_cols.remove(new_mapping)
-
-                # Show option to map remaining standard columns
-                unmapped_std_cols = [col for col in standard_columns if selected_mappings.get(col) is None]
-                if unmapped_std_cols:
-                    view.display_markdown("---")
-                    view.show_message("### Map Additional Standard Columns", "info")
-                    if view.display_button("Map Additional Columns"):
-                        session.set('show_additional_mapping', True)
-                        view.rerun_script()
+                    review.apply_edits(selected_mappings, edited_page)
+                else:
+                    # Track already mapped input columns
+                    mapped_input_cols = set(v for v in selected_mappings.values() if v is not None)
+                    available_input_cols = [col for col in df_columns if col not in mapped_input_cols]
+
+                    # First show and confirm recommended mappings
+                    view.display_subheader("Review Suggested Mappings")
+                    view.display_markdown("(# indicates mandatory standard columns mappings)")
+                    
+                    for std_col in mapped_std_cols:
+                        # Add asterisk for mandatory columns
+                        col_display = f"{std_col} #" if std_col in mandatory_columns else std_col
+                        recommended_col = selected_mappings[std_col]
+                        options = [recommended_col] + [col for col in available_input_cols if col != recommended_col] + [None]
+                        new_mapping = view.select_box(
+                            f"Standard Column: **{col_display}**",
+                            options=options,
+                            key=f"mapping_{std_col}"
+                        )
+                        selected_mappings[std_col] = new_mapping
+                        if new_mapping is not None and new_mapping not in mapped_input_cols:
+                            mapped_input_cols.add(new_mapping)
+                            available_input_cols.remove(new_mapping)
+
+                    # Show option to map remaining standard columns
+                    unmapped_std_cols = [col for col in standard_columns if selected_mappings.get(col) is None]
+                    if unmapped_std_cols:
+                        view.display_markdown("---")
+                        view.show_message("### Map Additional Standard Columns", "info")
+                        if view.display_button("Map Additional Columns"):
+                            session.set('show_additional_mapping', True)
+                            view.rerun_script()
+
+                        if session.get('show_additional_mapping'):
+                            for std_col in unmapped_std_cols:
+                                # Add asterisk for mandatory columns
+                                col_display = f"{std_col} #" if std_col in mandatory_columns else std_col
+                                new_mapping = view.select_box(
+                                    f"Standard Column: **{col_display}**",
+                                    options=["None"] + available_input_cols,
+                                    key=f"additional_mapping_{std_col}"
+                                )
+                                
+                                if new_mapping != "None":
+                                    selected_mappings[std_col] = new_mapping
+                                    available_input_cols.remove(new_mapping)
 
-                    if session.get('show_additional_mapping'):
-                        for std_col in unmapped_std_cols:
-                            # Add asterisk for mandatory columns
-                            col_display = f"{std_col} #" if std_col in mandatory_columns else std_col
-                            new_mapping = view.select_box(
-                                f"Standard Column: **{col_display}**",
-                                options=["None"] + available_input_cols,
-                                key=f"additional_mapping_{std_col}"
-                            )
-                            
-                            if new_mapping != "None":
-                                selected_mappings[std_col] = new_mapping
-                                available_input_cols.remove(new_mapping)
+                # Each input column can become only one standard column
+                duplicate_inputs = SFNMappingReview.duplicate_inputs(selected_mappings)
+                if duplicate_inputs:
+                    view.show_message("⚠️ These input columns are mapped more than once: " +
+                                      ", ".join(map(str, duplicate_inputs)), "warning")
+                    view.show_message("❗ Please map each input column to a single standard column before confirming.", "info")
 
                 # Check for unmapped mandatory columns before confirmation
                 unmapped_mandatory = [col for col in mandatory_columns 
@@ -184,10 +302,24 @@ def run_app():
                     view.show_message(warning_msg, "warning")
                     view.show_message("❗ Please map all mandatory columns before confirming.", "info")
 
-                # Only show confirm button if all mandatory columns are mapped
-                if not unmapped_mandatory:
+                # Mapped mandatory columns that are mostly empty in the data are flagged, but not blocking
+                mapped_mandatory = {col: selected_mappings[col] for col in mandatory_columns
+                                    if selected_mappings.get(col) is not None}
+                if mapped_mandatory:
+                    profiles = get_column_profiler().profile(session.get('df'), list(mapped_mandatory.values()))
+                    sparse_mandatory = [row for row in mandatory_population(mapped_mandatory, list(mapped_mandatory), profiles)
+                                        if row['populated_rate'] is not None and not row['populated']]
+                    if sparse_mandatory:
+                        view.show_message("⚠️ These mandatory columns are mapped to mostly empty input columns:\n" +
+                                          "\n".join(f"- {row['column']} ← {row['input_column']} "
+                                                     f"({row['populated_rate']:.0%} populated)"
+                                                     for row in sparse_mandatory), "warning")
+
+                # Only show confirm button if all mandatory columns are mapped, each to its own input column
+                if not unmapped_mandatory and not duplicate_inputs:
                     confirm_button = view.display_button("Confirm All Mappings")
                     if confirm_button:
+                        registry.save(df_columns, session.get('category'), selected_mappings)
                         view.show_message("✅ All mappings confirmed", "success")
                         session.set('mapping_confirmed', True)
                         view.rerun_script()
@@ -210,32 +342,90 @@ def run_app():
                     ["View Mapped Data", "Download Mapped Data", "Finish"]
                 )
 
+                # Normalization builds a typed copy of every mapped column, so it is opt-in here
+                normalize = view.checkbox("Normalize column types", value=APP_CONFIG["normalization"]["app_default"],
+                                          key="normalize_types")
+                if session.get('final_df') is not None and session.get('final_df_normalized') != normalize:
+                    SFNMappedDataExporter.remove((session.get('export_files') or {}).values())
+                    for key in ('final_df', 'normalization_report', 'export_files'):
+                        session.set(key, None)
+
                 # Apply the confirmed mappings to create the final DataFrame
                 if session.get('final_df') is None:
-                    mapped_df = session.get('df').copy()
-                    mapping = {v: k for k, v in session.get('selected_mappings').items() if v is not None}
-                    mapped_df.rename(columns=mapping, inplace=True)
-                    session.set('final_df', mapped_df)
+                    if session.get('df_is_sample'):
+                        with view.display_spinner('Loading full data...'):
+                            uploaded_file.seek(0)
+                            with metrics.span('data_load', source='app', sample=False):
+                                full_df = SFNFullDataLoader().execute_task(Task("Load the uploaded file", data=uploaded_file))
+                            session.set('df', full_df)
+                            session.set('df_is_sample', False)
+                            logger.info(f"Full data loaded. Shape: {full_df.shape}")
+                    # Relabelled view over the loaded data; no second copy is held in the session
+                    with metrics.span('rename', source='app'):
+                        final_df = renamed_view(session.get('df'), rename_map(session.get('selected_mappings')))
+                    if normalize:
+                        with view.display_spinner('Normalizing column types...'):
+                            final_df, normalization_report = get_shared('type_normalizer', SFNTypeNormalizer).normalize(final_df)
+                        session.set('normalization_report', normalization_report)
+                        logger.info(f"Column types normalized: {len(normalization_report)} columns")
+                    session.set('final_df', final_df)
+                    session.set('final_df_normalized', normalize)
+
+                normalization_report = session.get('normalization_report') or []
+                failed_columns = [row for row in normalization_report if row['failures']]
+                if failed_columns:
+                    view.show_message(
+                        "⚠️ Some values could not be converted to the standard type and were left empty: " +
+                        ", ".join(f"{row['column']} ({row['failure_rate']:.1%})" for row in failed_columns),
+                        "warning"
+                    )
 
 
                 if operation_type == "View Mapped Data":
                     view.display_dataframe(session.get('final_df'))
+                    if normalization_report:
+                        view.display_subheader("Column Types")
+                        view.display_dataframe(normalization_report)
                 
                 elif operation_type == "Download Mapped Data":
-                    post_processor = SFNDataPostProcessor(session.get('final_df'))
-                    csv_data = post_processor.download_data('csv')
+                    export_formats = {
+                        "CSV": "csv",
+                        "CSV (gzip)": "csv.gz",
+                        "Parquet": "parquet",
+                        "Arrow IPC": "arrow"
+                    }
+                    export_label = view.radio_select("Choose a format:", list(export_formats.keys()), key="export_format")
+                    export_format = export_formats[export_label]
+
+                    # Exports are streamed to a temporary file once per format and reused across reruns
+                    export_files = session.get('export_files') or {}
+                    if export_format not in export_files:
+                        with view.display_spinner(f'Preparing {export_label} export...'):
+                            SFNMappedDataExporter.sweep_stale()
+                            exporter = SFNMappedDataExporter(session.get('final_df'))
+                            export_files[export_format] = exporter.export(export_format)
+                            session.set('export_files', export_files)
+                            logger.info(f"Exported mapped data as {export_format}")
+
+                    # The file is read only when the button is clicked, not on every rerun
+                    extension, mime_type = SFNMappedDataExporter.FORMATS[export_format]
                     view.create_download_button(
-                        label="Download CSV",
-                        data=csv_data,
-                        file_name="mapped_data.csv",
-                        mime_type="text/csv"
+                        label=f"Download {export_label}",
+                        data=Path(export_files[export_format]).read_bytes,
+                        file_name=f"mapped_data{extension}",
+                        mime_type=mime_type
                     )
                 
                 elif operation_type == "Finish":
                     if view.display_button("Confirm Finish"):
                         view.show_message("Thank you for using the Column Mapping App!", "success")
+                        SFNMappedDataExporter.remove((session.get('export_files') or {}).values())
                         session.clear()
                         view.rerun_script()
-                        
+
+    if metrics.enabled:
+        view.metrics_panel(*metrics.summary())
+        metrics.flush()
+
 if __name__ == "__main__":
     run_app()
\ No newline at end of file
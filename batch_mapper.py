@@ -0,0 +1,266 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+from sfn_blueprint import Task, setup_logger
+from agents.agent_pool import get_category_agent, get_combined_agent, get_mapping_agent
+from config.app_config import APP_CONFIG
+from utils.chunked_mapping_engine import SFNChunkedMappingEngine
+from utils.mapped_data_exporter import rename_map
+from utils.column_profiler import get_column_profiler, mandatory_population
+from utils.mapping_registry import SFNMappingRegistry
+from utils.metrics import get_metrics, record_mapping_stats
+from utils.sample_data_loader import SFNFullDataLoader, SFNSampleDataLoader, file_extension
+from utils.type_normalizer import SFNTypeNormalizer
+
+
+def collect_input_files(inputs: List[str]) -> List[str]:
+    """
+    Expand directories and glob patterns into the list of supported data files.
+
+    :param inputs: Directories, glob patterns or file paths
+    :return: Sorted, de-duplicated list of file paths
+    """
+    file_types = APP_CONFIG["batch"]["file_types"]
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, name) for name in sorted(os.listdir(item))]
+        else:
+            candidates = sorted(glob.glob(item))
+        for path in candidates:
+            if os.path.isfile(path) and file_extension(path) in file_types and path not in files:
+                files.append(path)
+    return files
+
+
+def output_names(files: List[str]) -> Dict[str, str]:
+    """
+    Name the outputs of each input file after its path relative to the inputs' common
+    directory, keeping the extension (dir1/a.csv -> dir1/a_csv), so that a.csv and a.parquet
+    or dir1/a.csv and dir2/a.csv do not overwrite each other's outputs.
+
+    :param files: List of input file paths
+    :return: Dictionary of input path -> output name (may contain directory separators)
+    :raises ValueError: When two inputs would still write to the same outputs
+    """
+    if not files:
+        return {}
+    absolute = [os.path.abspath(path) for path in files]
+    base = os.path.commonpath([os.path.dirname(path) for path in absolute])
+    names, owners = {}, {}
+    for path, absolute_path in zip(files, absolute):
+        root, extension = os.path.splitext(os.path.relpath(absolute_path, base))
+        name = f"{root}_{extension.lstrip('.').lower()}" if extension else root
+        key = os.path.normcase(name)
+        if key in owners:
+            raise ValueError(f"{owners[key]} and {path} would write to the same output files")
+        owners[key] = path
+        names[path] = name
+    return names
+
+
+class SFNBatchMapper:
+    """
+    Headless category identification, column mapping and rename over many files.
+
+    One category agent and one mapping agent are shared by every file; files are
+    processed on a bounded thread pool so LLM calls overlap up to ``max_workers``.
+    With ``chunk_size`` set, CSV and Parquet inputs are mapped from a header sample
+    and rewritten out of core, so files larger than memory can be processed.
+    With ``combined`` set, the category and mapping come from a single LLM call.
+    With ``normalize`` set, in-memory outputs are coerced to the standard column types.
+    """
+
+    def __init__(self, output_dir: str, category: Optional[str] = None, output_format: str = 'csv',
+                 max_workers: Optional[int] = None, use_registry: bool = True,
+                 chunk_size: Optional[int] = None, combined: bool = False, normalize: Optional[bool] = None):
+        self.output_dir = output_dir
+        self.category = category
+        self.output_format = output_format
+        self.max_workers = max_workers or APP_CONFIG["batch"]["max_workers"]
+        self.data_loader = SFNFullDataLoader()
+        self.sample_loader = SFNSampleDataLoader()
+        self.chunked_engine = SFNChunkedMappingEngine(chunk_size) if chunk_size else None
+        self.category_agent = get_category_agent()
+        self.mapping_agent = get_mapping_agent()
+        self.combined_agent = get_combined_agent() if combined else None
+        if normalize is None:
+            normalize = APP_CONFIG["normalization"]["enabled"]
+        self.normalizer = SFNTypeNormalizer() if normalize else None
+        self.profiler = get_column_profiler()
+        self.registry = SFNMappingRegistry(enabled=None if use_registry else False)
+        self.logger, _ = setup_logger()
+        self.metrics = get_metrics()
+
+        if category is not None and category not in self.mapping_agent.standard_columns:
+            raise ValueError(f"Invalid category: {category}")
+
+    def run(self, files: List[str]) -> List[Dict]:
+        """
+        Map every file and write the mapped data plus a JSON report per file.
+
+        :param files: List of input file paths
+        :return: List of per-file reports, in input order
+        """
+        names = output_names(files)
+        os.makedirs(self.output_dir, exist_ok=True)
+        reports = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.process_file, path, names[path]): path for path in files}
+            for future in as_completed(futures):
+                report = future.result()
+                reports[futures[future]] = report
+                self.logger.info(f"{report['status']}: {report['input_file']} ({report['elapsed_seconds']:.2f}s)")
+        self.metrics.flush()
+        return [reports[path] for path in files]
+
+    def process_file(self, path: str, output_name: Optional[str] = None) -> Dict:
+        """
+        Load, categorize, map and rename a single file.
+
+        :param path: Input file path
+        :param output_name: Name of the outputs relative to the output directory
+                            (see output_names); derived from the file name when omitted
+        :return: Report dictionary for the file
+        """
+        start = time.perf_counter()
+        output_name = output_name or output_names([path])[path]
+        output_stem = os.path.join(self.output_dir, output_name)
+        os.makedirs(os.path.dirname(output_stem), exist_ok=True)
+        report = {'input_file': path, 'status': 'success'}
+        try:
+            streaming = self.chunked_engine is not None and self.chunked_engine.supports(path)
+            # In streaming mode only the header and a sample are loaded here; the engine reads the rest
+            loader = self.sample_loader if streaming else self.data_loader
+            with self.metrics.span('data_load', source='batch', sample=streaming), open(path, 'rb') as file_obj:
+                df = loader.execute_task(Task("Load file", data=file_obj))
+            columns = df.columns.tolist()
+
+            category = self.category
+            registry_match = None
+            combined_result = None
+            if category is None:
+                registry_match = self.registry.lookup(columns)
+                if registry_match is not None:
+                    category = registry_match['category']
+                elif self.combined_agent is not None:
+                    combined_result = self.combined_agent.execute_task(Task("Identify category and map columns", data=df))
+                    category = combined_result['category']
+                else:
+                    category = self.category_agent.execute_task(Task("Identify category", data=df))
+            report['category'] = category
+            report['schema_version'] = self.mapping_agent.schemas.version
+
+            if category not in self.mapping_agent.standard_columns:
+                report['status'] = 'skipped'
+                report['reason'] = f"No standard columns for category '{category}'"
+                return report
+
+            if combined_result is None and (registry_match is None or registry_match['category'] != category):
+                registry_match = self.registry.lookup(columns, category)
+            if combined_result is not None:
+                mapping = combined_result['mapping']
+                report['mapping_source'] = combined_result['source']
+            elif registry_match is not None and registry_match['exact']:
+                mapping = registry_match['mapping']
+                report['mapping_source'] = 'registry'
+            else:
+                task_data = {'dataframe': df, 'category': category}
+                if registry_match is not None:
+                    task_data['base_mapping'] = registry_match['mapping']
+                    task_data['delta_columns'] = registry_match['delta_columns']
+                    report['mapping_source'] = 'registry+llm'
+                else:
+                    report['mapping_source'] = 'llm'
+                mapping = self.mapping_agent.execute_task(Task("Map columns", data=task_data))
+
+            report['mapping'] = mapping
+            report['stats'] = self.mapping_agent.get_mapping_stats(mapping, input_columns=columns, category=category)
+            record_mapping_stats(report['stats'], category=category, source=report['mapping_source'])
+            mandatory_columns = self.mapping_agent.standard_columns[category]['mandatory']
+            report['mandatory_columns'] = mandatory_population(
+                mapping, mandatory_columns,
+                self.profiler.profile(df, [mapping[col] for col in mandatory_columns if mapping.get(col) is not None])
+            )
+
+            output_path = f"{output_stem}_mapped.{self.output_format}"
+            if streaming:
+                report['rows_written'] = self.chunked_engine.apply(path, output_path, mapping)['rows']
+                report['output_file'] = output_path
+                return report
+
+            with self.metrics.span('rename', source='batch'):
+                mapped_df = df.rename(columns=rename_map(mapping))
+            if self.normalizer is not None:
+                mapped_df, report['normalization'] = self.normalizer.normalize(mapped_df)
+            with self.metrics.span('export', format=self.output_format):
+                if self.output_format == 'parquet':
+                    mapped_df.to_parquet(output_path, index=False)
+                else:
+                    mapped_df.to_csv(output_path, index=False)
+            self.metrics.increment('export_rows', len(mapped_df), format=self.output_format)
+            report['output_file'] = output_path
+        except Exception as e:
+            report['status'] = 'failed'
+            report['error'] = str(e)
+        finally:
+            report['elapsed_seconds'] = time.perf_counter() - start
+            with open(f"{output_stem}_report.json", 'w') as f:
+                json.dump(report, f, indent=2, default=str)
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Map a directory or glob of data files to the standard columns.")
+    parser.add_argument("inputs", nargs="+", help="Directories, glob patterns or files (csv, xlsx, json, parquet)")
+    parser.add_argument("-o", "--output-dir", required=True, help="Directory for mapped files and reports")
+    parser.add_argument("-c", "--category", help="Skip category identification and use this category")
+    parser.add_argument("-f", "--output-format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("-w", "--workers", type=int, default=APP_CONFIG["batch"]["max_workers"],
+                        help="Maximum number of files (and LLM calls) processed concurrently")
+    parser.add_argument("--no-registry", action="store_true", help="Do not reuse confirmed mappings")
+    parser.add_argument("--chunk-size", type=int,
+                        help="Rewrite CSV/Parquet inputs out of core in chunks of this many rows "
+                             "(only mapped columns are written)")
+    parser.add_argument("--combined", action="store_true",
+                        help="Identify the category and map the columns in a single LLM call per file")
+    parser.add_argument("--no-normalize", action="store_true",
+                        help="Keep the source types instead of coercing mapped columns to the standard types")
+    args = parser.parse_args(argv)
+
+    files = collect_input_files(args.inputs)
+    if not files:
+        print("No supported input files found")
+        return 1
+    try:
+        output_names(files)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    batch_mapper = SFNBatchMapper(
+        output_dir=args.output_dir,
+        category=args.category,
+        output_format=args.output_format,
+        max_workers=args.workers,
+        use_registry=not args.no_registry,
+        chunk_size=args.chunk_size,
+        combined=args.combined,
+        normalize=False if args.no_normalize else None
+    )
+    reports = batch_mapper.run(files)
+
+    summary = {status: sum(1 for r in reports if r['status'] == status) for status in ('success', 'skipped', 'failed')}
+    with open(os.path.join(args.output_dir, "batch_summary.json"), 'w') as f:
+        json.dump({'files': len(reports), **summary}, f, indent=2)
+    print(f"Processed {len(reports)} files: {summary}")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from sfn_blueprint import Task
+from config.app_config import APP_CONFIG, CACHE_DIR
+from benchmarks.stub_server import SFNStubModelServer
+from benchmarks.synthetic import generate_schema, mapping_response, write_dataset
+
+
+def progress(message: str):
+    # stdout is silenced while suites run (sfn_blueprint prints every rendered prompt config)
+    print(message, file=sys.stderr, flush=True)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'p50_ms': p50 * 1000, 'p90_ms': p90 * 1000, 'p99_ms': p99 * 1000}
+
+
+def accuracy(mapping: Dict[str, Optional[str]], truth: Dict[str, Optional[str]]) -> Dict[str, int]:
+    predicted = {std_col: input_col for std_col, input_col in mapping.items() if input_col is not None}
+    expected = {std_col: input_col for std_col, input_col in truth.items() if input_col is not None}
+    correct = sum(1 for std_col, input_col in predicted.items() if expected.get(std_col) == input_col)
+    return {'correct': correct, 'predicted': len(predicted), 'expected': len(expected)}
+
+
+def reset_peak_rss():
+    """
+    Restart the peak RSS measurement of this process from its current RSS (Linux only).
+
+    A process inherits its parent's high-water mark when it is forked, and keeps it across
+    exec, so even a freshly spawned worker starts out with the benchmark process' peak.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    try:
+        # VmHWM is what reset_peak_rss() resets
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS, and cannot be reset
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def isolated(func, *args):
+    """
+    Run a measurement in a fresh interpreter and return its result.
+
+    Memory that earlier runs freed but the allocator kept would otherwise count towards
+    the next run's RSS; the measurement resets the peak before it starts (see reset_peak_rss).
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(func, *args).result()
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_agents(stub: SFNStubModelServer, standard_columns: Dict, sizes: List[int], repeats: int,
+                 stream: bool) -> Dict[str, float]:
+    """
+    Category identification and column mapping latency, token spend and accuracy per schema size.
+    """
+    from agents.agent_pool import get_category_agent, get_mapping_agent
+    category_agent, mapping_agent = get_category_agent(), get_mapping_agent()
+    metrics = {}
+    for category, columns in standard_columns.items():
+        for size in sizes:
+            schema = generate_schema(category, columns, size)
+            stub.set_schema(schema)
+            df = pd.DataFrame(columns=schema['columns'])
+            prefix = f"agents/{category}/{size}"
+
+            stub.reset_stats()
+            latencies, hits = [], 0
+            for _ in range(repeats):
+                identified, elapsed = timed(category_agent.execute_task, Task("Identify category", data=df))
+                latencies.append(elapsed)
+                hits += identified == category
+            metrics.update({f"{prefix}/category/{name}": value for name, value in percentiles(latencies).items()})
+            metrics[f"{prefix}/category/accuracy"] = hits / repeats
+            metrics[f"{prefix}/category/prompt_tokens"] = stub.stats['prompt_tokens'] / repeats
+            metrics[f"{prefix}/category/completion_tokens"] = stub.stats['completion_tokens'] / repeats
+
+            modes = [('mapping', False)] + ([('mapping_stream', True)] if stream else [])
+            for mode, streamed in modes:
+                stub.reset_stats()
+                latencies, first_pair, totals = [], [], {'correct': 0, 'predicted': 0, 'expected': 0}
+                for _ in range(repeats):
+                    task_data = {'dataframe': df, 'category': category}
+                    if streamed:
+                        start, seen = time.perf_counter(), []
+                        task_data['on_mapping'] = lambda std_col, input_col: seen.append(time.perf_counter() - start)
+                    mapping, elapsed = timed(mapping_agent.execute_task, Task("Map columns", data=task_data))
+                    latencies.append(elapsed)
+                    if streamed and seen:
+                        first_pair.append(seen[0])
+                    for name, value in accuracy(mapping, schema['truth']).items():
+                        totals[name] += value
+                metrics.update({f"{prefix}/{mode}/{name}": value for name, value in percentiles(latencies).items()})
+                if first_pair:
+                    metrics[f"{prefix}/{mode}/first_pair_p50_ms"] = float(np.percentile(first_pair, 50) * 1000)
+                metrics[f"{prefix}/{mode}/precision"] = totals['correct'] / max(totals['predicted'], 1)
+                metrics[f"{prefix}/{mode}/recall"] = totals['correct'] / max(totals['expected'], 1)
+                metrics[f"{prefix}/{mode}/requests"] = stub.stats['requests'] / repeats
+                metrics[f"{prefix}/{mode}/prompt_tokens"] = stub.stats['prompt_tokens'] / repeats
+                metrics[f"{prefix}/{mode}/completion_tokens"] = stub.stats['completion_tokens'] / repeats
+            progress(f"{prefix}: category p50 {metrics[f'{prefix}/category/p50_ms']:.0f} ms, "
+                     f"mapping p50 {metrics[f'{prefix}/mapping/p50_ms']:.0f} ms, "
+                     f"recall {metrics[f'{prefix}/mapping/recall']:.2f}")
+    return metrics
+
+
+def bench_parse(standard_columns: Dict, sizes: List[int], min_seconds: float = 0.5) -> Dict[str, float]:
+    """
+    Throughput of _parse_mapping_response on model-shaped responses.
+    """
+    from agents.agent_pool import get_mapping_agent
+    mapping_agent = get_mapping_agent()
+    metrics = {}
+    for category, columns in standard_columns.items():
+        for size in sizes:
+            schema = generate_schema(category, columns, size)
+            context = mapping_agent._build_context(schema['columns'], columns, category)
+            response = mapping_response(schema['truth'], schema['columns'], columns['mandatory'] + columns['optional'])
+            iterations, start = 0, time.perf_counter()
+            while time.perf_counter() - start < min_seconds:
+                mapping_agent._parse_mapping_response(response, context)
+                iterations += 1
+            elapsed = time.perf_counter() - start
+            prefix = f"parse/{category}/{size}"
+            metrics[f"{prefix}/responses_per_sec"] = iterations / elapsed
+            metrics[f"{prefix}/pairs_per_sec"] = iterations * len(schema['truth']) / elapsed
+            progress(f"{prefix}: {iterations / elapsed:,.0f} responses/s")
+    return metrics
+
+
+def chunked_run(path: str, output_path: str, mapping: Dict[str, Optional[str]]) -> Dict[str, float]:
+    """
+    Apply a mapping with the chunked engine; meant to run through ``isolated``.
+    """
+    from utils.chunked_mapping_engine import SFNChunkedMappingEngine
+    reset_peak_rss()
+    _, elapsed = timed(SFNChunkedMappingEngine().apply, path, output_path, mapping)
+    os.remove(output_path)
+    return {'chunked_apply_s': elapsed, 'chunked_peak_rss_mb': peak_rss_mb()}
+
+
+def in_memory_run(path: str, file_format: str, mapping: Dict[str, Optional[str]]) -> Dict[str, float]:
+    """
+    Load, relabel and export a file in memory, as Step 4 does; meant to run through ``isolated``.
+    """
+    from utils.mapped_data_exporter import SFNMappedDataExporter, rename_map, renamed_view
+    metrics = {}
+    reset_peak_rss()
+    loader = pd.read_parquet if file_format == 'parquet' else pd.read_csv
+    df, metrics['load_s'] = timed(loader, path)
+    view, metrics['rename_s'] = timed(renamed_view, df, rename_map(mapping))
+    exporter = SFNMappedDataExporter(view)
+    for export_format in ('csv', 'parquet'):
+        output_path, metrics[f'export_{export_format}_s'] = timed(exporter.export, export_format)
+        os.remove(output_path)
+    metrics['in_memory_peak_rss_mb'] = peak_rss_mb()
+    return metrics
+
+
+def bench_export(standard_columns: Dict, rows_list: List[int], formats: List[str], workdir: str,
+                 max_in_memory_rows: int, keep_files: bool = False) -> Dict[str, float]:
+    """
+    Step 4 costs on generated files: load, relabel and export in memory, and the chunked engine.
+    Every run happens in its own process, so its peak RSS is its own.
+    """
+    category = next(iter(standard_columns))
+    schema = generate_schema(category, standard_columns[category], 16, styles=['snake', 'abbreviated', 'spaced'])
+    mapping = schema['truth']
+    os.makedirs(workdir, exist_ok=True)
+    metrics = {}
+    try:
+        for rows in rows_list:
+            for file_format in formats:
+                prefix = f"export/{file_format}/{rows}"
+                path = os.path.join(workdir, f"input_{rows}.{file_format}")
+                _, metrics[f"{prefix}/generate_s"] = timed(write_dataset, path, schema['columns'], rows)
+
+                output_path = os.path.join(workdir, f"chunked_{rows}.{file_format}")
+                chunked = isolated(chunked_run, path, output_path, mapping)
+                metrics.update({f"{prefix}/{name}": value for name, value in chunked.items()})
+                metrics[f"{prefix}/chunked_rows_per_sec"] = rows / chunked['chunked_apply_s']
+
+                if rows <= max_in_memory_rows:
+                    in_memory = isolated(in_memory_run, path, file_format, mapping)
+                    metrics.update({f"{prefix}/{name}": value for name, value in in_memory.items()})
+
+                if not keep_files:
+                    os.remove(path)
+                progress(f"{prefix}: chunked {metrics[f'{prefix}/chunked_apply_s']:.2f} s"
+                         + (f", in-memory csv export {metrics[f'{prefix}/export_csv_s']:.2f} s"
+                            if f'{prefix}/export_csv_s' in metrics else ""))
+    finally:
+        if not keep_files:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return metrics
+
+
+def compare(metrics: Dict[str, float], baseline: Dict[str, float]) -> List[str]:
+    """
+    Percentage change of every metric present in both runs.
+    """
+    lines = []
+    for name in sorted(set(metrics) & set(baseline)):
+        old, new = baseline[name], metrics[name]
+        change = (new - old) / old * 100 if old else 0.0
+        lines.append(f"{name}: {old:.4g} -> {new:.4g} ({change:+.1f}%)")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the mapping agents against a local stub model server.")
+    parser.add_argument("--suites", nargs="+", choices=["agents", "parse", "export"], default=["agents", "parse"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[5, 50, 500, 5000],
+                        help="Number of input columns per synthetic schema")
+    parser.add_argument("--repeats", type=int, default=5, help="Agent calls per schema")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Stub time to first byte")
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--per-token-ms", type=float, default=0, help="Stub delay per generated token")
+    parser.add_argument("--perturb", type=float, default=0.0,
+                        help="Probability that the stub drops, corrupts or fences part of an answer")
+    parser.add_argument("--stream", action="store_true", help="Also measure streamed mapping and time to first pair")
+    parser.add_argument("--rows", nargs="+", type=int, default=[1_000_000], help="Row counts for the export suite")
+    parser.add_argument("--formats", nargs="+", choices=["csv", "parquet"], default=["csv", "parquet"])
+    parser.add_argument("--max-in-memory-rows", type=int, default=10_000_000,
+                        help="Larger files only run through the chunked engine")
+    parser.add_argument("--workdir", default=os.path.join(CACHE_DIR, "benchmarks"))
+    parser.add_argument("--keep-files", action="store_true")
+    parser.add_argument("--output", help="Write the metrics to this JSON file")
+    parser.add_argument("--baseline", help="Compare against metrics from an earlier --output file")
+    args = parser.parse_args(argv)
+
+    stub = SFNStubModelServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                              per_token_ms=args.per_token_ms, perturb=args.perturb).start()
+    # Every agent call goes to the stub: the OpenAI clients read OPENAI_BASE_URL, other providers are dropped
+    os.environ["OPENAI_BASE_URL"] = stub.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ.pop("ANTHROPIC_API_KEY", None)
+    # Measure the model path itself, not the cache or the local category classifier
+    APP_CONFIG["llm_cache"]["enabled"] = False
+    APP_CONFIG["category_classifier"]["enabled"] = False
+
+    from utils.schema_registry import get_schema_registry
+    standard_columns = get_schema_registry().load().standard_columns
+    metrics = {}
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            if "agents" in args.suites:
+                metrics.update(bench_agents(stub, standard_columns, args.sizes, args.repeats, args.stream))
+            if "parse" in args.suites:
+                metrics.update(bench_parse(standard_columns, args.sizes))
+            if "export" in args.suites:
+                metrics.update(bench_export(standard_columns, args.rows, args.formats, args.workdir,
+                                            args.max_in_memory_rows, args.keep_files))
+    finally:
+        stub.stop()
+
+    report = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'args': vars(args), 'metrics': metrics}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Metrics written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['metrics']
+        print("\n".join(compare(metrics, baseline)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+import ast
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from benchmarks.synthetic import mapping_response
+
+PROMPT_LISTS = {
+    'input_columns': re.compile(r"Input columns: (\[.*?\])\n"),
+    'mandatory': re.compile(r"Mandatory: (\[.*?\])\n"),
+    'optional': re.compile(r"Optional: (\[.*?\])\n")
+}
+
+
+class SFNStubModelServer:
+    """
+    Local OpenAI-compatible chat completions server for benchmarks.
+
+    Answers category and column mapping prompts from the ground truth of the schema currently
+    under test (see ``set_schema``), after a configurable latency. Responses are exact
+    ("canned") or randomly perturbed, and ``stream=True`` requests are answered as
+    server-sent events. Setting ``error_status`` (e.g. 503 or 400) makes every request fail
+    with that HTTP status instead, for exercising retries and circuit breakers. Token counts are estimated per request and kept in ``stats``.
+    Point the agents at it with ``OPENAI_BASE_URL=<server.base_url>``.
+    """
+
+    def __init__(self, latency_ms: float = 200, jitter_ms: float = 50, per_token_ms: float = 0,
+                 perturb: float = 0.0, chars_per_token: int = 4, seed: int = 0,
+                 error_status: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.per_token_ms = per_token_ms
+        self.perturb = perturb
+        self.chars_per_token = chars_per_token
+        self.error_status = error_status
+        self.schema = None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset_stats()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/v1"
+
+    def start(self) -> 'SFNStubModelServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def set_schema(self, schema: Dict):
+        """Use this schema's category and ground-truth mapping for the following requests."""
+        self.schema = schema
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+    def answer(self, user_prompt: str) -> str:
+        """
+        Build the response text for a prompt.
+
+        :param user_prompt: Rendered user prompt sent by an agent
+        :return: Category name or JSON mapping
+        """
+        lists = {}
+        for name, pattern in PROMPT_LISTS.items():
+            match = pattern.search(user_prompt)
+            lists[name] = ast.literal_eval(match.group(1)) if match else None
+
+        if lists['input_columns'] is None or lists['mandatory'] is None:
+            category = self.schema['category']
+            with self._lock:
+                perturbed = self.perturb and self._rng.random() < self.perturb
+            return f"The category is {category.capitalize()}." if perturbed else category
+
+        with self._lock:
+            rng = random.Random(self._rng.random())
+        return mapping_response(
+            self.schema['truth'], lists['input_columns'], lists['mandatory'] + (lists['optional'] or []),
+            perturb=self.perturb, rng=rng
+        )
+
+    def _record(self, prompt: str, completion: str) -> Dict:
+        usage = {'prompt_tokens': len(prompt) // self.chars_per_token,
+                 'completion_tokens': len(completion) // self.chars_per_token}
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['prompt_tokens'] += usage['prompt_tokens']
+            self.stats['completion_tokens'] += usage['completion_tokens']
+        return usage
+
+    def _delay(self):
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(self.latency_ms + jitter, 0) / 1000)
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                if stub.error_status is not None:
+                    with stub._lock:
+                        stub.stats['requests'] += 1
+                    stub._delay()
+                    self._error(stub.error_status)
+                    return
+                messages = body.get('messages', [])
+                user_prompt = messages[-1]['content'] if messages else ''
+                content = stub.answer(user_prompt)
+                usage = stub._record(''.join(message['content'] for message in messages), content)
+                stub._delay()
+                if body.get('stream'):
+                    include_usage = (body.get('stream_options') or {}).get('include_usage', False)
+                    self._stream(body['model'], content, usage if include_usage else None)
+                else:
+                    self._respond(body['model'], content, usage)
+
+            def _respond(self, model: str, content: str, usage: Dict):
+                payload = json.dumps({
+                    'id': 'stub', 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                                 'finish_reason': 'stop'}],
+                    'usage': usage
+                }).encode()
+                if stub.per_token_ms:
+                    time.sleep(len(content) / stub.chars_per_token * stub.per_token_ms / 1000)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _error(self, status: int):
+                payload = json.dumps({'error': {'message': f"stub error {status}", 'type': 'stub_error',
+                                                'code': status}}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, model: str, content: str, usage: Optional[Dict] = None):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                for piece in self._pieces(content):
+                    chunk = {'id': 'stub', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                             'model': model,
+                             'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    if stub.per_token_ms:
+                        time.sleep(stub.per_token_ms / 1000)
+                if usage is not None:
+                    # Like the OpenAI API: a final chunk without choices carries the usage
+                    chunk = {'id': 'stub', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                             'model': model, 'choices': [], 'usage': usage}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+            @staticmethod
+            def _pieces(content: str) -> List[str]:
+                size = stub.chars_per_token
+                return [content[start:start + size] for start in range(0, len(content), size)]
+
+        return Handler
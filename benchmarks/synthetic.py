@@ -0,0 +1,160 @@
+import json
+import os
+import random
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from utils.column_matcher import tokenize_column_name
+
+# Abbreviations a real export might use for standard column tokens
+ABBREVIATIONS = {
+    'customer': 'cust', 'identifier': 'id', 'revenue': 'rev', 'product': 'prod', 'quantity': 'qty',
+    'number': 'num', 'date': 'dt', 'contract': 'ctr', 'licenses': 'lic', 'subaccount': 'subacct',
+    'pricing': 'price', 'discount': 'disc', 'resolution': 'res', 'escalation': 'esc',
+    'satisfaction': 'csat', 'ticket': 'tkt', 'status': 'stat', 'priority': 'prio', 'feature': 'feat'
+}
+
+NOISE_STEMS = ['notes', 'internal_flag', 'region_code', 'batch_ref', 'sync_ts', 'legacy_key', 'extra_field', 'tag']
+
+
+def column_variant(std_col: str, style: str, index: int) -> str:
+    """
+    Render a standard column name the way a source system might export it.
+
+    :param std_col: Standard column name
+    :param style: One of 'exact', 'snake', 'spaced', 'abbreviated', 'prefixed' or 'cryptic'
+    :param index: Position of the column, used to keep cryptic names unique
+    :return: Input column name
+    """
+    tokens = tokenize_column_name(std_col)
+    if style == 'exact':
+        return std_col
+    if style == 'snake':
+        return '_'.join(tokens)
+    if style == 'spaced':
+        return ' '.join(token.capitalize() for token in tokens)
+    if style == 'abbreviated':
+        return '_'.join(ABBREVIATIONS.get(token, token) for token in tokens)
+    if style == 'prefixed':
+        return 'src_' + '_'.join(tokens)
+    return f"c{index}"
+
+
+def generate_schema(category: str, standard_columns: Dict[str, List[str]], num_columns: int,
+                    seed: int = 0, styles: Optional[List[str]] = None) -> Dict:
+    """
+    Build a synthetic input schema with a known ground-truth mapping.
+
+    Every mandatory column and a random share of optional columns appear under a randomly styled
+    name; the rest of the schema is unmappable noise.
+
+    :param category: Category the schema belongs to
+    :param standard_columns: Dictionary with the category's 'mandatory' and 'optional' columns
+    :param num_columns: Total number of input columns
+    :param seed: Random seed, so runs are comparable
+    :param styles: Name styles to draw from
+    :return: Dictionary with 'category', 'columns' and 'truth' (standard column -> input column or None)
+    """
+    rng = random.Random(f"{category}-{num_columns}-{seed}")
+    styles = styles or ['exact', 'snake', 'spaced', 'abbreviated', 'prefixed', 'cryptic']
+    optional = [col for col in standard_columns['optional'] if rng.random() < 0.7]
+    present = (standard_columns['mandatory'] + optional)[:num_columns]
+
+    truth = {col: None for col in standard_columns['mandatory'] + standard_columns['optional']}
+    columns = []
+    for std_col in present:
+        input_col = column_variant(std_col, rng.choice(styles), len(columns))
+        if input_col in columns:
+            input_col = column_variant(std_col, 'cryptic', len(columns))
+        truth[std_col] = input_col
+        columns.append(input_col)
+
+    noise_index = 0
+    while len(columns) < num_columns:
+        columns.append(f"{rng.choice(NOISE_STEMS)}_{noise_index}")
+        noise_index += 1
+
+    rng.shuffle(columns)
+    return {'category': category, 'columns': columns, 'truth': truth}
+
+
+def mapping_response(truth: Dict[str, Optional[str]], input_columns: List[str], standard_columns: List[str],
+                     perturb: float = 0.0, rng: Optional[random.Random] = None) -> str:
+    """
+    Render the JSON answer a perfect model would give, optionally perturbed.
+
+    With ``perturb`` > 0 each pair is, with that probability, dropped to null or pointed at a wrong
+    input column, and the JSON may be wrapped in a markdown fence like real completions often are.
+
+    :param truth: Ground truth of standard column -> input column (for any number of schemas)
+    :param input_columns: Input columns offered in the prompt
+    :param standard_columns: Standard columns offered in the prompt
+    :param perturb: Probability of perturbing each pair
+    :param rng: Random generator
+    :return: Response text
+    """
+    rng = rng or random.Random(0)
+    offered = set(input_columns)
+    mapping = {}
+    for std_col in standard_columns:
+        input_col = truth.get(std_col)
+        input_col = input_col if input_col in offered else None
+        if perturb and rng.random() < perturb:
+            input_col = None if input_col is not None or not input_columns else rng.choice(input_columns)
+        mapping[std_col] = input_col
+    text = json.dumps(mapping, indent=2)
+    if perturb and rng.random() < perturb:
+        text = f"```json\n{text}\n```"
+    return text
+
+
+def write_dataset(path: str, columns: List[str], rows: int, chunk_rows: int = 1_000_000, seed: int = 0) -> str:
+    """
+    Write a synthetic CSV or Parquet file chunk by chunk, so any row count fits in memory.
+
+    Column values cycle through ID, date, amount and status types, so parsing and export
+    costs resemble real billing and support extracts.
+
+    :param path: Output file; the format follows the extension
+    :param columns: Column names to write
+    :param rows: Number of rows
+    :param chunk_rows: Rows generated per chunk
+    :param seed: Random seed
+    :return: The path written
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    rng = np.random.default_rng(seed)
+    statuses = np.array(['Open', 'closed', 'PENDING', 'Resolved'])
+    writer = None
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    try:
+        for start in range(0, rows, chunk_rows):
+            size = min(chunk_rows, rows - start)
+            data = {}
+            for index, col in enumerate(columns):
+                kind = index % 4
+                if kind == 0:
+                    data[col] = np.arange(start, start + size, dtype=np.int64)
+                elif kind == 1:
+                    days = rng.integers(0, 3650, size)
+                    data[col] = (np.datetime64('2015-01-01') + days).astype(str)
+                elif kind == 2:
+                    data[col] = np.round(rng.random(size) * 10000, 2)
+                else:
+                    data[col] = statuses[rng.integers(0, len(statuses), size)]
+            table = pa.Table.from_pandas(pd.DataFrame(data), preserve_index=False)
+            if path.endswith('.parquet'):
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            else:
+                if writer is None:
+                    writer = open(path, 'wb')
+                pacsv.write_csv(table, writer, write_options=pacsv.WriteOptions(include_header=start == 0))
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
@@ -0,0 +1,186 @@
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../'))
+CACHE_DIR = os.path.join(PROJECT_ROOT, '.cache')
+
+APP_CONFIG = {
+    "llm_cache": {
+        "enabled": True,
+        "path": os.path.join(CACHE_DIR, "llm_cache.sqlite3"),
+        "max_entries": 5000,
+        "ttl_seconds": 7 * 24 * 60 * 60
+    },
+    "mapping_registry": {
+        "enabled": True,
+        "path": os.path.join(CACHE_DIR, "mapping_registry.sqlite3"),
+        # Minimum Jaccard overlap of normalized column sets for a near match
+        "similarity_threshold": 0.7
+    },
+    "batch": {
+        # Number of files processed (and LLM calls in flight) at the same time
+        "max_workers": 8,
+        "file_types": ["csv", "xlsx", "json", "parquet"]
+    },
+    "pre_matcher": {
+        "enabled": True,
+        "synonyms_path": os.path.join(PROJECT_ROOT, "config", "column_synonyms_config.json"),
+        # Minimum score for a local match to be locked in without asking the LLM
+        "threshold": 0.9
+    },
+    "wide_schema": {
+        # Input columns are split into batches of roughly this many prompt tokens
+        "max_input_tokens_per_batch": 2000,
+        "chars_per_token": 4,
+        # Batches mapped concurrently
+        "max_workers": 4
+    },
+    "lazy_loading": {
+        # Steps 1-3 work on the header and this many rows; the full file is read in Step 4
+        "enabled": True,
+        "sample_rows": 1000
+    },
+    "chunked_engine": {
+        # Rows per chunk when applying a mapping out of core; bounds peak memory
+        "chunk_size": 100000
+    },
+    "export": {
+        # Rows written per slice when streaming an export to disk
+        "chunk_rows": 100000,
+        # Step 4 download files; ones older than max_age_seconds (abandoned sessions) are swept
+        "dir": os.path.join(CACHE_DIR, "exports"),
+        "max_age_seconds": 24 * 60 * 60
+    },
+    "normalization": {
+        # Coerce mapped standard columns to the types in column_types_config.json after the rename
+        # (batch mapper default; --no-normalize turns it off)
+        "enabled": True,
+        # Initial state of the app's normalization checkbox; normalizing holds a typed copy of
+        # every mapped column next to the loaded data, so the app leaves it off by default
+        "app_default": False,
+        "types_path": os.path.join(PROJECT_ROOT, "config", "column_types_config.json"),
+        # Rows coerced per slice
+        "chunk_rows": 100000,
+        # Each datetime column is parsed with the one format that parses most of a sample of
+        # datetime_sample_rows values (ties go to the earlier format); other values count as failures
+        "datetime_formats": ["ISO8601", "%m/%d/%Y", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d.%m.%Y",
+                             "%m/%d/%Y %H:%M", "%m/%d/%Y %H:%M:%S", "%d %b %Y", "%b %d, %Y", "%Y%m%d"],
+        "datetime_sample_rows": 1000,
+        # Read '15%' as 0.15; otherwise percentages count as failures of decimal and integer columns
+        "percent_as_fraction": False,
+        # Categorical targets with more distinct values than this share of rows stay strings
+        "max_category_ratio": 0.5
+    },
+    "schema_registry": {
+        # Target schemas: the base config plus one JSON file per team or domain in schemas_dir
+        "standard_columns_path": os.path.join(PROJECT_ROOT, "config", "standard_columns_config.json"),
+        "schemas_dir": os.path.join(PROJECT_ROOT, "config", "schemas"),
+        # Character n-gram size and hashed vector width of the standard column similarity index
+        "ngram_size": 3,
+        "ngram_dimensions": 512,
+        # Categories with at least this many standard columns left after pre-matching only offer
+        # the mandatory columns plus the top_k most similar optional columns per input column
+        "prune_above_columns": 40,
+        "top_k": 3,
+        # Inputs below this n-gram similarity to every standard column (e.g. 'c17') disable pruning
+        "min_similarity": 0.25,
+        # Categories listed in the category and combined prompts, best matches first
+        "max_prompt_categories": 12
+    },
+    "category_classifier": {
+        # Answer Step 2 locally from column-name tokens and ask the LLM only when unsure
+        "enabled": True,
+        # Schemas users confirmed a category for, used as training data
+        "path": os.path.join(CACHE_DIR, "category_classifier.sqlite3"),
+        # Posterior probability the best category needs before the LLM is skipped
+        "confidence_threshold": 0.95,
+        # Share of input columns with at least one token the classifier has seen
+        "min_coverage": 0.25,
+        # Whole column names the best category has seen and the runner-up has not; generic names
+        # shared by several categories (CustomerID, Date, Status) are no evidence on their own
+        "min_name_matches": 2,
+        # Laplace smoothing of the token counts
+        "alpha": 1.0
+    },
+    "service": {
+        # Local HTTP mapping service (python mapping_service.py)
+        "host": "127.0.0.1",
+        "port": 8765,
+        # Schemas mapped concurrently, and schemas allowed to wait for a worker before 503s
+        "max_workers": 8,
+        "max_queue": 32,
+        "request_timeout_seconds": 120,
+        "retry_after_seconds": 2,
+        "max_body_bytes": 10 * 1024 * 1024
+    },
+    "profiling": {
+        # Fingerprint input columns on a row sample and show the profiles to the category and mapping prompts
+        "enabled": True,
+        # Rows looked at per file, whatever the file size
+        "sample_rows": 1000,
+        "example_values": 3,
+        # Share of sample values that must parse for a column to be profiled as numeric or datetime
+        "type_threshold": 0.9,
+        # Text columns with at most this share of distinct values are profiled as categorical
+        "categorical_ratio": 0.05,
+        # The category prompt only carries profiles for schemas up to this many columns
+        "max_category_columns": 200,
+        # Files whose profiles are kept in memory
+        "cache_entries": 64,
+        # Share of non-null values a mandatory column's input needs to count as populated
+        "min_populated_rate": 0.5
+    },
+    "review": {
+        # Step 3 switches to the paginated table editor at this many input columns
+        "wide_schema_columns": 200,
+        "page_size": 50
+    },
+    "streaming": {
+        # Stream the Step 3 mapping completion and show pairs as they arrive
+        "enabled": True
+    },
+    "llm_router": {
+        # Route agent LLM calls through the hedged multi-provider router
+        "enabled": True,
+        "deadline_seconds": 30,
+        # Fire a second request at the next provider when the first is slower than this; None disables hedging
+        "hedge_delay_seconds": 4,
+        "max_retries": 2,
+        "backoff_base_seconds": 0.5,
+        "backoff_max_seconds": 4,
+        "breaker_failure_threshold": 5,
+        "breaker_cooldown_seconds": 30,
+        "max_workers": 16,
+        # Tried in order; providers whose API key is not set are skipped. Any OpenAI-compatible
+        # endpoint works, including local stub servers (set base_url, e.g. http://127.0.0.1:8000/v1).
+        # model None uses the agent's model from MODEL_CONFIG.
+        "providers": [
+            {"name": "openai", "prompt_provider": "openai", "model": None, "base_url": None,
+             "api_key_env": "OPENAI_API_KEY"},
+            {"name": "anthropic", "prompt_provider": "anthropic", "model": "claude-3-5-haiku-latest",
+             "base_url": "https://api.anthropic.com/v1/", "api_key_env": "ANTHROPIC_API_KEY"}
+        ]
+    },
+    "metrics": {
+        # Timing spans and counters for data load, prompts, LLM calls, parsing, rename and export
+        "enabled": True,
+        # Any of "jsonl" (one event per line) and "prometheus" (aggregated text format)
+        "sinks": ["jsonl", "prometheus"],
+        "jsonl_path": os.path.join(CACHE_DIR, "metrics.jsonl"),
+        # Events are written in batches by a background thread; the file is rotated past
+        # jsonl_max_bytes, keeping jsonl_backup_count older files (metrics.jsonl.1, ...)
+        "jsonl_flush_interval_seconds": 1,
+        "jsonl_max_bytes": 10 * 1024 * 1024,
+        "jsonl_backup_count": 3,
+        "prometheus_path": os.path.join(CACHE_DIR, "metrics.prom"),
+        "flush_interval_seconds": 5,
+        # Events kept in memory for the in-app diagnostics panel
+        "recent_events": 500
+    },
+    "speculative_mapping": {
+        # Map the likeliest categories while the category is being identified; trades up to
+        # max_categories extra mapping calls per upload for latency, so it is opt-in
+        "enabled": False,
+        # Categories mapped ahead of confirmation, best matches to the column names first
+        "max_categories": 3
+    }
+}
@@ -14,4 +14,12 @@ MODEL_CONFIG["column_mapper"] = {
     "max_tokens": 500,
     "n": 1,
     "stop": None
-}
\ No newline at end of file
+}
+
+MODEL_CONFIG["combined_mapper"] = {
+    "model": "gpt-4o-mini", #"gpt-3.5-turbo",
+    "temperature": 0.7,
+    "max_tokens": 500,
+    "n": 1,
+    "stop": None
+}
@@ -0,0 +1,291 @@
+import argparse
+import hashlib
+import json
+import socket
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+from sfn_blueprint import Task, setup_logger
+from agents.agent_pool import get_category_agent, get_mapping_agent
+from config.app_config import APP_CONFIG
+from utils.mapping_registry import SFNMappingRegistry
+from utils.metrics import get_metrics, record_mapping_stats
+from utils.request_coalescer import SFNRequestCoalescer
+
+
+class SFNServiceBusy(RuntimeError):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class SFNServiceHTTPServer(ThreadingHTTPServer):
+    """
+    Threading HTTP server with a listen backlog sized for bursts.
+
+    The socketserver default backlog of 5 makes the kernel reset connections as soon as
+    a handful of clients connect at once, before any request reaches the service's own
+    admission control (coalescing, then 503 with Retry-After).
+    """
+
+    request_queue_size = socket.SOMAXCONN
+    daemon_threads = True
+
+
+def schema_fingerprint(columns: List[str], category: Optional[str] = None) -> str:
+    """
+    Fingerprint a request by its exact column names and requested category.
+
+    Unlike the registry fingerprint, names are not normalized: the mapping returned
+    refers to the caller's column names, so only identical schemas may share it.
+    """
+    payload = json.dumps({'columns': list(columns), 'category': category})
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SFNMappingService:
+    """
+    Local HTTP service that identifies the category and maps the columns of a schema.
+
+    ``POST /v1/map`` takes ``{"columns": [...], "sample": [...], "category": "..."}``, where
+    the optional sample is a list of rows (lists aligned with the columns, or records) used
+    for column profiling, and returns the category, mapping and mapping statistics.
+    ``GET /healthz`` reports the worker pool state.
+
+    Requests run on a bounded worker pool. Concurrent requests with the same schema
+    fingerprint share one in-flight run, so a burst of identical pipeline runs costs one
+    set of LLM calls; the first request's sample is the one profiled. When all workers are
+    busy and ``max_queue`` runs are waiting, new schemas are refused with 503 and a
+    Retry-After header instead of queueing without bound. All runs share the pooled agents
+    and therefore one OpenAI client and its HTTP connection pool.
+    """
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, max_workers: Optional[int] = None,
+                 max_queue: Optional[int] = None, use_registry: bool = True):
+        self.config = APP_CONFIG["service"]
+        self.max_workers = max_workers or self.config["max_workers"]
+        self.max_queue = max_queue if max_queue is not None else self.config["max_queue"]
+        self.category_agent = get_category_agent()
+        self.mapping_agent = get_mapping_agent()
+        self.registry = SFNMappingRegistry(enabled=None if use_registry else False)
+        self.coalescer = SFNRequestCoalescer()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='mapping-service')
+        # One slot per running or waiting run; a request that cannot take a slot is refused
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self.logger, _ = setup_logger()
+        self.metrics = get_metrics()
+        self._server = SFNServiceHTTPServer((host or self.config["host"],
+                                             port if port is not None else self.config["port"]),
+                                            self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'SFNMappingService':
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.metrics.flush()
+
+    def submit(self, df: pd.DataFrame, category: Optional[str] = None) -> Tuple[Future, bool]:
+        """
+        Start a mapping run, or join the in-flight run for the same schema.
+
+        :param df: The caller's columns, with the sample rows if any
+        :param category: Category to use instead of identifying it
+        :return: Tuple of (future resolving to the result, coalesced), where coalesced is True
+                 when the request joined a run started by another request
+        :raises SFNServiceBusy: When the worker pool and its wait queue are full
+        """
+        def start() -> Future:
+            if not self._slots.acquire(blocking=False):
+                raise SFNServiceBusy("All workers are busy; retry later")
+            future = self.executor.submit(self.map_schema, df, category)
+            future.add_done_callback(lambda _: self._slots.release())
+            return future
+
+        future, leader = self.coalescer.submit(schema_fingerprint(df.columns.tolist(), category), start)
+        return future, not leader
+
+    def map_schema(self, df: pd.DataFrame, category: Optional[str] = None) -> Dict:
+        """
+        Identify the category of a schema and map its columns.
+
+        :param df: The caller's columns, with the sample rows if any
+        :param category: Category to use instead of identifying it
+        :return: Dictionary with 'category', 'mapping', 'mapping_source' and 'stats';
+                 'mapping' is None (with a 'reason') for categories without standard columns
+        """
+        columns = df.columns.tolist()
+        result = {'category': category, 'schema_version': self.mapping_agent.schemas.version}
+        registry_match = None
+        if category is None:
+            registry_match = self.registry.lookup(columns)
+            if registry_match is not None:
+                category = registry_match['category']
+            else:
+                category = self.category_agent.execute_task(Task("Identify category", data=df))
+            result['category'] = category
+
+        if category not in self.mapping_agent.standard_columns:
+            return {**result, 'mapping': None, 'reason': f"No standard columns for category '{category}'"}
+
+        if registry_match is None or registry_match['category'] != category:
+            registry_match = self.registry.lookup(columns, category)
+        if registry_match is not None and registry_match['exact']:
+            mapping = registry_match['mapping']
+            result['mapping_source'] = 'registry'
+        else:
+            task_data = {'dataframe': df, 'category': category}
+            if registry_match is not None:
+                task_data['base_mapping'] = registry_match['mapping']
+                task_data['delta_columns'] = registry_match['delta_columns']
+                result['mapping_source'] = 'registry+llm'
+            else:
+                result['mapping_source'] = 'llm'
+            mapping = self.mapping_agent.execute_task(Task("Map columns", data=task_data))
+
+        result['mapping'] = mapping
+        result['stats'] = self.mapping_agent.get_mapping_stats(mapping, input_columns=columns, category=category)
+        record_mapping_stats(result['stats'], category=category, source=result['mapping_source'])
+        return result
+
+    def handle_map(self, payload) -> Tuple[int, Dict]:
+        """
+        Validate a /v1/map payload and wait for its result.
+
+        :param payload: Decoded JSON request body
+        :return: Tuple of (HTTP status, response body)
+        """
+        if not isinstance(payload, dict) or not isinstance(payload.get('columns'), list) or not payload['columns']:
+            return 400, {'error': "'columns' must be a non-empty list of column names"}
+        columns = [str(col) for col in payload['columns']]
+        sample = payload.get('sample') or []
+        try:
+            if not isinstance(sample, list):
+                raise ValueError("not a list")
+            df = pd.DataFrame.from_records(sample, columns=columns)
+        except (TypeError, ValueError) as e:
+            return 400, {'error': f"'sample' must be a list of rows matching the columns: {e}"}
+        category = payload.get('category')
+        if category is not None and not isinstance(category, str):
+            return 400, {'error': "'category' must be a string"}
+        if category is not None and category not in self.mapping_agent.standard_columns:
+            return 400, {'error': f"Invalid category: {category}"}
+
+        try:
+            future, coalesced = self.submit(df, category)
+        except SFNServiceBusy as e:
+            self.metrics.increment('service_requests', result='rejected')
+            return 503, {'error': str(e)}
+        self.metrics.increment('service_requests', result='coalesced' if coalesced else 'started')
+        try:
+            result = future.result(timeout=self.config["request_timeout_seconds"])
+        except TimeoutError:
+            self.metrics.increment('service_errors', reason='timeout')
+            return 504, {'error': "Mapping did not finish in time"}
+        except Exception as e:
+            self.metrics.increment('service_errors', reason='failed')
+            self.logger.error(f"Mapping request failed: {e}")
+            return 500, {'error': str(e)}
+        return 200, {**result, 'coalesced': coalesced}
+
+    def health(self) -> Dict:
+        return {
+            'status': 'ok',
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'in_flight': self.coalescer.in_flight()
+        }
+
+    def _handler_class(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == '/healthz':
+                    self._respond(200, service.health())
+                else:
+                    self._respond(404, {'error': f"Unknown path: {self.path}"})
+
+            def do_POST(self):
+                if self.path != '/v1/map':
+                    self._respond(404, {'error': f"Unknown path: {self.path}"})
+                    return
+                try:
+                    length = int(self.headers.get('Content-Length') or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    self.close_connection = True
+                    self._respond(400, {'error': "Invalid Content-Length header"})
+                    return
+                if length > service.config["max_body_bytes"]:
+                    self.close_connection = True
+                    self._respond(413, {'error': "Request body too large"})
+                    return
+                try:
+                    payload = json.loads(self.rfile.read(length) or b'null')
+                except ValueError:
+                    self._respond(400, {'error': "Request body must be JSON"})
+                    return
+                with service.metrics.span('service_request'):
+                    status, body = service.handle_map(payload)
+                self._respond(status, body)
+
+            def _respond(self, status: int, body: Dict):
+                payload = json.dumps(body, default=str).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                if status == 503:
+                    self.send_header('Retry-After', str(service.config["retry_after_seconds"]))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve category identification and column mapping over HTTP.")
+    parser.add_argument("--host", default=APP_CONFIG["service"]["host"])
+    parser.add_argument("-p", "--port", type=int, default=APP_CONFIG["service"]["port"])
+    parser.add_argument("-w", "--workers", type=int, default=APP_CONFIG["service"]["max_workers"],
+                        help="Maximum number of schemas mapped concurrently")
+    parser.add_argument("-q", "--queue", type=int, default=APP_CONFIG["service"]["max_queue"],
+                        help="Schemas allowed to wait for a worker before requests are refused with 503")
+    parser.add_argument("--no-registry", action="store_true", help="Do not reuse confirmed mappings")
+    args = parser.parse_args(argv)
+
+    service = SFNMappingService(host=args.host, port=args.port, max_workers=args.workers,
+                                max_queue=args.queue, use_registry=not args.no_registry)
+    print(f"Mapping service listening on {service.base_url}")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,11 +7,12 @@ setup(
     install_requires=[
         "openai",
         "pandas",
+        "pyarrow",
         "streamlit",
         "python-dotenv",
         "sfn-blueprint"
     ],
     author="StepFN AI",
     description="A mapping agent for data column categorization and mapping",
-    python_requires=">=3.8",
+    python_requires=">=3.9",
 ) 
\ No newline at end of file
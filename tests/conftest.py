@@ -0,0 +1,60 @@
+import os
+import pytest
+from config.app_config import APP_CONFIG
+
+
+@pytest.fixture(autouse=True, scope="session")
+def isolated_state(tmp_path_factory):
+    """Keep caches, registries and metrics of the test run out of the project's .cache directory."""
+    state_dir = tmp_path_factory.mktemp("state")
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    APP_CONFIG["llm_cache"]["enabled"] = False
+    APP_CONFIG["mapping_registry"]["path"] = str(state_dir / "mapping_registry.sqlite3")
+    APP_CONFIG["category_classifier"]["path"] = str(state_dir / "category_classifier.sqlite3")
+    APP_CONFIG["metrics"]["jsonl_path"] = str(state_dir / "metrics.jsonl")
+    APP_CONFIG["metrics"]["prometheus_path"] = str(state_dir / "metrics.prom")
+    APP_CONFIG["export"]["dir"] = str(state_dir / "exports")
+    yield state_dir
+
+
+@pytest.fixture
+def stub_server():
+    """Start local stub model servers; every server started through the factory is stopped afterwards."""
+    from benchmarks.stub_server import SFNStubModelServer
+    servers = []
+
+    def start(**kwargs):
+        server = SFNStubModelServer(**kwargs).start()
+        server.set_schema({'category': 'billing'})
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def route_to_stub():
+    """Point agents' LLM router at a stub server; the agents' own routers are restored afterwards."""
+    import openai
+    from utils.llm_router import SFNLLMProvider, SFNLLMRouter
+    swapped = []
+
+    def route(servers, *agents):
+        # One provider per server, tried in order
+        servers = servers if isinstance(servers, list) else [servers]
+        providers = [
+            SFNLLMProvider(f"stub{index}", openai.OpenAI(api_key="test-key", base_url=server.base_url, max_retries=0))
+            for index, server in enumerate(servers)
+        ]
+        config = {**APP_CONFIG["llm_router"], "max_retries": 0, "hedge_delay_seconds": None}
+        router = SFNLLMRouter(providers=providers, config=config)
+        for agent in agents:
+            swapped.append((agent, agent.router))
+            agent.router = router
+        return router
+
+    yield route
+    for agent, router in reversed(swapped):
+        agent.router = router
@@ -0,0 +1,52 @@
+import json
+import os
+import threading
+import time
+from agents.agent_pool import get_category_agent, get_combined_agent, get_mapping_agent, get_speculative_agent
+from utils.shared_resources import get_shared, load_json_config
+
+
+def test_agents_are_shared_across_callers():
+    mapping_agent, category_agent = get_mapping_agent(), get_category_agent()
+
+    assert get_mapping_agent() is mapping_agent
+    assert get_category_agent() is category_agent
+    for composite in (get_speculative_agent(), get_combined_agent()):
+        assert composite.mapping_agent is mapping_agent
+        assert composite.category_agent is category_agent
+
+
+def test_concurrent_first_use_builds_one_instance():
+    built = []
+
+    def factory():
+        time.sleep(0.05)
+        built.append(object())
+        return built[-1]
+
+    instances = [None] * 8
+
+    def fetch(index):
+        instances[index] = get_shared('test_pool_instance', factory)
+
+    threads = [threading.Thread(target=fetch, args=(index,)) for index in range(len(instances))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+    assert all(instance is built[0] for instance in instances)
+
+
+def test_config_files_are_reloaded_only_when_they_change(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({'version': 1}))
+
+    first = load_json_config(str(path))
+    assert load_json_config(str(path)) is first
+
+    path.write_text(json.dumps({'version': 2}))
+    mtime = os.path.getmtime(path) + 1
+    os.utime(path, (mtime, mtime))
+    assert load_json_config(str(path)) == {'version': 2}
@@ -0,0 +1,58 @@
+import pytest
+from utils.category_classifier import SFNCategoryClassifier
+
+BILLING = ['invoice_date', 'invoice_amount', 'sku', 'currency', 'customer_id']
+
+
+@pytest.fixture
+def classifier(tmp_path):
+    return SFNCategoryClassifier(path=str(tmp_path / "classifier.sqlite3"), confidence_threshold=0.95,
+                                 min_coverage=0.25, min_name_matches=2, enabled=True)
+
+
+def test_distinctive_names_are_classified_locally(classifier):
+    prediction = classifier.predict(BILLING)
+    assert prediction['category'] == 'billing' and prediction['confident']
+    assert classifier.classify(['ticket_id', 'ticket_open_date', 'current_status', 'customer_id']) == 'support'
+
+
+@pytest.mark.parametrize('columns,gate', [
+    # Names shared by several categories are no evidence for one of them
+    (['CustomerID', 'Date', 'Status'], 'name_matches'),
+    # Two known names among many unknown ones
+    (['invoice_date', 'invoice_amount'] + [f"x{index}" for index in range(10)], 'coverage'),
+    (['foo', 'bar'], 'category'),
+])
+def test_unsure_predictions_are_left_to_the_llm(classifier, columns, gate):
+    prediction = classifier.predict(columns)
+    assert not prediction['confident']
+    assert classifier.classify(columns) is None
+    if gate == 'name_matches':
+        assert prediction['name_matches'] < classifier.min_name_matches
+    elif gate == 'coverage':
+        assert prediction['confidence'] >= classifier.confidence_threshold
+        assert prediction['coverage'] < classifier.min_coverage
+    else:
+        assert prediction['category'] is None
+
+
+def test_confirmed_schemas_are_learned_and_relabelled(classifier, tmp_path):
+    columns = ['zeta_meter', 'zeta_reading', 'zeta_window']
+    assert classifier.classify(columns) is None
+
+    classifier.learn(columns, 'usage')
+    classifier.learn(columns + ['zeta_region'], 'usage')
+    assert classifier.classify(columns) == 'usage'
+
+    # A re-confirmed schema replaces its label instead of counting twice; the store survives a restart
+    classifier.learn(columns, 'billing')
+    reloaded = SFNCategoryClassifier(path=classifier.path, enabled=True)
+    assert reloaded._learned_schemas == classifier._learned_schemas == {'usage': 1, 'billing': 1}
+
+    classifier.learn(columns, 'none of these')
+    assert classifier._learned_schemas == {'usage': 1, 'billing': 1}
+
+
+def test_disabled_classifier_predicts_nothing(tmp_path):
+    classifier = SFNCategoryClassifier(path=str(tmp_path / "classifier.sqlite3"), enabled=False)
+    assert classifier.classify(BILLING) is None
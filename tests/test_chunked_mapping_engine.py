@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+from utils.chunked_mapping_engine import SFNChunkedMappingEngine
+
+MAPPING = {'CustomerID': 'cust', 'BillingDate': 'date', 'Revenue': 'amount', 'Currency': None}
+
+
+@pytest.fixture
+def source():
+    return pd.DataFrame({
+        'amount': [index + 0.5 for index in range(35)],
+        'notes': ['unused'] * 35,
+        'cust': [f"C{index}" for index in range(35)],
+        'date': ['2024-01-01'] * 35,
+    })
+
+
+@pytest.mark.parametrize('input_format,output_format', [('csv', 'parquet'), ('parquet', 'csv'), ('csv', 'csv')])
+def test_mapped_columns_are_written_chunk_by_chunk(tmp_path, source, input_format, output_format):
+    input_path, output_path = str(tmp_path / f"in.{input_format}"), str(tmp_path / "out" / f"mapped.{output_format}")
+    if input_format == 'csv':
+        source.to_csv(input_path)
+    else:
+        source.to_parquet(input_path)
+
+    result = SFNChunkedMappingEngine(chunk_size=10).apply(input_path, output_path, MAPPING)
+
+    assert (result['rows'], result['chunks']) == (35, 4)
+    assert result['columns'] == ['CustomerID', 'BillingDate', 'Revenue']
+    written = pd.read_parquet(output_path) if output_format == 'parquet' else pd.read_csv(output_path)
+    expected = source[['cust', 'date', 'amount']].set_axis(result['columns'], axis=1)
+    pd.testing.assert_frame_equal(written, expected)
+
+
+def test_integers_that_gain_nulls_in_a_later_chunk_stay_integers(tmp_path):
+    input_path, output_path = str(tmp_path / "in.csv"), str(tmp_path / "mapped.parquet")
+    with open(input_path, 'w') as f:
+        f.write("cust,notes\n" + "1,a\n" * 10 + ",b\n" + "2,c\n" * 9)
+
+    SFNChunkedMappingEngine(chunk_size=10).apply(input_path, output_path, {'CustomerID': 'cust'})
+
+    written = pd.read_parquet(output_path, dtype_backend='numpy_nullable')
+    assert str(written['CustomerID'].dtype) == 'Int64'
+    assert written['CustomerID'].isna().sum() == 1
+
+
+def test_incompatible_chunk_types_are_reported(tmp_path):
+    input_path = str(tmp_path / "in.csv")
+    pd.DataFrame({'cust': [str(index) for index in range(10)] + ['C10'] * 10}).to_csv(input_path, index=False)
+
+    with pytest.raises(ValueError, match="Column types changed between chunks"):
+        SFNChunkedMappingEngine(chunk_size=10).apply(input_path, str(tmp_path / "mapped.parquet"),
+                                                     {'CustomerID': 'cust'})
+
+
+@pytest.mark.parametrize('output_name,mapping,error', [
+    ("mapped.xlsx", MAPPING, "only CSV and Parquet"),
+    ("mapped.csv", {'CustomerID': 'cust', 'AccountID': 'cust'}, "mapped to both"),
+    ("mapped.csv", {'CustomerID': None}, "any mapped columns"),
+])
+def test_invalid_requests_are_rejected(tmp_path, source, output_name, mapping, error):
+    input_path = str(tmp_path / "in.csv")
+    source.to_csv(input_path)
+    with pytest.raises(ValueError, match=error):
+        SFNChunkedMappingEngine(chunk_size=10).apply(input_path, str(tmp_path / output_name), mapping)
+
+
+def test_batch_mapper_streams_large_files_through_the_engine(tmp_path, stub_server, route_to_stub):
+    from batch_mapper import SFNBatchMapper
+    server = stub_server(latency_ms=0, jitter_ms=0)
+    server.set_schema({'category': 'billing', 'truth': {'CustomerID': 'c1', 'BillingDate': 'c2', 'Revenue': 'c3'}})
+    input_path = tmp_path / "REPORT.CSV"
+    pd.DataFrame({'c1': range(25), 'c2': ['2024-01-01'] * 25, 'c3': [1.5] * 25, 'notes': ['x'] * 25}).to_csv(input_path)
+    mapper = SFNBatchMapper(str(tmp_path / "out"), category='billing', output_format='parquet',
+                            use_registry=False, chunk_size=10)
+    route_to_stub(server, mapper.mapping_agent)
+
+    report, = mapper.run([str(input_path)])
+
+    assert report['status'] == 'success' and report['rows_written'] == 25
+    written = pd.read_parquet(report['output_file'])
+    assert written.columns.tolist() == ['BillingDate', 'CustomerID', 'Revenue']
+    assert written['CustomerID'].tolist() == list(range(25))
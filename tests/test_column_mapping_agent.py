@@ -0,0 +1,102 @@
+import json
+import pandas as pd
+import pytest
+from sfn_blueprint import Task
+from agents.column_mapping_agent import SFNColumnMappingAgent
+from utils.mapped_data_exporter import rename_map
+
+TRUTH = {'CustomerID': 'c1', 'BillingDate': 'c2', 'Revenue': 'c3'}
+
+
+@pytest.fixture
+def agent(stub_server, route_to_stub):
+    server = stub_server(latency_ms=0, jitter_ms=0)
+    server.set_schema({'category': 'billing', 'truth': TRUTH})
+    mapping_agent = SFNColumnMappingAgent()
+    route_to_stub(server, mapping_agent)
+    mapping_agent.server = server
+    return mapping_agent
+
+
+def map_columns(agent, **task_data):
+    df = pd.DataFrame(columns=list(TRUTH.values()))
+    return agent.execute_task(Task("Map columns", data={'dataframe': df, 'category': 'billing', **task_data}))
+
+
+def mapped(mapping):
+    return {std_col: input_col for std_col, input_col in mapping.items() if input_col is not None}
+
+
+def test_input_column_assigned_twice_keeps_one_assignment(agent):
+    agent.server.answer = lambda prompt: json.dumps({'Revenue': 'c1', 'CustomerID': 'c1', 'BillingDate': 'c2'})
+    mapping = map_columns(agent)
+
+    # Mandatory columns are resolved in schema order, so the first of them wins
+    first = next(col for col in agent.standard_columns['billing']['mandatory'] if col in ('Revenue', 'CustomerID'))
+    assert mapped(mapping) == {first: 'c1', 'BillingDate': 'c2'}
+    assert rename_map(mapping) == {'c1': first, 'c2': 'BillingDate'}
+
+
+
+def stream_columns(agent):
+    pairs = []
+    mapping = map_columns(agent, on_mapping=lambda std_col, input_col: pairs.append((std_col, input_col)))
+    return mapping, pairs
+
+
+def test_streamed_input_column_assigned_twice_keeps_first_pair(agent):
+    agent.server.answer = lambda prompt: json.dumps({'Revenue': 'c1', 'CustomerID': 'c1', 'BillingDate': 'c2'})
+    mapping, pairs = stream_columns(agent)
+
+    assert pairs == [('Revenue', 'c1'), ('BillingDate', 'c2')]
+    assert mapped(mapping) == {'Revenue': 'c1', 'BillingDate': 'c2'}
+
+
+def test_stream_falls_through_to_the_next_provider(stub_server, route_to_stub):
+    failing = stub_server(latency_ms=0, jitter_ms=0, error_status=503)
+    healthy = stub_server(latency_ms=0, jitter_ms=0)
+    healthy.set_schema({'category': 'billing', 'truth': TRUTH})
+    agent = SFNColumnMappingAgent()
+    route_to_stub([failing, healthy], agent)
+    mapping, pairs = stream_columns(agent)
+
+    assert mapped(mapping) == TRUTH
+    assert mapped(dict(pairs)) == TRUTH
+    assert failing.stats['requests'] == 1
+
+
+def test_stream_failing_before_first_pair_falls_back_to_one_completion(agent, monkeypatch):
+    def broken_stream(*args, **kwargs):
+        raise ConnectionResetError("connection reset")
+
+    monkeypatch.setattr(agent, '_open_stream', broken_stream)
+    mapping, pairs = stream_columns(agent)
+
+    assert mapped(mapping) == TRUTH
+    assert mapped(dict(pairs)) == TRUTH
+
+
+def test_stream_cut_off_after_first_pair_keeps_pairs_and_is_not_cached(agent, monkeypatch, tmp_path):
+    from utils.llm_cache import SFNLLMCache
+    agent.cache = SFNLLMCache(path=str(tmp_path / "cache.sqlite3"), enabled=True)
+    open_stream = agent._open_stream
+
+    def cut_stream(*args, **kwargs):
+        stream, labels = open_stream(*args, **kwargs)
+
+        def chunks():
+            for index, chunk in enumerate(stream):
+                # Stop once the first pair ('"BillingDate": "c2",') has been sent
+                if index > 0 and '",' in ''.join(seen):
+                    raise ConnectionResetError("connection reset")
+                if chunk.choices and chunk.choices[0].delta.content:
+                    seen.append(chunk.choices[0].delta.content)
+                yield chunk
+        return chunks(), labels
+
+    seen = []
+    monkeypatch.setattr(agent, '_open_stream', cut_stream)
+    mapping, pairs = stream_columns(agent)
+
+    assert 0 < len(mapped(mapping)) < len(TRUTH)
+    assert agent.cache.stats()['entries'] == 0
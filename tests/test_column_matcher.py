@@ -0,0 +1,56 @@
+import pytest
+from utils.column_matcher import SFNColumnPreMatcher, tokenize_column_name
+
+STANDARD = {
+    'mandatory': ['BillingDate', 'CustomerID', 'Revenue'],
+    'optional': ['RevenueProduct1', 'RevenueProduct2', 'Currency']
+}
+
+
+@pytest.fixture
+def matcher():
+    return SFNColumnPreMatcher(synonyms={'CustomerID': ['cust_no', 'client_id'], 'Revenue': ['net_revenue']},
+                               threshold=0.9)
+
+
+def test_tokenizer_splits_camel_case_and_punctuation():
+    assert tokenize_column_name('customerIDNumber') == ['customer', 'id', 'number']
+    assert tokenize_column_name('Billing-Date_2') == ['billing', 'date', '2']
+
+
+def test_scores_names_synonyms_and_token_order(matcher):
+    assert matcher.score('customer_id', 'CustomerID') == 1.0
+    assert matcher.score('CUST-NO', 'CustomerID') == 1.0
+    assert matcher.score('date_billing', 'BillingDate') == 0.95
+    assert matcher.score('revenue_product_1', 'RevenueProduct2') == 0.0
+
+
+def test_match_is_one_to_one_and_returns_the_residue(matcher):
+    inputs = ['client_id', 'cust_no', 'billing_date', 'revenue_product_1', 'notes']
+    matched, residue_inputs, residue_standard = matcher.match(inputs, STANDARD)
+
+    # Both inputs are synonyms of CustomerID; the first one wins and the other goes to the LLM
+    assert matched == {'CustomerID': 'client_id', 'BillingDate': 'billing_date',
+                       'RevenueProduct1': 'revenue_product_1'}
+    assert residue_inputs == ['cust_no', 'notes']
+    assert residue_standard == {'mandatory': ['Revenue'], 'optional': ['RevenueProduct2', 'Currency']}
+
+
+def test_ambiguous_names_are_left_to_the_llm(matcher):
+    matched, residue_inputs, _ = matcher.match(['amount', 'date', 'status'], STANDARD)
+    assert matched == {}
+    assert residue_inputs == ['amount', 'date', 'status']
+
+
+def test_disabled_matcher_resolves_nothing(matcher):
+    matcher.enabled = False
+    assert matcher.match(['customer_id'], STANDARD) == ({}, ['customer_id'], STANDARD)
+
+
+def test_shipped_synonyms_are_unambiguous():
+    matcher = SFNColumnPreMatcher()
+    owners = {}
+    for std_col, variants in matcher._variants.items():
+        for normalized, *_ in variants:
+            assert owners.setdefault(normalized, std_col) == std_col, normalized
+    assert not {'amount', 'date', 'status'} & set(owners)
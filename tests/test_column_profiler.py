@@ -0,0 +1,48 @@
+import pandas as pd
+from utils.column_profiler import SFNColumnProfiler, format_profiles
+
+
+def profiler():
+    return SFNColumnProfiler(sample_rows=1000, example_values=3, cache_entries=8, enabled=True)
+
+
+def test_each_column_gets_its_own_date_format():
+    df = pd.DataFrame({
+        'iso': ['2024-01-15', '2024-02-20', '2024-03-25'],
+        'us': ['01/31/2024', '02/28/2024', '12/15/2023'],
+        'iso2': ['2023-05-01', '2023-06-01', '2023-07-01'],
+        'eu': ['31.01.2024', '28.02.2024', '15.12.2023'],
+    })
+    profiles = profiler().profile(df)
+
+    for column in df.columns:
+        assert profiles[column]['type'] == 'datetime', column
+        assert profiles[column]['date_rate'] == 1.0, column
+    assert (profiles['us']['min'], profiles['us']['max']) == ('2023-12-15', '2024-02-28')
+
+
+def test_infers_numbers_booleans_and_categories():
+    df = pd.DataFrame({
+        'id': [str(i) for i in range(100)],
+        'amount': ['$1,200.50', '(3.25)', '7', '8'] * 25,
+        'flag': ['yes', 'no'] * 50,
+        'plan': ['basic', 'pro'] * 50,
+        'empty': [None] * 100,
+    })
+    profiles = profiler().profile(df)
+
+    assert profiles['id']['type'] == 'integer'
+    assert profiles['amount']['type'] == 'decimal'
+    assert profiles['flag']['type'] == 'boolean'
+    assert profiles['plan']['type'] == 'categorical'
+    assert profiles['empty']['type'] == 'empty'
+    assert profiles['empty']['null_rate'] == 1.0
+
+
+def test_types_only_rendering_ignores_sample_values():
+    first = profiler().profile(pd.DataFrame({'amt': ['1.5', '2.5'], 'day': ['2024-01-01', '2024-01-02']}))
+    second = profiler().profile(pd.DataFrame({'amt': ['10.25', '99'], 'day': ['2025-06-01', '2025-06-30']}))
+
+    assert format_profiles(first, ['amt', 'day']) != format_profiles(second, ['amt', 'day'])
+    assert format_profiles(first, ['amt', 'day'], types_only=True) == \
+        format_profiles(second, ['amt', 'day'], types_only=True)
@@ -0,0 +1,64 @@
+import json
+import pandas as pd
+import pytest
+from sfn_blueprint import Task
+from agents.combined_mapping_agent import SFNCombinedMappingAgent
+from utils.metrics import get_metrics
+
+TRUTH = {'CustomerID': 'c1', 'BillingDate': 'c2', 'Revenue': 'c3'}
+
+
+@pytest.fixture
+def agent():
+    return SFNCombinedMappingAgent()
+
+
+def mapped(mapping):
+    return {std_col: input_col for std_col, input_col in mapping.items() if input_col is not None}
+
+
+def parse_fallbacks():
+    _, counters = get_metrics().snapshot()
+    return counters.get(('parse_fallbacks', (('agent', 'combined_mapper'),)), 0)
+
+
+def test_response_is_validated_like_a_mapping_response(agent):
+    response = "```json\n" + json.dumps({'category': 'Billing', 'mapping': {
+        'CustomerID': 'c3', 'BillingDate': 'c2', 'Revenue': 'c2', 'Currency': 'not_an_input'
+    }}) + "\n```"
+    result = agent._parse_combined_response(response, ['customer_id', 'c2', 'c3'])
+
+    assert result['category'] == 'billing'
+    # The local match wins, the doubled input keeps its mandatory-order assignment, unknown inputs are dropped
+    assert mapped(result['mapping']) == {'CustomerID': 'customer_id', 'BillingDate': 'c2'}
+    assert set(result['mapping']) == set(agent.mapping_agent.standard_columns['billing']['mandatory'] +
+                                         agent.mapping_agent.standard_columns['billing']['optional'])
+
+
+def test_unusable_responses_are_rejected(agent):
+    before = parse_fallbacks()
+    assert agent._parse_combined_response("not json", ['c1']) is None
+    assert parse_fallbacks() == before + 1
+    assert agent._parse_combined_response(json.dumps({'category': 'weather', 'mapping': {}}), ['c1']) is None
+    assert agent._parse_combined_response(json.dumps({'category': 'billing', 'mapping': ['c1']}), ['c1']) is None
+    assert agent._parse_combined_response(json.dumps({'category': 'Other'}), ['c1']) == {'category': 'other',
+                                                                                          'mapping': None}
+
+
+@pytest.mark.parametrize('combined_answer,source,requests', [
+    (json.dumps({'category': 'billing', 'mapping': TRUTH}), 'combined', 1),
+    # A response without the category falls back to identifying, then mapping
+    (json.dumps(TRUTH), 'two_step', 3),
+])
+def test_one_round_trip_or_two_step_fallback(agent, stub_server, route_to_stub, combined_answer, source, requests):
+    server = stub_server(latency_ms=0, jitter_ms=0)
+    server.set_schema({'category': 'billing', 'truth': TRUTH})
+    answer = server.answer
+    server.answer = lambda prompt: combined_answer if "in one step" in prompt else answer(prompt)
+    route_to_stub(server, agent.category_agent, agent.mapping_agent)
+
+    result = agent.execute_task(Task("Identify and map", data=pd.DataFrame(columns=list(TRUTH.values()))))
+
+    assert (result['category'], result['source']) == ('billing', source)
+    assert mapped(result['mapping']) == TRUTH
+    assert server.stats['requests'] == requests
@@ -0,0 +1,93 @@
+import time
+import pandas as pd
+import pytest
+from sfn_blueprint import Task
+from agents.category_identification_agent import SFNCategoryIdentificationAgent
+from agents.column_mapping_agent import SFNColumnMappingAgent
+from utils.llm_cache import SFNLLMCache
+
+TRUTH = {'CustomerID': 'c1', 'BillingDate': 'c2', 'Revenue': 'c3'}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SFNLLMCache(path=str(tmp_path / "llm_cache.sqlite3"), max_entries=3, ttl_seconds=60, enabled=True)
+
+
+def test_hit_and_miss(cache):
+    key = SFNLLMCache.make_key('column_mapper', {'model': 'm'}, 'system', 'user', prompt_version='1')
+    assert cache.get(key) is None
+    cache.set(key, '{"CustomerID": "c1"}')
+
+    assert cache.get(key) == '{"CustomerID": "c1"}'
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert key != SFNLLMCache.make_key('column_mapper', {'model': 'm'}, 'system', 'user', prompt_version='2')
+
+
+def test_entries_expire_after_ttl(cache, monkeypatch):
+    cache.set('key', 'value')
+    now = time.time()
+    monkeypatch.setattr('utils.llm_cache.time.time', lambda: now + 61)
+
+    assert cache.get('key') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_entry_is_evicted(cache, monkeypatch):
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr('utils.llm_cache.time.time', lambda: next(clock))
+    for key in ('a', 'b', 'c'):
+        cache.set(key, key)
+    assert cache.get('a') == 'a'
+    cache.set('d', 'd')
+
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in ('a', 'c', 'd')] == ['a', 'c', 'd']
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = SFNLLMCache(path=str(tmp_path / "off.sqlite3"), enabled=False)
+    cache.set('key', 'value')
+    assert cache.get('key') is None
+
+
+def map_columns(agent):
+    df = pd.DataFrame(columns=list(TRUTH.values()))
+    return agent.execute_task(Task("Map columns", data={'dataframe': df, 'category': 'billing'}))
+
+
+def test_unparseable_answer_is_not_cached(stub_server, route_to_stub, cache):
+    server = stub_server(latency_ms=0, jitter_ms=0)
+    server.set_schema({'category': 'billing', 'truth': TRUTH})
+    answer = server.answer
+    server.answer = lambda prompt: "I cannot map these columns."
+    agent = SFNColumnMappingAgent()
+    agent.cache = cache
+    route_to_stub(server, agent)
+
+    assert not any(map_columns(agent).values())
+    assert cache.stats()['entries'] == 0
+
+    # The next run asks the model again and recovers
+    server.answer = answer
+    assert {std: col for std, col in map_columns(agent).items() if col} == TRUTH
+    assert cache.stats()['entries'] == 1
+    requests = server.stats['requests']
+    map_columns(agent)
+    assert server.stats['requests'] == requests
+
+
+def test_unknown_category_is_not_cached(stub_server, route_to_stub, cache):
+    server = stub_server(latency_ms=0, jitter_ms=0)
+    server.answer = lambda prompt: "no idea"
+    agent = SFNCategoryIdentificationAgent()
+    agent.cache = cache
+    route_to_stub(server, agent)
+    df = pd.DataFrame(columns=['c1', 'c2', 'c3'])
+
+    assert agent.execute_task(Task("Identify category", data=df)) == "none of these"
+    assert cache.stats()['entries'] == 0
+
+    server.answer = lambda prompt: "billing"
+    assert agent.execute_task(Task("Identify category", data=df)) == "billing"
+    assert cache.stats()['entries'] == 1
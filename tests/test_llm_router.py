@@ -0,0 +1,103 @@
+import time
+import openai
+import pytest
+from config.app_config import APP_CONFIG
+from utils.llm_router import SFNCircuitBreaker, SFNLLMProvider, SFNLLMRouter
+from utils.metrics import get_metrics
+
+MODEL_CONFIG = {"model": "stub-model", "temperature": 0, "max_tokens": 20, "n": 1, "stop": None}
+
+
+def render(llm_provider):
+    return "You categorize datasets.", "Based on the following column names, choose the best category: ['amount']"
+
+
+def make_provider(name, server, failure_threshold=5):
+    client = openai.OpenAI(api_key="test-key", base_url=server.base_url, max_retries=0)
+    return SFNLLMProvider(name, client, breaker=SFNCircuitBreaker(failure_threshold, cooldown_seconds=60))
+
+
+def make_router(providers, **overrides):
+    config = {**APP_CONFIG["llm_router"], "max_retries": 0, "backoff_base_seconds": 0.01,
+              "backoff_max_seconds": 0.01, **overrides}
+    return SFNLLMRouter(providers=providers, config=config)
+
+
+def hedge_count():
+    _, counters = get_metrics().snapshot()
+    return sum(value for (name, _), value in counters.items() if name == 'llm_hedges')
+
+
+def test_answers_from_first_provider(stub_server):
+    server = stub_server(latency_ms=10, jitter_ms=0)
+    result = make_router([make_provider("primary", server)]).complete(render, MODEL_CONFIG)
+    assert result['content'] == 'billing'
+    assert result['provider'] == 'primary'
+    assert result['attempts'] == 1
+
+
+def test_slow_provider_is_hedged(stub_server):
+    slow = stub_server(latency_ms=2000, jitter_ms=0)
+    fast = stub_server(latency_ms=10, jitter_ms=0)
+    router = make_router([make_provider("slow", slow), make_provider("fast", fast)], hedge_delay_seconds=0.1)
+    hedges = hedge_count()
+
+    result = router.complete(render, MODEL_CONFIG, agent_type='test')
+
+    assert result['provider'] == 'fast'
+    assert result['latency'] < 1.0
+    assert hedge_count() == hedges + 1
+
+
+def test_failed_provider_falls_through(stub_server):
+    failing = stub_server(latency_ms=0, jitter_ms=0, error_status=500)
+    healthy = stub_server(latency_ms=10, jitter_ms=0)
+    router = make_router([make_provider("failing", failing), make_provider("healthy", healthy)],
+                         hedge_delay_seconds=None)
+    assert router.complete(render, MODEL_CONFIG)['provider'] == 'healthy'
+
+
+def test_deadline_bounds_the_call(stub_server):
+    slow = stub_server(latency_ms=2000, jitter_ms=0)
+    router = make_router([make_provider("slow", slow)], hedge_delay_seconds=None)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        router.complete(render, MODEL_CONFIG, deadline_seconds=0.3)
+    assert time.monotonic() - start < 1.0
+
+
+def test_breaker_opens_on_provider_errors(stub_server):
+    failing = stub_server(latency_ms=0, jitter_ms=0, error_status=503)
+    provider = make_provider("failing", failing, failure_threshold=2)
+    router = make_router([provider])
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="All LLM providers failed"):
+            router.complete(render, MODEL_CONFIG)
+    assert provider.breaker.state == 'open'
+
+    requests = failing.stats['requests']
+    with pytest.raises(RuntimeError, match="every circuit breaker is open"):
+        router.complete(render, MODEL_CONFIG)
+    assert failing.stats['requests'] == requests
+
+
+def test_breaker_ignores_caller_errors(stub_server):
+    rejecting = stub_server(latency_ms=0, jitter_ms=0, error_status=400)
+    provider = make_provider("rejecting", rejecting, failure_threshold=2)
+    router = make_router([provider])
+    for _ in range(5):
+        with pytest.raises(RuntimeError, match="All LLM providers failed"):
+            router.complete(render, MODEL_CONFIG)
+    assert provider.breaker.state == 'closed'
+    assert rejecting.stats['requests'] == 5
+
+
+def test_breaker_lets_one_trial_through_after_cooldown():
+    breaker = SFNCircuitBreaker(failure_threshold=1, cooldown_seconds=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
@@ -0,0 +1,71 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from utils.mapped_data_exporter import SFNMappedDataExporter, rename_map, renamed_view
+
+MAPPING = {'CustomerID': 'c1', 'BillingDate': 'c2', 'Revenue': None}
+
+
+@pytest.fixture
+def mapped_df():
+    df = pd.DataFrame({'c1': range(25), 'c2': ['2024-01-01'] * 25, 'extra': [None] * 25})
+    return renamed_view(df, rename_map(MAPPING))
+
+
+def test_rename_map_rejects_an_input_mapped_twice():
+    assert rename_map(MAPPING) == {'c1': 'CustomerID', 'c2': 'BillingDate'}
+    with pytest.raises(ValueError, match="'c1' is mapped to both"):
+        rename_map({'CustomerID': 'c1', 'AccountID': 'c1'})
+
+
+def test_renamed_view_relabels_without_copying():
+    df = pd.DataFrame({'c1': np.arange(5), 'c2': np.arange(5.0)})
+    view = renamed_view(df, rename_map(MAPPING))
+
+    assert view.columns.tolist() == ['CustomerID', 'BillingDate']
+    assert df.columns.tolist() == ['c1', 'c2']
+    assert np.shares_memory(view['CustomerID'].to_numpy(), df['c1'].to_numpy())
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'csv.gz', 'parquet', 'arrow'])
+def test_sliced_export_round_trips(mapped_df, file_format):
+    path = SFNMappedDataExporter(mapped_df, chunk_rows=10).export(file_format)
+    try:
+        assert path.endswith(SFNMappedDataExporter.FORMATS[file_format][0])
+        if file_format == 'parquet':
+            exported = pd.read_parquet(path)
+        elif file_format == 'arrow':
+            import pyarrow as pa
+            exported = pa.ipc.open_file(path).read_all().to_pandas()
+        else:
+            exported = pd.read_csv(path)
+        assert exported.columns.tolist() == ['CustomerID', 'BillingDate', 'extra']
+        assert exported['CustomerID'].tolist() == list(range(25))
+        assert exported['extra'].isna().all()
+    finally:
+        SFNMappedDataExporter.remove([path])
+
+
+def test_empty_export_keeps_the_header(mapped_df):
+    path = SFNMappedDataExporter(mapped_df.head(0)).export('csv')
+    with open(path, encoding='utf-8') as f:
+        assert f.read().strip() == "CustomerID,BillingDate,extra"
+    SFNMappedDataExporter.remove([path, path])
+    assert not os.path.exists(path)
+
+
+def test_sweep_removes_only_stale_exports(mapped_df):
+    stale = SFNMappedDataExporter(mapped_df).export('csv')
+    fresh = SFNMappedDataExporter(mapped_df).export('csv')
+    other = os.path.join(os.path.dirname(stale), "keep.csv")
+    open(other, 'w').close()
+    old = time.time() - 3600
+    os.utime(stale, (old, old))
+    os.utime(other, (old, old))
+
+    assert SFNMappedDataExporter.sweep_stale(max_age_seconds=60) == 1
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh) and os.path.exists(other)
+    SFNMappedDataExporter.remove([fresh, other])
@@ -0,0 +1,70 @@
+import ast
+import pandas as pd
+import pytest
+from sfn_blueprint import Task
+from agents.column_mapping_agent import SFNColumnMappingAgent
+from benchmarks.stub_server import PROMPT_LISTS
+from utils.mapping_registry import SFNMappingRegistry
+
+COLUMNS = ['customer_id', 'billing_date', 'revenue', 'plan', 'region', 'currency', 'invoice_no', 'tax']
+MAPPING = {'CustomerID': 'customer_id', 'BillingDate': 'billing_date', 'Revenue': 'revenue', 'Currency': None}
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = SFNMappingRegistry(path=str(tmp_path / "registry.sqlite3"), similarity_threshold=0.7, enabled=True)
+    registry.save(COLUMNS, 'billing', MAPPING)
+    return registry
+
+
+def test_cosmetic_renames_are_an_exact_match(registry):
+    columns = ['Customer ID', 'BILLING-DATE', 'Revenue', 'plan', 'region', 'currency', 'invoice_no', 'tax']
+
+    for category in (None, 'billing'):
+        match = registry.lookup(columns, category)
+        assert match['exact'] and match['category'] == 'billing'
+        assert match['mapping'] == {'CustomerID': 'Customer ID', 'BillingDate': 'BILLING-DATE',
+                                    'Revenue': 'Revenue', 'Currency': None}
+        assert match['delta_columns'] == []
+    assert registry.lookup(columns, 'usage') is None
+
+
+def test_near_match_keeps_surviving_columns_and_reports_the_delta(registry):
+    columns = [col for col in COLUMNS if col != 'revenue'] + ['net_revenue']
+    match = registry.lookup(columns, 'billing')
+
+    assert not match['exact']
+    assert match['similarity'] == pytest.approx(7 / 9)
+    assert match['mapping'] == {'CustomerID': 'customer_id', 'BillingDate': 'billing_date',
+                                'Revenue': None, 'Currency': None}
+    assert match['delta_columns'] == ['net_revenue']
+    # Near matches need a category
+    assert registry.lookup(columns) is None
+
+
+def test_low_overlap_and_disabled_registry_find_nothing(registry, tmp_path):
+    assert registry.lookup(COLUMNS[:4] + ['a', 'b', 'c'], 'billing') is None
+    disabled = SFNMappingRegistry(path=str(tmp_path / "registry.sqlite3"), enabled=False)
+    assert disabled.lookup(COLUMNS, 'billing') is None
+
+
+def test_agent_sends_only_delta_columns_to_the_llm(stub_server, route_to_stub):
+    server = stub_server(latency_ms=0, jitter_ms=0)
+    server.set_schema({'category': 'billing', 'truth': {'CustomerID': 'c1', 'BillingDate': 'c2', 'Revenue': 'c3'}})
+    prompts = []
+    answer = server.answer
+    server.answer = lambda prompt: prompts.append(prompt) or answer(prompt)
+    agent = SFNColumnMappingAgent()
+    route_to_stub(server, agent)
+
+    mapping = agent.execute_task(Task("Map columns", data={
+        'dataframe': pd.DataFrame(columns=['c1', 'c2', 'c3']),
+        'category': 'billing',
+        'base_mapping': {'CustomerID': 'c1', 'BillingDate': 'dropped_column'},
+        'delta_columns': ['c2', 'c3']
+    }))
+
+    assert len(prompts) == 1
+    assert ast.literal_eval(PROMPT_LISTS['input_columns'].search(prompts[0]).group(1)) == ['c2', 'c3']
+    assert 'CustomerID' not in ast.literal_eval(PROMPT_LISTS['mandatory'].search(prompts[0]).group(1))
+    assert {std: col for std, col in mapping.items() if col} == {'CustomerID': 'c1', 'BillingDate': 'c2', 'Revenue': 'c3'}
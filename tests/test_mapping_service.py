@@ -0,0 +1,113 @@
+import http.client
+import json
+import threading
+import pytest
+from mapping_service import SFNMappingService
+from utils.metrics import get_metrics
+
+COLUMNS = ['c1', 'c2', 'c3']
+TRUTH = {'CustomerID': 'c1', 'BillingDate': 'c2', 'Revenue': 'c3'}
+
+
+@pytest.fixture(scope="module")
+def model_server():
+    from benchmarks.stub_server import SFNStubModelServer
+    server = SFNStubModelServer(latency_ms=500, jitter_ms=0).start()
+    server.set_schema({'category': 'billing', 'truth': TRUTH})
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def service(model_server, route_to_stub):
+    services = []
+
+    def start(**kwargs):
+        started = SFNMappingService(host='127.0.0.1', port=0, use_registry=False, **kwargs)
+        route_to_stub(model_server, started.category_agent, started.mapping_agent)
+        services.append(started.start())
+        return started
+
+    model_server.reset_stats()
+    yield start
+    for started in services:
+        started.stop()
+
+
+def post(service, body, headers=None):
+    host, port = service.base_url.split('//')[1].split(':')
+    conn = http.client.HTTPConnection(host, int(port), timeout=30)
+    try:
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+        conn.request('POST', '/v1/map', payload, {'Content-Type': 'application/json', **(headers or {})})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def post_concurrently(service, bodies):
+    results = [None] * len(bodies)
+    barrier = threading.Barrier(len(bodies))
+
+    def run(index):
+        barrier.wait()
+        results[index] = post(service, bodies[index])
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(len(bodies))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def service_requests(result):
+    _, counters = get_metrics().snapshot()
+    return sum(value for (name, labels), value in counters.items()
+               if name == 'service_requests' and ('result', result) in labels)
+
+
+def test_identical_schemas_share_one_run(service, model_server):
+    mapping_service = service(max_workers=2, max_queue=2)
+    coalesced_before = service_requests('coalesced')
+    results = post_concurrently(mapping_service, [{'columns': COLUMNS, 'category': 'billing'}] * 20)
+
+    assert [status for status, _, _ in results] == [200] * 20
+    mappings = [{std_col: col for std_col, col in body['mapping'].items() if col} for _, _, body in results]
+    assert mappings == [TRUTH] * 20
+    assert sum(not body['coalesced'] for _, _, body in results) == 1
+    assert service_requests('coalesced') - coalesced_before == 19
+    assert model_server.stats['requests'] == 1
+
+
+def test_full_queue_is_refused_with_retry_after(service):
+    mapping_service = service(max_workers=1, max_queue=0)
+    results = post_concurrently(mapping_service, [
+        {'columns': [f"{col}_{index}" for col in COLUMNS], 'category': 'billing'} for index in range(3)
+    ])
+
+    statuses = sorted(status for status, _, _ in results)
+    assert statuses == [200, 503, 503]
+    for status, headers, body in results:
+        if status == 503:
+            assert headers['Retry-After'] == str(mapping_service.config["retry_after_seconds"])
+            assert 'busy' in body['error']
+
+
+@pytest.mark.parametrize('body', [
+    {'columns': COLUMNS, 'category': ['billing']},
+    {'columns': COLUMNS, 'category': 'unknown'},
+    {'columns': []},
+    {'columns': COLUMNS, 'sample': 'not rows'},
+])
+def test_invalid_payload_is_rejected(service, body):
+    status, _, response = post(service(), body)
+    assert status == 400
+    assert response['error']
+
+
+def test_invalid_content_length_is_rejected(service):
+    status, _, response = post(service(), b'{}', headers={'Content-Length': 'abc'})
+    assert status == 400
+    assert response['error'] == "Invalid Content-Length header"
@@ -0,0 +1,54 @@
+import json
+import os
+from utils.metrics import SFNJsonLinesSink, SFNMetricsRegistry, SFNPrometheusSink
+
+CONFIG = {"enabled": True, "recent_events": 10, "flush_interval_seconds": 0}
+
+
+def read_events(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_emit_rewrites_aggregated_sinks_but_leaves_the_event_log_to_its_thread(tmp_path):
+    jsonl = SFNJsonLinesSink(str(tmp_path / "metrics.jsonl"), flush_interval_seconds=60)
+    prometheus = SFNPrometheusSink(str(tmp_path / "metrics.prom"))
+    registry = SFNMetricsRegistry(sinks=[jsonl, prometheus], config=CONFIG)
+
+    registry.increment('llm_cache_hits', agent='column_mapper')
+    registry.record_span('llm_call', 0.25, agent='column_mapper')
+
+    assert 'sfn_llm_cache_hits_total{agent="column_mapper"} 1' in open(prometheus.path).read()
+    assert not os.path.exists(jsonl.path)
+
+    registry.flush()
+    assert [event['name'] for event in read_events(jsonl.path)] == ['llm_cache_hits', 'llm_call']
+    jsonl.close()
+
+
+def test_event_log_rotates_and_keeps_backup_count_files(tmp_path):
+    path = str(tmp_path / "metrics.jsonl")
+    sink = SFNJsonLinesSink(path, max_bytes=200, backup_count=2, flush_interval_seconds=60)
+
+    for index in range(30):
+        sink.emit({'type': 'counter', 'name': 'rows', 'value': index})
+    sink.close()
+
+    files = sorted(os.listdir(tmp_path))
+    assert files == ['metrics.jsonl', 'metrics.jsonl.1', 'metrics.jsonl.2']
+    assert all(os.path.getsize(tmp_path / name) <= 200 for name in files)
+    # The newest events are in the live file
+    assert read_events(path)[-1]['value'] == 29
+
+
+def test_disabled_registry_records_nothing(tmp_path):
+    jsonl = SFNJsonLinesSink(str(tmp_path / "metrics.jsonl"), flush_interval_seconds=60)
+    registry = SFNMetricsRegistry(sinks=[jsonl], enabled=False, config=CONFIG)
+
+    registry.increment('rows', 5)
+    with registry.span('export'):
+        pass
+    registry.flush()
+
+    assert registry.snapshot() == ({}, {})
+    assert not os.path.exists(jsonl.path)
@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from sfn_blueprint import Task
+from batch_mapper import collect_input_files
+from utils.chunked_mapping_engine import SFNChunkedMappingEngine
+from utils.sample_data_loader import SFNFullDataLoader, SFNSampleDataLoader
+
+
+@pytest.fixture
+def report_file(tmp_path):
+    path = tmp_path / "REPORT.CSV"
+    pd.DataFrame({'c1': range(50), 'c2': ['x'] * 50}).to_csv(path)
+    (tmp_path / "notes.TXT").write_text("not data")
+    return path
+
+
+def test_upper_case_extensions_are_collected_and_loaded(report_file):
+    assert collect_input_files([str(report_file.parent)]) == [str(report_file)]
+    assert SFNChunkedMappingEngine.supports(str(report_file))
+
+    with open(report_file, 'rb') as file_obj:
+        sample = SFNSampleDataLoader(sample_rows=10).execute_task(Task("Load", data=file_obj))
+        assert file_obj.tell() == 0
+        full = SFNFullDataLoader().execute_task(Task("Load", data=file_obj))
+
+    assert sample.columns.tolist() == full.columns.tolist() == ['c1', 'c2']
+    assert (len(sample), len(full)) == (10, 50)
+
+
+def test_json_lines_sample_matches_full_load(tmp_path):
+    path = tmp_path / "events.JSON"
+    pd.DataFrame({'c1': range(20), 'c2': ['x'] * 20}).to_json(path, orient='records', lines=True)
+
+    with open(path, 'rb') as file_obj:
+        sample = SFNSampleDataLoader(sample_rows=5).execute_task(Task("Load", data=file_obj))
+        full = SFNFullDataLoader().execute_task(Task("Load", data=file_obj))
+
+    assert sample.equals(full.head(5))
+
+
+def test_unsupported_extension_is_rejected(report_file):
+    with open(report_file.parent / "notes.TXT", 'rb') as file_obj:
+        with pytest.raises(ValueError, match="Unsupported file format"):
+            SFNFullDataLoader().execute_task(Task("Load", data=file_obj))
+
+
+@pytest.mark.parametrize('suffix', ['parquet', 'xlsx'])
+def test_sample_has_the_columns_of_the_full_load(tmp_path, suffix):
+    df = pd.DataFrame({'c1': range(30), 'c2': [f"v{index}" for index in range(30)]},
+                      index=pd.Index(range(100, 130), name='row_id'))
+    path = tmp_path / f"data.{suffix}"
+    if suffix == 'parquet':
+        df.to_parquet(path)
+    else:
+        pytest.importorskip('openpyxl')
+        df.to_excel(path)
+
+    with open(path, 'rb') as file_obj:
+        sample = SFNSampleDataLoader(sample_rows=7).execute_task(Task("Load", data=file_obj))
+        full = SFNFullDataLoader().execute_task(Task("Load", data=file_obj))
+
+    assert sample.columns.tolist() == full.columns.tolist() == ['c1', 'c2']
+    assert sample.equals(full.head(7))
+
+
+def test_empty_parquet_sample_keeps_the_schema(tmp_path):
+    path = tmp_path / "empty.parquet"
+    pd.DataFrame({'c1': pd.Series(dtype='int64'), 'c2': pd.Series(dtype='object')}).to_parquet(path)
+
+    with open(path, 'rb') as file_obj:
+        sample = SFNSampleDataLoader(sample_rows=7).execute_task(Task("Load", data=file_obj))
+
+    assert sample.columns.tolist() == ['c1', 'c2']
+    assert sample.empty
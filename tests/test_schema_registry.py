@@ -0,0 +1,81 @@
+import json
+import os
+import pytest
+from utils.schema_registry import SFNSchemaRegistry, column_ngrams
+
+BASE = {
+    'billing': {'mandatory': ['BillingDate', 'CustomerID', 'Revenue'], 'optional': ['Currency', 'Discount']},
+}
+SENSORS = {
+    'sensors': {'mandatory': ['SensorID', 'ReadingTime'],
+                'optional': ['TemperatureVendor', 'Humidity', 'BatteryLevel', 'Firmware', 'Latitude', 'Longitude'],
+                'description': 'IoT sensor readings'},
+}
+
+
+def write_json(path, content):
+    path.write_text(json.dumps(content))
+    # Make every rewrite visible to the mtime-based reload, however fast the test runs
+    mtime = os.path.getmtime(path) + len(list(path.parent.iterdir()))
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def registry(tmp_path):
+    base = tmp_path / "standard_columns_config.json"
+    write_json(base, BASE)
+    (tmp_path / "schemas").mkdir()
+    return SFNSchemaRegistry(standard_columns_path=str(base), schemas_dir=str(tmp_path / "schemas"))
+
+
+def test_snapshot_is_recompiled_only_when_a_source_changes(registry, tmp_path):
+    snapshot = registry.load()
+    assert registry.load() is snapshot
+    assert snapshot.categories == ['billing']
+
+    write_json(tmp_path / "schemas" / "sensors.json", SENSORS)
+    extended = registry.load()
+    assert extended.categories == ['billing', 'sensors']
+    assert extended.version != snapshot.version
+    assert extended.describe('sensors') == 'IoT sensor readings'
+
+    # Equal content compiles to the same version
+    same = SFNSchemaRegistry(standard_columns_path=registry.standard_columns_path, schemas_dir=registry.schemas_dir)
+    assert same.load().version == extended.version
+
+
+@pytest.mark.parametrize('schema,error', [
+    ({'billing': {'mandatory': [], 'optional': []}}, "defined in both"),
+    ({'sensors': {'mandatory': ['SensorID']}}, "needs 'mandatory' and 'optional' lists"),
+])
+def test_invalid_schema_files_are_rejected(registry, tmp_path, schema, error):
+    write_json(tmp_path / "schemas" / "extra.json", schema)
+    with pytest.raises(ValueError, match=error):
+        registry.load()
+
+
+def test_consonant_skeleton_meets_abbreviations():
+    assert set(column_ngrams('tmprtr_vndr', 3)) & set(column_ngrams('TemperatureVendor', 3))
+    assert column_ngrams('id', 4) == ['^id$', '~d$']
+
+
+def test_pruning_keeps_the_closest_standard_columns(registry, tmp_path):
+    write_json(tmp_path / "schemas" / "sensors.json", SENSORS)
+    snapshot = registry.load()
+    optional = SENSORS['sensors']['optional']
+
+    kept = snapshot.top_candidates(['tmprtr_vndr', 'battery_lvl'], optional, top_k=2, min_similarity=0.25)
+    assert 'TemperatureVendor' in kept and 'BatteryLevel' in kept
+    assert len(kept) < len(optional)
+    # An opaque name could be any column, so nothing is pruned
+    assert snapshot.top_candidates(['c17', 'battery_lvl'], optional, top_k=2, min_similarity=0.25) == optional
+    assert snapshot.top_candidates(['battery_lvl'], optional[:2], top_k=2) == optional[:2]
+
+
+def test_categories_are_ranked_by_coverage(registry, tmp_path):
+    write_json(tmp_path / "schemas" / "sensors.json", SENSORS)
+    snapshot = registry.load()
+
+    assert snapshot.rank_categories(['sensor_id', 'reading_time', 'humidity'], limit=1) == ['sensors']
+    assert snapshot.rank_categories(['invoice_date', 'revenue'], limit=1) == ['billing']
+    assert snapshot.rank_categories(['anything'], limit=5) == ['billing', 'sensors']
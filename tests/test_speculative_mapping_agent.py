@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+from sfn_blueprint import Task
+from agents.category_identification_agent import SFNCategoryIdentificationAgent
+from agents.column_mapping_agent import SFNColumnMappingAgent
+from agents.speculative_mapping_agent import SFNSpeculativeMappingAgent
+
+TRUTH = {'CustomerID': 'c1', 'BillingDate': 'c2', 'Revenue': 'c3'}
+
+
+@pytest.fixture
+def speculative_agent(stub_server, route_to_stub):
+    server = stub_server(latency_ms=0, jitter_ms=0)
+    server.set_schema({'category': 'billing', 'truth': TRUTH})
+    agent = SFNSpeculativeMappingAgent(category_agent=SFNCategoryIdentificationAgent(),
+                                       mapping_agent=SFNColumnMappingAgent())
+    route_to_stub(server, agent.category_agent, agent.mapping_agent)
+    return agent
+
+
+def test_identifies_category_and_maps_it(speculative_agent):
+    result = speculative_agent.execute_task(Task("Identify and map", data=pd.DataFrame(columns=list(TRUTH.values()))))
+
+    assert result['category'] == 'billing'
+    assert {std: col for std, col in result['mappings']['billing'].items() if col} == TRUTH
+    # The loop's async clients were closed with it
+    assert len(speculative_agent.mapping_agent.async_client._clients) == 0
+
+
+def test_failed_speculative_mapping_is_logged_and_left_out(speculative_agent, monkeypatch, caplog):
+    async def fail(task):
+        raise RuntimeError("mapping failed")
+
+    monkeypatch.setattr(speculative_agent.mapping_agent, 'aexecute_task', fail)
+    speculative_agent.logger.propagate = True
+    result = speculative_agent.execute_task(Task("Identify and map", data=pd.DataFrame(columns=list(TRUTH.values()))))
+
+    assert result['category'] == 'billing'
+    assert result['mappings'] == {}
+    assert "mapping failed" in caplog.text
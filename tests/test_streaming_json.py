@@ -0,0 +1,45 @@
+import json
+import pytest
+from utils.streaming_json import SFNIncrementalMappingParser
+
+RESPONSE = '```json\n{"CustomerID": "c1", "BillingDate" : null,\n "Revenue": "net \\"rev\\" \\u00e9"}\n```'
+
+
+def feed_in_pieces(text, size):
+    parser = SFNIncrementalMappingParser()
+    pairs = []
+    for start in range(0, len(text), size):
+        pairs.extend(parser.feed(text[start:start + size]))
+    return parser, pairs
+
+
+@pytest.mark.parametrize('size', [1, 3, len(RESPONSE)])
+def test_pairs_are_the_same_however_the_text_is_split(size):
+    parser, pairs = feed_in_pieces(RESPONSE, size)
+
+    assert pairs == [('CustomerID', 'c1'), ('BillingDate', None), ('Revenue', 'net "rev" é')]
+    assert pairs == list(json.loads(RESPONSE[RESPONSE.index('{'):RESPONSE.rindex('}') + 1]).items())
+    assert parser.started and parser.complete
+
+
+def test_truncated_stream_keeps_completed_pairs():
+    parser, pairs = feed_in_pieces('{"CustomerID": "c1", "Revenue": "net_re', 4)
+
+    assert pairs == [('CustomerID', 'c1')]
+    assert parser.started and not parser.complete
+
+
+def test_nested_values_and_other_literals_are_skipped():
+    text = '{"a": {"x": "}", "y": [1, "]"]}, "b": 3, "c": true, "d": "c4", "e": null}'
+    parser, pairs = feed_in_pieces(text, 2)
+
+    assert pairs == [('d', 'c4'), ('e', None)]
+    assert parser.complete
+
+
+def test_text_after_the_object_and_before_it_is_ignored():
+    parser = SFNIncrementalMappingParser()
+    assert parser.feed('Here is the mapping: no braces yet') == []
+    assert not parser.started
+    assert parser.feed('{"a": "b"} {"c": "d"}') == [('a', 'b')]
+    assert parser.feed('"e": "f"}') == []
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.type_normalizer import SFNTypeNormalizer
+
+TYPES = {'BillingDate': 'datetime', 'Revenue': 'decimal', 'Quantity': 'integer', 'CustomerID': 'id',
+         'Status': 'categorical', 'M2M': 'boolean', 'Notes': 'string'}
+
+
+@pytest.fixture
+def normalizer():
+    return SFNTypeNormalizer(column_types=TYPES, chunk_rows=2, max_category_ratio=0.5)
+
+
+def test_mapped_frame_is_typed_and_failures_are_reported(normalizer):
+    df = pd.DataFrame({
+        'BillingDate': ['03/14/2024', '12/01/2024', 'soon', None],
+        'Revenue': ['$1,200.00', '(300.50)', '1.234,50', ' '],
+        'Quantity': ['3', '4.0', '2.5', '70000'],
+        'CustomerID': ['17', '42', None, '7'],
+        'Status': ['Active', 'active', 'ACTIVE', 'Churned'],
+        'M2M': ['Yes', 'n', 'maybe', True],
+        'Other': [object(), None, 1, 'x'],
+    })
+    typed, report = normalizer.normalize(df)
+
+    assert typed['BillingDate'].tolist()[:2] == [pd.Timestamp('2024-03-14'), pd.Timestamp('2024-12-01')]
+    assert typed['Revenue'].tolist()[:2] == [1200.0, -300.5]
+    assert str(typed['Quantity'].dtype) == 'Int32'
+    assert typed['Quantity'].tolist()[:2] == [3, 4]
+    assert str(typed['CustomerID'].dtype) == 'Int8'
+    assert typed['Status'].tolist() == ['Active', 'Active', 'Active', 'Churned']
+    assert typed['M2M'].tolist()[:2] == [True, False]
+    assert typed['Other'].equals(df['Other'])
+
+    failures = {row['column']: (row['values'], row['failures']) for row in report}
+    assert failures == {'BillingDate': (3, 1), 'Revenue': (3, 1), 'Quantity': (4, 1), 'CustomerID': (3, 0),
+                        'Status': (4, 0), 'M2M': (4, 1)}
+
+
+def test_date_column_is_parsed_with_one_format(normalizer):
+    # 01/02/2024 fits both orders; the column is day-first because 25/12/2024 only fits that
+    dates = normalizer.coerce(pd.Series(['25/12/2024', '01/02/2024', '2024-03-01']), 'datetime')
+    assert dates.tolist()[:2] == [pd.Timestamp('2024-12-25'), pd.Timestamp('2024-02-01')]
+    assert pd.isna(dates.iloc[2])
+
+
+def test_percentages_are_failures_unless_read_as_fractions():
+    values = pd.Series(['15%', '2.5'])
+    assert SFNTypeNormalizer(column_types=TYPES).coerce(values, 'decimal').isna().tolist() == [True, False]
+    assert SFNTypeNormalizer(column_types=TYPES, percent_as_fraction=True).coerce(values, 'decimal').tolist() == [0.15, 2.5]
+
+
+def test_ids_that_are_not_plain_integers_stay_text(normalizer):
+    ids = normalizer.coerce(pd.Series(['007', 'A-1', '007', 'A-1']), 'id')
+    assert ids.dtype == 'category'
+    assert ids.tolist() == ['007', 'A-1', '007', 'A-1']
+    distinct = normalizer.coerce(pd.Series(['a', 'b', 'c', 'd']), 'categorical')
+    assert distinct.dtype != 'category'
+
+
+def test_unknown_target_types_are_rejected():
+    with pytest.raises(ValueError, match="Unknown target types: money"):
+        SFNTypeNormalizer(column_types={'Revenue': 'money'})
+
+
+def test_chunked_and_whole_column_results_agree():
+    values = pd.Series(np.random.default_rng(0).integers(0, 1000, 50).astype(str))
+    whole = SFNTypeNormalizer(column_types=TYPES, chunk_rows=1000).coerce(values, 'integer')
+    sliced = SFNTypeNormalizer(column_types=TYPES, chunk_rows=7).coerce(values, 'integer')
+    pd.testing.assert_series_equal(whole, sliced)
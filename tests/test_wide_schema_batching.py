@@ -0,0 +1,67 @@
+import json
+import pandas as pd
+import pytest
+from sfn_blueprint import Task
+from agents.column_mapping_agent import SFNColumnMappingAgent
+from config.app_config import APP_CONFIG
+
+TRUTH = {'CustomerID': 'c1', 'BillingDate': 'c2', 'Revenue': 'c3'}
+
+
+@pytest.fixture
+def small_budget(monkeypatch):
+    # 80 prompt characters per batch: about ten short column names
+    monkeypatch.setitem(APP_CONFIG["wide_schema"], "max_input_tokens_per_batch", 20)
+    monkeypatch.setitem(APP_CONFIG["wide_schema"], "chars_per_token", 4)
+
+
+def test_batches_respect_the_budget_and_keep_input_order(small_budget):
+    columns = [f"field_{index}" for index in range(40)]
+    batches = SFNColumnMappingAgent()._split_into_batches(columns)
+
+    assert len(batches) > 1
+    assert [col for batch in batches for col in batch] == columns
+    assert all(sum(len(repr(col)) + 2 for col in batch) <= 80 for batch in batches)
+    assert SFNColumnMappingAgent()._split_into_batches(['x' * 200]) == [['x' * 200]]
+
+
+def test_merge_prefers_the_best_named_claim_then_the_earliest_column():
+    agent = SFNColumnMappingAgent()
+    inputs = ['amount', 'revenue', 'date_a', 'date_b']
+    merged = agent._merge_batch_mappings([
+        {'Revenue': 'amount', 'BillingDate': 'date_a', 'Currency': None},
+        {'Revenue': 'revenue', 'BillingDate': 'date_b', 'Currency': None},
+    ], inputs)
+
+    assert merged == {'Revenue': 'revenue', 'BillingDate': 'date_a', 'Currency': None}
+
+
+def test_wide_schema_is_mapped_in_concurrent_batches(small_budget, stub_server, route_to_stub):
+    server = stub_server(latency_ms=0, jitter_ms=0)
+    server.set_schema({'category': 'billing', 'truth': TRUTH})
+    agent = SFNColumnMappingAgent()
+    route_to_stub(server, agent)
+    columns = [f"f{index}" for index in range(30)] + list(TRUTH.values())
+
+    mapping = agent.execute_task(Task("Map columns", data={'dataframe': pd.DataFrame(columns=columns),
+                                                           'category': 'billing'}))
+
+    assert server.stats['requests'] == len(agent._split_into_batches(columns)) > 1
+    assert {std: col for std, col in mapping.items() if col} == TRUTH
+
+
+def test_batches_claiming_one_input_twice_keep_one_claim(small_budget, stub_server, route_to_stub):
+    server = stub_server(latency_ms=0, jitter_ms=0)
+    # The batch holding c3 assigns it to two standard columns; the other batches map nothing
+    server.answer = lambda prompt: json.dumps({
+        'Revenue': 'c3', 'CustomerID': 'c3', 'BillingDate': 'c2'
+    }) if "'c3'" in prompt else json.dumps({})
+    agent = SFNColumnMappingAgent()
+    route_to_stub(server, agent)
+    columns = [f"f{index}" for index in range(30)] + list(TRUTH.values())
+
+    mapping = agent.execute_task(Task("Map columns", data={'dataframe': pd.DataFrame(columns=columns),
+                                                           'category': 'billing'}))
+
+    assert list(mapping.values()).count('c3') == 1
+    assert mapping['BillingDate'] == 'c2'
@@ -0,0 +1,36 @@
+import asyncio
+import threading
+import weakref
+from openai import AsyncOpenAI
+
+
+class SFNAsyncClientProvider:
+    """
+    Hands out AsyncOpenAI clients that share credentials with a sync client.
+
+    httpx connection pools are bound to the event loop that created them, so there is
+    one async client per running loop (e.g. one per ``asyncio.run`` call of each
+    Streamlit session sharing the pooled agents). The code that owns a loop closes the
+    loop's client with ``aclose`` before the loop ends.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._lock = threading.Lock()
+        self._clients = weakref.WeakKeyDictionary()
+
+    def get(self) -> AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            async_client = self._clients.get(loop)
+            if async_client is None:
+                async_client = self._clients[loop] = AsyncOpenAI(api_key=self.client.api_key,
+                                                                 base_url=self.client.base_url)
+            return async_client
+
+    async def aclose(self):
+        """Close the running loop's client, if one was created."""
+        with self._lock:
+            async_client = self._clients.pop(asyncio.get_running_loop(), None)
+        if async_client is not None:
+            await async_client.close()
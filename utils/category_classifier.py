@@ -0,0 +1,258 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+from config.app_config import APP_CONFIG
+from utils.column_matcher import tokenize_column_name
+from utils.mapping_registry import SFNMappingRegistry, normalize_column_name
+from utils.schema_registry import get_schema_registry
+from utils.shared_resources import get_shared, load_json_config
+
+
+@lru_cache(maxsize=65536)
+def _name_features(column: str) -> Tuple[str, ...]:
+    # Column names recur across files and calls, so tokenizing is paid once per name
+    features = [token for token in tokenize_column_name(column) if not token.isdigit()]
+    normalized = normalize_column_name(column)
+    if normalized and not normalized.isdigit():
+        features.append(f"={normalized}")
+    return tuple(features)
+
+
+def column_features(columns: List[str]) -> List[str]:
+    """
+    Turn a schema into the bag of features the classifier scores: every name token
+    plus the whole normalized name, so a column seen before counts more than its parts.
+    Pure numbers (the 2 in RevenueProduct2) say nothing about the category and are dropped.
+    """
+    features = []
+    for column in columns:
+        features.extend(_name_features(str(column)))
+    return features
+
+
+class SFNCategoryClassifier:
+    """
+    In-process multinomial naive Bayes classifier of dataset categories over column-name features.
+
+    It is trained from the standard column vocabulary (standard columns and their synonyms,
+    one pseudo-schema per category) and from schemas whose category a user confirmed in Step 2.
+    Confirmed schemas are stored in SQLite and folded into the token counts as they arrive,
+    so retraining is a counter update rather than a refit. A prediction is only trusted when
+    its posterior clears ``confidence_threshold``, enough of the schema's columns are known
+    to the model (``min_coverage``) and at least ``min_name_matches`` whole column names are
+    known to the best category but not to the runner-up; otherwise the caller asks the LLM.
+    Generic names such as CustomerID, Date or Status occur in several categories, so a schema
+    made only of them can reach a high posterior without evidence for any one category.
+    """
+
+    def __init__(self, path: Optional[str] = None, confidence_threshold: Optional[float] = None,
+                 min_coverage: Optional[float] = None, min_name_matches: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        self.config = APP_CONFIG["category_classifier"]
+        self.path = path or self.config["path"]
+        self.confidence_threshold = confidence_threshold if confidence_threshold is not None \
+            else self.config["confidence_threshold"]
+        self.min_coverage = min_coverage if min_coverage is not None else self.config["min_coverage"]
+        self.min_name_matches = min_name_matches if min_name_matches is not None \
+            else self.config["min_name_matches"]
+        self.enabled = enabled if enabled is not None else self.config["enabled"]
+        self.alpha = self.config["alpha"]
+        self._lock = threading.Lock()
+        # category -> feature counts / number of training schemas, from confirmations only
+        self._learned_counts: Dict[str, Counter] = {}
+        self._learned_schemas: Counter = Counter()
+        # columns fingerprint -> (category, features) of every confirmed schema
+        self._examples: Dict[str, tuple] = {}
+        self._vocabulary_version = None
+        self._vocabulary_counts: Dict[str, Counter] = {}
+        self._model = None
+        if self.enabled:
+            self._init_db()
+            self._load_examples()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS category_examples ("
+                "fingerprint TEXT PRIMARY KEY, "
+                "category TEXT NOT NULL, "
+                "columns TEXT NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+
+    def _load_examples(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT fingerprint, category, columns FROM category_examples").fetchall()
+        for fingerprint, category, columns in rows:
+            self._add_example(fingerprint, category, column_features(json.loads(columns)))
+
+    def _add_example(self, fingerprint: str, category: str, features: List[str]):
+        previous = self._examples.pop(fingerprint, None)
+        if previous is not None:
+            # A re-confirmed schema replaces its earlier label instead of counting twice
+            self._learned_counts[previous[0]].subtract(previous[1])
+            self._learned_schemas[previous[0]] -= 1
+        self._examples[fingerprint] = (category, features)
+        self._learned_counts.setdefault(category, Counter()).update(features)
+        self._learned_schemas[category] += 1
+        self._model = None
+
+    def learn(self, columns: List[str], category: str):
+        """
+        Add a schema with its confirmed category to the training data.
+
+        :param columns: List of column names in the dataset
+        :param category: Category the user confirmed
+        """
+        if not self.enabled:
+            return
+        # Only real categories are learned; 'none of these' is a failed answer, not a label
+        if category != 'other' and category not in get_schema_registry().load().standard_columns:
+            return
+        fingerprint = SFNMappingRegistry.fingerprint(columns)
+        with self._lock:
+            self._add_example(fingerprint, category, column_features(columns))
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO category_examples (fingerprint, category, columns, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (fingerprint, category, json.dumps(list(columns)), time.time())
+                )
+
+    def predict(self, columns: List[str]) -> Dict:
+        """
+        Score a schema against every known category.
+
+        :param columns: List of column names in the dataset
+        :return: Dictionary with the best 'category' (None when nothing is known), its
+                 'confidence' (posterior probability), the 'runner_up' category, the share of
+                 columns the model has seen tokens of ('coverage'), the number of whole column
+                 names only the best category has seen ('name_matches') and whether the
+                 prediction can be trusted ('confident')
+        """
+        prediction = {'category': None, 'confidence': 0.0, 'runner_up': None, 'coverage': 0.0,
+                      'name_matches': 0, 'confident': False}
+        if not self.enabled or not columns:
+            return prediction
+        log_priors, log_probs, unseen, vocabulary = self._get_model()
+        if not log_priors:
+            return prediction
+
+        # Features no category has seen score the same everywhere, so only known ones are looked up
+        known_columns = 0
+        features = []
+        for column in columns:
+            known = [feature for feature in _name_features(str(column)) if feature in vocabulary]
+            known_columns += bool(known)
+            features.extend(known)
+        if not features:
+            return prediction
+
+        scores = {}
+        for category, log_prior in log_priors.items():
+            table, floor = log_probs[category], unseen[category]
+            scores[category] = log_prior + sum(table.get(feature, floor) for feature in features)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        best = ranked[0]
+        runner_up = ranked[1] if len(ranked) > 1 else None
+        # Posterior of the best category through a stable softmax over the log scores
+        total = sum(math.exp(score - scores[best]) for score in scores.values())
+        # Whole-name features (=customerid) that set the best category apart from the runner-up
+        runner_up_table = log_probs[runner_up] if runner_up is not None else {}
+        name_matches = len({
+            feature for feature in features
+            if feature.startswith('=') and feature in log_probs[best] and feature not in runner_up_table
+        })
+        prediction['category'] = best
+        prediction['confidence'] = 1 / total
+        prediction['runner_up'] = runner_up
+        prediction['coverage'] = known_columns / len(columns)
+        prediction['name_matches'] = name_matches
+        prediction['confident'] = (prediction['confidence'] >= self.confidence_threshold
+                                   and prediction['coverage'] >= self.min_coverage
+                                   and name_matches >= self.min_name_matches)
+        return prediction
+
+    def classify(self, columns: List[str]) -> Optional[str]:
+        """
+        Return the category when the classifier is confident, otherwise None.
+
+        :param columns: List of column names in the dataset
+        :return: Category name or None
+        """
+        prediction = self.predict(columns)
+        return prediction['category'] if prediction['confident'] else None
+
+    def _get_model(self):
+        schemas = get_schema_registry().load()
+        synonyms = load_json_config(APP_CONFIG["pre_matcher"]["synonyms_path"])
+        with self._lock:
+            # The schema version covers the synonyms too, so it tells whether the vocabulary changed
+            if self._vocabulary_version != schemas.version:
+                self._vocabulary_version = schemas.version
+                self._vocabulary_counts = self._vocabulary(schemas.standard_columns, synonyms)
+                self._model = None
+            if self._model is None:
+                self._model = self._fit()
+            return self._model
+
+    @staticmethod
+    def _vocabulary(standard_columns: Dict, synonyms: Dict) -> Dict[str, Counter]:
+        counts = {}
+        for category, columns in standard_columns.items():
+            names = []
+            for std_col in columns['mandatory'] + columns['optional']:
+                names.append(std_col)
+                names.extend(synonyms.get(std_col, []))
+            counts[category] = Counter(column_features(names))
+        return counts
+
+    def _fit(self):
+        categories = set(self._vocabulary_counts) | {
+            category for category, schemas in self._learned_schemas.items() if schemas > 0
+        }
+        counts = {}
+        for category in categories:
+            category_counts = Counter(self._vocabulary_counts.get(category, {}))
+            category_counts.update(self._learned_counts.get(category, {}))
+            counts[category] = +category_counts
+        vocabulary = set().union(*counts.values()) if counts else set()
+        # The vocabulary pseudo-schema counts as one training schema per category
+        schemas = {category: (category in self._vocabulary_counts) + self._learned_schemas[category]
+                   for category in categories}
+        total_schemas = sum(schemas.values())
+
+        log_priors, log_probs, unseen = {}, {}, {}
+        for category, category_counts in counts.items():
+            log_priors[category] = math.log((schemas[category] + 1) / (total_schemas + len(categories)))
+            denominator = math.log(sum(category_counts.values()) + self.alpha * len(vocabulary))
+            log_probs[category] = {
+                feature: math.log(count + self.alpha) - denominator
+                for feature, count in category_counts.items()
+            }
+            unseen[category] = math.log(self.alpha) - denominator
+        return log_priors, log_probs, unseen, vocabulary
+
+
+def get_category_classifier() -> SFNCategoryClassifier:
+    """
+    Return the process-wide category classifier.
+    """
+    return get_shared('category_classifier', SFNCategoryClassifier)
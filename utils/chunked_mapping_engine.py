@@ -0,0 +1,127 @@
+import os
+from typing import Dict, Iterator, List, Optional
+import pandas as pd
+from config.app_config import APP_CONFIG
+from utils.mapped_data_exporter import rename_map
+from utils.metrics import get_metrics
+from utils.sample_data_loader import file_extension
+
+
+class SFNChunkedMappingEngine:
+    """
+    Streaming engine that rewrites a file to the standard schema chunk by chunk.
+
+    Only the mapped input columns are read (projection happens in the reader), each
+    chunk is renamed and appended to the output, so peak memory is bounded by
+    ``chunk_size`` rather than the file size. CSV and Parquet are supported as both
+    input and output formats.
+    """
+
+    SUPPORTED_FORMATS = ('csv', 'parquet')
+
+    def __init__(self, chunk_size: Optional[int] = None):
+        self.chunk_size = chunk_size or APP_CONFIG["chunked_engine"]["chunk_size"]
+
+    @staticmethod
+    def file_format(path: str) -> str:
+        return file_extension(path)
+
+    @classmethod
+    def supports(cls, path: str) -> bool:
+        return cls.file_format(path) in cls.SUPPORTED_FORMATS
+
+    def apply(self, input_path: str, output_path: str, mapping: Dict[str, Optional[str]]) -> Dict:
+        """
+        Apply a confirmed mapping to a file and write the mapped columns to a new file.
+
+        :param input_path: CSV or Parquet file to read
+        :param output_path: CSV or Parquet file to write; the format follows the extension
+        :param mapping: Confirmed mapping of standard columns to input columns
+        :return: Dictionary with the number of rows and chunks written and the output columns
+        """
+        input_format, output_format = self.file_format(input_path), self.file_format(output_path)
+        if input_format not in self.SUPPORTED_FORMATS or output_format not in self.SUPPORTED_FORMATS:
+            raise ValueError("Chunked mapping supports only CSV and Parquet input and output files.")
+
+        # An input column mapped twice would be read once and survive under one name only
+        rename_map(mapping)
+        # Standard column order, restricted to columns that are actually mapped
+        selected = [(std_col, input_col) for std_col, input_col in mapping.items() if input_col is not None]
+        if not selected:
+            raise ValueError("Mapping does not contain any mapped columns")
+        input_columns = [input_col for _, input_col in selected]
+        output_columns = [std_col for std_col, _ in selected]
+
+        if input_format == 'csv':
+            tables = self._read_csv(input_path, input_columns, output_columns)
+        else:
+            tables = self._read_parquet(input_path, input_columns, output_columns)
+
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        metrics = get_metrics()
+        with metrics.span('chunked_apply', input_format=input_format, output_format=output_format):
+            rows, chunks = self._write(tables, output_path, output_format)
+        metrics.increment('chunked_apply_rows', rows, output_format=output_format)
+        metrics.increment('chunked_apply_chunks', chunks, output_format=output_format)
+        return {'rows': rows, 'chunks': chunks, 'columns': output_columns, 'output_file': output_path}
+
+    def _read_csv(self, path: str, input_columns: List[str], output_columns: List[str]) -> Iterator:
+        import pyarrow as pa
+        renames = dict(zip(input_columns, output_columns))
+        reader = pd.read_csv(path, usecols=input_columns, chunksize=self.chunk_size, low_memory=False)
+        for chunk in reader:
+            chunk = chunk[input_columns].rename(columns=renames)
+            yield pa.Table.from_pandas(chunk, preserve_index=False)
+
+    def _read_parquet(self, path: str, input_columns: List[str], output_columns: List[str]) -> Iterator:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=self.chunk_size, columns=input_columns):
+            yield pa.Table.from_batches([batch]).select(input_columns).rename_columns(output_columns)
+
+    def _write(self, tables: Iterator, output_path: str, output_format: str):
+        if output_format == 'csv':
+            return self._write_csv(tables, output_path)
+        return self._write_parquet(tables, output_path)
+
+    @staticmethod
+    def _write_csv(tables: Iterator, output_path: str):
+        import pyarrow.csv as pacsv
+        rows, chunks = 0, 0
+        with open(output_path, 'wb') as sink:
+            for table in tables:
+                # CSV has no schema to keep stable, so chunks with drifting inferred types are fine
+                pacsv.write_csv(table, sink, write_options=pacsv.WriteOptions(include_header=chunks == 0))
+                rows += table.num_rows
+                chunks += 1
+        return rows, chunks
+
+    def _write_parquet(self, tables: Iterator, output_path: str):
+        import pyarrow.parquet as pq
+        writer, schema, rows, chunks = None, None, 0, 0
+        try:
+            for table in tables:
+                if writer is None:
+                    schema = table.schema.remove_metadata()
+                    writer = pq.ParquetWriter(output_path, schema)
+                elif not table.schema.equals(schema, check_metadata=False):
+                    # Chunk-wise type inference can differ (e.g. ints with nulls become floats)
+                    table = self._cast(table, schema)
+                writer.write_table(table)
+                rows += table.num_rows
+                chunks += 1
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows, chunks
+
+    @staticmethod
+    def _cast(table, schema):
+        import pyarrow as pa
+        try:
+            return table.cast(schema)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+            raise ValueError(
+                f"Column types changed between chunks ({e}). Use a larger chunk size or CSV output."
+            ) from e
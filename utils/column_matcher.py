@@ -0,0 +1,142 @@
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+from config.app_config import APP_CONFIG
+from utils.mapping_registry import normalize_column_name
+from utils.shared_resources import load_json_config
+
+
+def tokenize_column_name(column: str) -> List[str]:
+    """
+    Split a column name into lower-case tokens on camelCase boundaries and punctuation.
+    """
+    spaced = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', str(column))
+    spaced = re.sub(r'([A-Z]+)([A-Z][a-z])', r'\1 \2', spaced)
+    return [token for token in re.split(r'[^a-z0-9]+', spaced.lower()) if token]
+
+
+class SFNColumnPreMatcher:
+    """
+    Deterministic matcher that resolves obvious input -> standard column pairs
+    locally, before anything is sent to the LLM.
+
+    A pair is scored 1.0 when the normalized names (or a configured synonym) are
+    identical, 0.95 when the token sets are identical, and otherwise by fuzzy string
+    similarity. Pairs at or above ``threshold`` are assigned greedily, best first,
+    so every input and standard column is used at most once.
+    """
+
+    def __init__(self, synonyms: Optional[Dict[str, List[str]]] = None, threshold: Optional[float] = None):
+        config = APP_CONFIG["pre_matcher"]
+        if synonyms is None:
+            synonyms = load_json_config(config["synonyms_path"])
+        self.threshold = threshold if threshold is not None else config["threshold"]
+        self.enabled = config["enabled"]
+
+        # Precompute every spelling of each standard column once
+        self._variants = {}
+        for std_col, names in synonyms.items():
+            self._variants[std_col] = self._build_variants([std_col] + list(names))
+
+    @staticmethod
+    def _build_variants(names: List[str]) -> List[Tuple]:
+        variants, seen = [], set()
+        for name in names:
+            normalized = normalize_column_name(name)
+            if not normalized or normalized in seen:
+                continue
+            seen.add(normalized)
+            variants.append((
+                normalized,
+                ' '.join(sorted(tokenize_column_name(name))),
+                re.findall(r'\d+', normalized),
+                Counter(normalized)
+            ))
+        return variants
+
+    def score(self, input_col: str, std_col: str) -> float:
+        """
+        Score how confidently an input column corresponds to a standard column.
+
+        :param input_col: Input column name
+        :param std_col: Standard column name
+        :return: Score between 0 and 1
+        """
+        return self._score(self._input_key(input_col), std_col)
+
+    @staticmethod
+    def _input_key(input_col: str) -> Tuple:
+        normalized = normalize_column_name(input_col)
+        return (
+            normalized,
+            ' '.join(sorted(tokenize_column_name(input_col))),
+            re.findall(r'\d+', normalized),
+            Counter(normalized)
+        )
+
+    def _score(self, input_key: Tuple, std_col: str) -> float:
+        normalized, token_key, digits, char_counts = input_key
+        variants = self._variants.get(std_col)
+        if variants is None:
+            variants = self._variants[std_col] = self._build_variants([std_col])
+
+        best = 0.0
+        for variant_norm, variant_tokens, variant_digits, variant_counts in variants:
+            if normalized == variant_norm:
+                return 1.0
+            if token_key == variant_tokens:
+                best = max(best, 0.95)
+                continue
+            # Numbered columns (RevenueProduct1 vs RevenueProduct2) must never fuzzy-match each other
+            if digits != variant_digits:
+                continue
+            # Cheap upper bounds first (length, then shared characters); only a pair
+            # that can still clear the threshold pays for SequenceMatcher.ratio()
+            floor = max(best, self.threshold)
+            total_length = len(normalized) + len(variant_norm)
+            if 2.0 * min(len(normalized), len(variant_norm)) / total_length < floor:
+                continue
+            if 2.0 * sum((char_counts & variant_counts).values()) / total_length < floor:
+                continue
+            best = max(best, SequenceMatcher(None, normalized, variant_norm).ratio())
+        return best
+
+    def match(self, input_columns: List[str], standard_columns: Dict[str, List[str]]
+              ) -> Tuple[Dict[str, str], List[str], Dict[str, List[str]]]:
+        """
+        Resolve high-confidence matches and return what is left for the LLM.
+
+        :param input_columns: List of input column names
+        :param standard_columns: Dictionary with the 'mandatory' and 'optional' standard columns
+        :return: Tuple of (matched standard -> input mapping, unresolved input columns,
+                 unresolved standard columns in the same 'mandatory'/'optional' layout)
+        """
+        if not self.enabled:
+            return {}, list(input_columns), standard_columns
+
+        all_standard = standard_columns['mandatory'] + standard_columns['optional']
+        candidates = []
+        for input_index, input_col in enumerate(input_columns):
+            input_key = self._input_key(input_col)
+            for std_index, std_col in enumerate(all_standard):
+                pair_score = self._score(input_key, std_col)
+                if pair_score >= self.threshold:
+                    candidates.append((-pair_score, input_index, std_index))
+
+        # Greedy one-to-one assignment, best score first; ties fall back to column order
+        matched = {}
+        used_inputs = set()
+        for _, input_index, std_index in sorted(candidates):
+            std_col, input_col = all_standard[std_index], input_columns[input_index]
+            if std_col in matched or input_col in used_inputs:
+                continue
+            matched[std_col] = input_col
+            used_inputs.add(input_col)
+
+        residue_inputs = [col for col in input_columns if col not in used_inputs]
+        residue_standard = {
+            'mandatory': [col for col in standard_columns['mandatory'] if col not in matched],
+            'optional': [col for col in standard_columns['optional'] if col not in matched]
+        }
+        return matched, residue_inputs, residue_standard
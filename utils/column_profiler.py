@@ -0,0 +1,248 @@
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from config.app_config import APP_CONFIG
+from utils.metrics import get_metrics
+from utils.shared_resources import get_shared
+from utils.type_normalizer import TEXT_DTYPE, SFNTypeNormalizer
+
+FINGERPRINT_ROWS = 100
+# Values shaped like a date (2024-01-15, 01/15/2024, 15.01.2024, 15 Jan 2024, Jan 15, 2024 or 20240115)
+DATE_LIKE = r'\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}|\d{1,2} [A-Za-z]{3}|[A-Za-z]{3} \d{1,2}|^\d{8}$'
+
+
+class SFNColumnProfiler:
+    """
+    Compact per-column fingerprints computed on a bounded row sample.
+
+    A profile holds the inferred type, date and numeric parse hit rates, the value range,
+    null rate, distinct ratio and a few example values. At most ``sample_rows`` rows are
+    looked at, so the cost does not grow with the dataset. Profiles are computed lazily per
+    column and cached per file (keyed by a fingerprint of the sample), so the category and
+    mapping agents share one profiling pass per upload.
+    """
+
+    def __init__(self, sample_rows: Optional[int] = None, example_values: Optional[int] = None,
+                 cache_entries: Optional[int] = None, enabled: Optional[bool] = None):
+        self.config = APP_CONFIG["profiling"]
+        self.sample_rows = sample_rows or self.config["sample_rows"]
+        self.example_values = example_values if example_values is not None else self.config["example_values"]
+        self.cache_entries = cache_entries or self.config["cache_entries"]
+        self.enabled = enabled if enabled is not None else self.config["enabled"]
+        self.normalizer = SFNTypeNormalizer(column_types={})
+        self._profiles: OrderedDict = OrderedDict()
+        # id(df) -> (weak reference, sample, fingerprint), so repeated calls skip sampling and hashing
+        self._samples: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def profile(self, df: pd.DataFrame, columns: Optional[List] = None) -> Dict:
+        """
+        Profile columns of a DataFrame.
+
+        :param df: Loaded data (or a sample of it)
+        :param columns: Columns to profile; defaults to every column
+        :return: Dictionary of column -> profile; empty when profiling is disabled
+        """
+        # Without rows there is nothing to fingerprint, only empty columns
+        if not self.enabled or len(df) == 0:
+            return {}
+        columns = df.columns.tolist() if columns is None else columns
+        sample, key = self._sample(df)
+        with self._lock:
+            profiles = self._profiles.setdefault(key, {})
+            self._profiles.move_to_end(key)
+            while len(self._profiles) > self.cache_entries:
+                evicted, _ = self._profiles.popitem(last=False)
+                self._key_locks.pop(evicted, None)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Concurrent agents profiling the same file wait for one pass instead of repeating it
+        with key_lock:
+            missing = [col for col in columns if col not in profiles]
+            if missing:
+                positions = {}
+                for position, col in enumerate(sample.columns):
+                    positions.setdefault(col, position)
+                missing = [col for col in missing if col in positions]
+                with get_metrics().span('profile_columns'):
+                    computed = self._profile_columns(sample.iloc[:, [positions[col] for col in missing]])
+                profiles.update(zip(missing, computed))
+        return {col: profiles[col] for col in columns if col in profiles}
+
+    def _sample(self, df: pd.DataFrame):
+        with self._lock:
+            cached = self._samples.get(id(df))
+            if cached is not None and cached[0]() is df:
+                return cached[1], cached[2]
+
+        sample = df if len(df) <= self.sample_rows else df.sample(n=self.sample_rows, random_state=0)
+        # The shape, column names and leading sample rows identify the file well enough
+        digest = hashlib.sha1(repr((df.columns.tolist(), df.shape)).encode('utf-8'))
+        head = pd.Series(sample.head(FINGERPRINT_ROWS).to_numpy(dtype=object).ravel()).astype(str)
+        digest.update(pd.util.hash_pandas_object(head, index=False).to_numpy().tobytes())
+        key = digest.hexdigest()
+
+        with self._lock:
+            frame_id = id(df)
+            self._samples[frame_id] = (weakref.ref(df, lambda _: self._samples.pop(frame_id, None)), sample, key)
+        return sample, key
+
+    def _profile_columns(self, frame: pd.DataFrame) -> List[Dict]:
+        """
+        Profile every column of a sample in one vectorized pass.
+
+        The columns are stacked into a single text series, parsed once as numbers, dates and
+        booleans, and the per-column rates are aggregated by column code, so the cost is a
+        handful of array operations rather than a pandas call chain per column.
+        """
+        rows, width = frame.shape
+        # Column-major stacking keeps each column's values contiguous under one code
+        text = pd.Series(frame.to_numpy(dtype=object).ravel(order='F')).astype(TEXT_DTYPE).str.strip()
+        present = text.ne('').fillna(False).to_numpy(dtype=bool)
+        codes = np.repeat(np.arange(width), rows)[present]
+        text = text[present].reset_index(drop=True)
+        values = np.bincount(codes, minlength=width)
+
+        numbers = self.normalizer.coerce(text, 'decimal').to_numpy()
+        is_number = ~np.isnan(numbers)
+        fractional = is_number & (numbers != np.floor(numbers))
+        # Only values shaped like a date go through the date formats
+        date_like = text.str.contains(DATE_LIKE, regex=True).fillna(False).to_numpy(dtype=bool)
+        # Every column gets its own date format; one format for the stacked series would fail whole columns
+        date_text = text[date_like]
+        if len(date_text):
+            dates = pd.concat([
+                self.normalizer.coerce(group, 'datetime')
+                for _, group in date_text.groupby(codes[date_like], sort=False)
+            ]).reindex(date_text.index)
+        else:
+            dates = self.normalizer.coerce(date_text, 'datetime')
+        is_date = dates.notna().to_numpy()
+        is_boolean = self.normalizer.coerce(text, 'boolean').notna().to_numpy()
+
+        distinct_values = pd.DataFrame({'code': codes, 'value': text.to_numpy()}).drop_duplicates()
+        distinct = np.bincount(distinct_values['code'].to_numpy(), minlength=width)
+        leading = distinct_values[distinct_values.groupby('code').cumcount().to_numpy() < self.example_values]
+        examples = {}
+        for code, value in zip(leading['code'].tolist(), leading['value'].tolist()):
+            examples.setdefault(code, []).append(value)
+        number_range = pd.Series(numbers[is_number]).groupby(codes[is_number]).agg(['min', 'max'])
+        date_range = dates[is_date].reset_index(drop=True).groupby(codes[date_like][is_date]).agg(['min', 'max'])
+
+        def rate(hits: np.ndarray, hit_codes: np.ndarray) -> np.ndarray:
+            counts = np.bincount(hit_codes[hits], minlength=width)
+            return np.divide(counts, values, out=np.zeros(width), where=values > 0)
+
+        numeric_rate = rate(is_number, codes)
+        date_rate = rate(is_date, codes[date_like])
+        boolean_rate = rate(is_boolean, codes)
+        integral = np.bincount(codes[fractional], minlength=width) == 0
+
+        threshold = self.config["type_threshold"]
+        profiles = []
+        for index in range(width):
+            count = int(values[index])
+            profile = {
+                'type': 'empty',
+                'null_rate': round(1 - count / rows, 3) if rows else 1.0,
+                'distinct': int(distinct[index]),
+                'distinct_ratio': round(distinct[index] / count, 3) if count else 0.0,
+                'numeric_rate': round(float(numeric_rate[index]), 3),
+                'date_rate': round(float(date_rate[index]), 3),
+                'examples': [
+                    value if len(value) <= 40 else value[:37] + '...'
+                    for value in examples.get(index, [])
+                ]
+            }
+            if not count:
+                pass
+            elif distinct[index] <= 2 and boolean_rate[index] == 1:
+                profile['type'] = 'boolean'
+            elif numeric_rate[index] >= threshold:
+                # Numbers first: plain integers such as IDs would otherwise parse as years
+                profile['type'] = 'integer' if integral[index] else 'decimal'
+                low, high = number_range.loc[index]
+                profile['min'], profile['max'] = f"{low:g}", f"{high:g}"
+            elif date_rate[index] >= threshold:
+                profile['type'] = 'datetime'
+                low, high = date_range.loc[index]
+                profile['min'], profile['max'] = str(low.date()), str(high.date())
+            elif profile['distinct_ratio'] <= self.config["categorical_ratio"]:
+                profile['type'] = 'categorical'
+            else:
+                profile['type'] = 'text'
+            profiles.append(profile)
+        return profiles
+
+
+def format_profiles(profiles: Optional[Dict], columns: List, types_only: bool = False) -> str:
+    """
+    Render profiles as prompt lines, one per column.
+
+    :param profiles: Dictionary of column -> profile, as returned by SFNColumnProfiler.profile
+    :param columns: Columns to include, in prompt order
+    :param types_only: Render only the inferred types. Ranges, rates and examples change with
+                       every delivery of a feed, so the LLM cache keys on this rendering
+    :return: Prompt block, or an empty string when there is nothing to add
+    """
+    lines = []
+    for col in columns:
+        profile = (profiles or {}).get(col)
+        if profile is None:
+            continue
+        if types_only:
+            lines.append(f"- {col!r}: {profile['type']}")
+            continue
+        parts = [profile['type']]
+        if 'min' in profile:
+            parts.append(f"{profile['min']} to {profile['max']}")
+        parts.append(f"{profile['null_rate']:.0%} null")
+        if profile['distinct_ratio'] < 0.1:
+            parts.append(f"{profile['distinct']} distinct values")
+        else:
+            parts.append(f"{profile['distinct_ratio']:.0%} distinct")
+        if profile['examples']:
+            parts.append("e.g. " + ", ".join(repr(value) for value in profile['examples']))
+        lines.append(f"- {col!r}: " + ", ".join(parts))
+    if not lines:
+        return ""
+    return "Input column profiles (from a data sample):\n" + "\n".join(lines) + "\n"
+
+
+def mandatory_population(mapping: Dict[str, Optional[str]], mandatory_columns: List[str],
+                         profiles: Dict, min_populated_rate: Optional[float] = None) -> List[Dict]:
+    """
+    Check whether the mandatory standard columns are backed by populated input columns.
+
+    :param mapping: Mapping of standard columns to input columns
+    :param mandatory_columns: Mandatory standard columns of the category
+    :param profiles: Profiles of the mapped input columns
+    :param min_populated_rate: Share of non-null sample values a column needs to count as populated
+    :return: One row per mandatory column with its input column, populated rate and verdict
+    """
+    if min_populated_rate is None:
+        min_populated_rate = APP_CONFIG["profiling"]["min_populated_rate"]
+    rows = []
+    for std_col in mandatory_columns:
+        input_col = mapping.get(std_col)
+        profile = profiles.get(input_col) if input_col is not None else None
+        populated_rate = round(1 - profile['null_rate'], 3) if profile is not None else None
+        rows.append({
+            'column': std_col,
+            'input_column': input_col,
+            'populated_rate': populated_rate,
+            'populated': populated_rate is not None and populated_rate >= min_populated_rate
+        })
+    return rows
+
+
+def get_column_profiler() -> SFNColumnProfiler:
+    """
+    Return the process-wide column profiler.
+    """
+    return get_shared('column_profiler', SFNColumnProfiler)
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from config.app_config import APP_CONFIG
+from utils.metrics import get_metrics
+
+
+class SFNLLMCache:
+    """
+    Persistent on-disk cache for LLM completions.
+
+    Entries live in a SQLite file so they survive Streamlit restarts. The cache is
+    bounded by ``max_entries`` (least recently used entries are evicted first) and
+    every entry expires after ``ttl_seconds``.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[int] = None, enabled: Optional[bool] = None):
+        config = APP_CONFIG["llm_cache"]
+        self.path = path or config["path"]
+        self.max_entries = max_entries if max_entries is not None else config["max_entries"]
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config["ttl_seconds"]
+        self.enabled = enabled if enabled is not None else config["enabled"]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if self.enabled:
+            self._init_db()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A connection per operation keeps the cache safe to share across threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, "
+                "value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+
+    @staticmethod
+    def make_key(agent_type: str, model_config: Dict[str, Any], system_prompt: str,
+                 user_prompt: str, prompt_version: Any = None) -> str:
+        """
+        Build a cache key from everything that influences the completion.
+
+        :param agent_type: Agent type used to render the prompt (e.g. 'column_mapper')
+        :param model_config: Model configuration passed to the completion call
+        :param system_prompt: Rendered system prompt
+        :param user_prompt: Rendered user prompt
+        :param prompt_version: Version of the prompt configuration
+        :return: Hex digest identifying the request
+        """
+        payload = json.dumps({
+            'agent_type': agent_type,
+            'model_config': model_config,
+            'system_prompt': system_prompt,
+            'user_prompt': user_prompt,
+            'prompt_version': prompt_version
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return the cached completion for a key, or None on a miss or expired entry.
+        """
+        if not self.enabled:
+            return None
+
+        value = self._lookup(key)
+        get_metrics().increment('llm_cache_lookups', result='miss' if value is None else 'hit')
+        return value
+
+    def _lookup(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str):
+        """
+        Store a completion and evict the least recently used entries over the size bound.
+        """
+        if not self.enabled:
+            return
+
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            if self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        """Remove every cached entry and reset the counters."""
+        self.hits = 0
+        self.misses = 0
+        if not self.enabled:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get hit/miss counters and the current number of cached entries.
+        """
+        entries = 0
+        if self.enabled:
+            with self._connect() as conn:
+                entries = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': entries,
+            'max_entries': self.max_entries
+        }
@@ -0,0 +1,312 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import openai
+from config.app_config import APP_CONFIG
+from utils.metrics import get_metrics, record_usage
+from utils.shared_resources import get_openai_client, get_shared
+
+# Renders (system_prompt, user_prompt) for a prompt_config.json provider key ('openai', 'anthropic')
+PromptRenderer = Callable[[str], Tuple[str, str]]
+
+# Errors worth retrying on the same provider; anything else (auth, bad request) is not
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class SFNCircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    Only provider-side failures (timeouts, connection errors, rate limits, 5xx) count.
+    After ``failure_threshold`` consecutive failures the circuit opens and the provider is
+    skipped for ``cooldown_seconds``; then a single trial request is let through and its
+    outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                # Exactly one caller gets the trial; others keep skipping until it reports back
+                self.state = 'half_open'
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class SFNLLMProvider:
+    """One OpenAI-compatible chat completions endpoint and model, with its own circuit breaker."""
+
+    def __init__(self, name: str, client: Any, prompt_provider: str = 'openai', model: Optional[str] = None,
+                 breaker: Optional[SFNCircuitBreaker] = None):
+        self.name = name
+        self.client = client
+        self.prompt_provider = prompt_provider
+        self.model = model
+        self.breaker = breaker
+
+
+class SFNLLMRouter:
+    """
+    Deadline-bounded, hedged router over several LLM providers.
+
+    A call goes to the first provider whose circuit is closed. If it has not answered after
+    ``hedge_delay_seconds``, a second request is fired at the next provider and the first
+    response that validates wins. Failed providers fall through to the next one immediately.
+    Transient errors are retried on the same provider with jittered exponential backoff, and
+    nothing outlives the per-call deadline. Every provider is reached through an
+    OpenAI-compatible endpoint (``base_url``), so local stub servers work as providers too.
+    """
+
+    def __init__(self, providers: Optional[List[SFNLLMProvider]] = None, config: Optional[Dict] = None):
+        self.config = config or APP_CONFIG["llm_router"]
+        self.providers = providers if providers is not None else self._build_providers(self.config["providers"])
+        if not self.providers:
+            raise ValueError("No LLM provider configured. Please set the OPENAI_API_KEY environment variable.")
+        self._executor = ThreadPoolExecutor(max_workers=self.config["max_workers"],
+                                            thread_name_prefix="llm-router")
+
+    def _build_providers(self, provider_configs: List[Dict]) -> List[SFNLLMProvider]:
+        providers = []
+        for provider_config in provider_configs:
+            api_key = os.getenv(provider_config.get("api_key_env", "OPENAI_API_KEY"))
+            if not api_key:
+                # Providers without credentials are simply not part of the route
+                continue
+            if provider_config.get("base_url") is None and provider_config.get("api_key_env", "OPENAI_API_KEY") == "OPENAI_API_KEY":
+                # Reuse the shared client and its connection pool; the router owns retries
+                client = get_openai_client().with_options(max_retries=0)
+            else:
+                client = openai.OpenAI(api_key=api_key, base_url=provider_config.get("base_url"), max_retries=0)
+            providers.append(SFNLLMProvider(
+                name=provider_config["name"],
+                client=client,
+                prompt_provider=provider_config.get("prompt_provider", "openai"),
+                model=provider_config.get("model"),
+                breaker=SFNCircuitBreaker(self.config["breaker_failure_threshold"],
+                                          self.config["breaker_cooldown_seconds"])
+            ))
+        return providers
+
+    def complete(self, render: PromptRenderer, model_config: Dict,
+                 validate: Optional[Callable[[str], bool]] = None,
+                 deadline_seconds: Optional[float] = None, agent_type: Optional[str] = None) -> Dict:
+        """
+        Run one chat completion through the providers.
+
+        :param render: Callable returning the (system, user) prompts for a prompt provider key
+        :param model_config: Model settings; a provider's own model overrides ``model_config['model']``
+        :param validate: Optional check on the response text; a response that fails it only wins
+                         when no provider returns a valid one
+        :param deadline_seconds: Overall time limit; defaults to the configured deadline
+        :param agent_type: Calling agent, used to label metrics
+        :return: Dictionary with the response 'content', 'provider', 'model', 'attempts', 'usage' and 'latency'
+        """
+        start = time.monotonic()
+        deadline_at = start + (deadline_seconds or self.config["deadline_seconds"])
+        # No hedge_delay_seconds means plain sequential fallback
+        hedge_delay = self.config["hedge_delay_seconds"]
+        no_hedge = float('inf')
+        pending, errors, invalid = {}, [], None
+        candidates = iter(self.providers)
+
+        def launch() -> bool:
+            for provider in candidates:
+                if provider.breaker is None or provider.breaker.allow():
+                    future = self._executor.submit(self._attempt, provider, render, model_config, deadline_at,
+                                                   agent_type)
+                    pending[future] = provider
+                    return True
+            return False
+
+        if not launch():
+            raise RuntimeError("No LLM provider available: every circuit breaker is open")
+        hedge_at = time.monotonic() + hedge_delay if hedge_delay is not None else no_hedge
+
+        while pending:
+            now = time.monotonic()
+            if now >= deadline_at:
+                break
+            timeout = deadline_at - now
+            if len(pending) < 2:
+                timeout = min(timeout, max(hedge_at - now, 0))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(f"{provider.name}: {e}")
+                    continue
+                if validate is None or validate(result['content']):
+                    result['latency'] = time.monotonic() - start
+                    return result
+                errors.append(f"{provider.name}: response did not validate")
+                invalid = invalid or result
+
+            if not pending:
+                # Everything in flight failed: fall through to the next provider right away
+                if not launch():
+                    break
+                hedge_at = time.monotonic() + hedge_delay if hedge_delay is not None else no_hedge
+            elif len(pending) < 2 and time.monotonic() >= hedge_at:
+                # Slow response: hedge with a second provider; whichever validates first wins
+                if launch():
+                    get_metrics().increment('llm_hedges', agent=agent_type)
+                hedge_at = no_hedge
+
+        if invalid is not None:
+            invalid['latency'] = time.monotonic() - start
+            return invalid
+        if time.monotonic() >= deadline_at:
+            raise TimeoutError(f"LLM call exceeded its {deadline_at - start:.1f}s deadline ({'; '.join(errors)})")
+        raise RuntimeError(f"All LLM providers failed: {'; '.join(errors)}")
+
+    def open_stream(self, render: PromptRenderer, model_config: Dict,
+                    deadline_seconds: Optional[float] = None, agent_type: Optional[str] = None) -> Tuple[Any, Dict]:
+        """
+        Start a streamed chat completion on the first provider whose circuit is closed.
+
+        Providers that fail to open the stream fall through to the next one and count
+        towards their circuit breakers like any other call. Once the stream has started,
+        hedging and retries no longer apply; callers fall back to ``complete`` when it breaks.
+
+        :param render: Callable returning the (system, user) prompts for a prompt provider key
+        :param model_config: Model settings; a provider's own model overrides ``model_config['model']``
+        :param deadline_seconds: Time limit for the whole stream; defaults to the configured deadline
+        :param agent_type: Calling agent, used to label metrics
+        :return: Tuple of (stream of chunks, labels with the agent, provider and model)
+        """
+        errors = []
+        metrics = get_metrics()
+        for provider in self.providers:
+            if provider.breaker is not None and not provider.breaker.allow():
+                continue
+            system_prompt, user_prompt = render(provider.prompt_provider)
+            model = provider.model or model_config["model"]
+            labels = {'agent': agent_type, 'provider': provider.name, 'model': model}
+            try:
+                stream = provider.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=model_config["temperature"],
+                    max_tokens=model_config["max_tokens"],
+                    n=model_config["n"],
+                    stop=model_config["stop"],
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    timeout=deadline_seconds or self.config["deadline_seconds"]
+                )
+            except Exception as e:
+                metrics.increment('llm_call_errors', error=type(e).__name__, streamed=True, **labels)
+                if not isinstance(e, RETRYABLE_ERRORS + (TimeoutError,)):
+                    if provider.breaker is not None:
+                        provider.breaker.record_success()
+                    raise
+                if provider.breaker is not None:
+                    provider.breaker.record_failure()
+                errors.append(f"{provider.name}: {e}")
+                continue
+            if provider.breaker is not None:
+                provider.breaker.record_success()
+            return stream, labels
+        raise RuntimeError(f"No LLM provider could start a stream: {'; '.join(errors) or 'every circuit breaker is open'}")
+
+    def _attempt(self, provider: SFNLLMProvider, render: PromptRenderer, model_config: Dict,
+                 deadline_at: float, agent_type: Optional[str] = None) -> Dict:
+        system_prompt, user_prompt = render(provider.prompt_provider)
+        model = provider.model or model_config["model"]
+        max_retries = self.config["max_retries"]
+        metrics = get_metrics()
+        labels = {'agent': agent_type, 'provider': provider.name, 'model': model}
+        for attempt in range(max_retries + 1):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("deadline exceeded")
+            if attempt:
+                metrics.increment('llm_retries', **labels)
+            start = time.perf_counter()
+            try:
+                response = provider.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=model_config["temperature"],
+                    max_tokens=model_config["max_tokens"],
+                    n=model_config["n"],
+                    stop=model_config["stop"],
+                    timeout=remaining
+                )
+            except Exception as e:
+                metrics.record_span('llm_call', time.perf_counter() - start, **labels)
+                metrics.increment('llm_call_errors', error=type(e).__name__, **labels)
+                if not isinstance(e, RETRYABLE_ERRORS + (TimeoutError,)):
+                    # The provider answered; a bad request or key is the caller's problem and
+                    # must not open the circuit for everyone else
+                    if provider.breaker is not None:
+                        provider.breaker.record_success()
+                    raise
+                if provider.breaker is not None:
+                    provider.breaker.record_failure()
+                if attempt == max_retries:
+                    raise
+                # Full jitter keeps hedged and parallel callers from retrying in lockstep
+                backoff = random.uniform(0, min(self.config["backoff_max_seconds"],
+                                                self.config["backoff_base_seconds"] * 2 ** attempt))
+                if time.monotonic() + backoff >= deadline_at or (provider.breaker and not provider.breaker.allow()):
+                    raise
+                time.sleep(backoff)
+                continue
+
+            metrics.record_span('llm_call', time.perf_counter() - start, **labels)
+            record_usage(getattr(response, 'usage', None), **labels)
+            if provider.breaker is not None:
+                provider.breaker.record_success()
+            return {
+                'content': response.choices[0].message.content.strip(),
+                'provider': provider.name,
+                'model': model,
+                'attempts': attempt + 1,
+                'usage': getattr(response, 'usage', None)
+            }
+
+
+def get_llm_router() -> SFNLLMRouter:
+    """
+    Return the process-wide router, so circuit breaker state is shared by every agent.
+    """
+    return get_shared('llm_router', SFNLLMRouter)
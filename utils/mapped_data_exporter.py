@@ -0,0 +1,178 @@
+import gzip
+import os
+import tempfile
+import time
+from typing import Dict, Iterable, Optional
+import pandas as pd
+from config.app_config import APP_CONFIG
+from utils.metrics import get_metrics
+
+
+def rename_map(mapping: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """
+    Invert a confirmed mapping into the input column -> standard column renames.
+
+    :param mapping: Dictionary of standard column -> input column (or None)
+    :return: Dictionary of input column -> standard column
+    :raises ValueError: When an input column is mapped to more than one standard column,
+                        since only one of them could survive the rename
+    """
+    renames = {}
+    for std_col, input_col in mapping.items():
+        if input_col is None:
+            continue
+        if input_col in renames:
+            raise ValueError(f"Input column '{input_col}' is mapped to both "
+                             f"'{renames[input_col]}' and '{std_col}'")
+        renames[input_col] = std_col
+    return renames
+
+
+def renamed_view(df: pd.DataFrame, rename_map: Dict[str, str]) -> pd.DataFrame:
+    """
+    Relabel columns without copying the underlying data.
+
+    :param df: Source DataFrame
+    :param rename_map: Dictionary of input column -> standard column
+    :return: Shallow DataFrame sharing its data with ``df`` but carrying the new labels
+    """
+    view = df.copy(deep=False)
+    view.columns = [rename_map.get(col, col) for col in df.columns]
+    return view
+
+
+class SFNMappedDataExporter:
+    """
+    Incremental exporter for mapped data.
+
+    Rows are written in slices of ``chunk_rows`` straight to a temporary file, so
+    an export never materializes a second full copy of the data (or its encoded
+    bytes) in memory.
+    """
+
+    # format -> (file extension, MIME type)
+    FORMATS = {
+        'csv': ('.csv', 'text/csv'),
+        'csv.gz': ('.csv.gz', 'application/gzip'),
+        'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+        'arrow': ('.arrow', 'application/vnd.apache.arrow.file')
+    }
+
+    # Prefix of the temporary files, so sweeping never touches anything else in the directory
+    PREFIX = 'mapped_data_'
+
+    def __init__(self, data: pd.DataFrame, chunk_rows: Optional[int] = None):
+        self.data = data
+        self.chunk_rows = chunk_rows or APP_CONFIG["export"]["chunk_rows"]
+
+    def export(self, file_format: str = 'csv', output_path: Optional[str] = None) -> str:
+        """
+        Write the data in the given format.
+
+        :param file_format: One of 'csv', 'csv.gz', 'parquet' or 'arrow'
+        :param output_path: Destination file; a temporary file in the export directory is
+                            created when omitted (see remove and sweep_stale)
+        :return: Path of the written file
+        """
+        if file_format not in self.FORMATS:
+            raise ValueError(f"Unsupported file format. Choose one of: {', '.join(self.FORMATS)}")
+
+        if output_path is None:
+            export_dir = APP_CONFIG["export"]["dir"]
+            os.makedirs(export_dir, exist_ok=True)
+            handle, output_path = tempfile.mkstemp(prefix=self.PREFIX, suffix=self.FORMATS[file_format][0],
+                                                   dir=export_dir)
+            os.close(handle)
+
+        metrics = get_metrics()
+        with metrics.span('export', format=file_format):
+            if file_format == 'csv':
+                with open(output_path, 'w', newline='', encoding='utf-8') as sink:
+                    self._write_csv(sink)
+            elif file_format == 'csv.gz':
+                with gzip.open(output_path, 'wt', newline='', encoding='utf-8', compresslevel=6) as sink:
+                    self._write_csv(sink)
+            else:
+                self._write_arrow(output_path, file_format)
+        metrics.increment('export_rows', len(self.data), format=file_format)
+        return output_path
+
+    @staticmethod
+    def remove(paths: Iterable[str]):
+        """
+        Delete export files, ignoring ones that are already gone.
+        """
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @classmethod
+    def sweep_stale(cls, max_age_seconds: Optional[float] = None) -> int:
+        """
+        Delete temporary exports older than ``max_age_seconds``, e.g. left behind by
+        sessions that were abandoned instead of finished or reset.
+
+        :param max_age_seconds: Age limit; defaults to the configured export max_age_seconds
+        :return: Number of files deleted
+        """
+        export_dir = APP_CONFIG["export"]["dir"]
+        if max_age_seconds is None:
+            max_age_seconds = APP_CONFIG["export"]["max_age_seconds"]
+        if not os.path.isdir(export_dir):
+            return 0
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for entry in os.scandir(export_dir):
+            try:
+                if entry.name.startswith(cls.PREFIX) and entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                # Another session swept it first
+                pass
+        return removed
+
+    def _slices(self):
+        for start in range(0, len(self.data), self.chunk_rows):
+            yield self.data.iloc[start:start + self.chunk_rows]
+
+    def _write_csv(self, sink):
+        header = True
+        for data_slice in self._slices():
+            data_slice.to_csv(sink, header=header, index=False)
+            header = False
+        if header:
+            # Empty frame: still write the header row
+            self.data.to_csv(sink, index=False)
+
+    def _write_arrow(self, output_path: str, file_format: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema, writer = None, None
+        try:
+            for data_slice in self._slices():
+                if schema is None:
+                    schema = pa.Schema.from_pandas(data_slice, preserve_index=False)
+                    # All-null object columns in the first slice would otherwise pin the 'null' type
+                    schema = pa.schema([
+                        field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                        for field in schema
+                    ], metadata=schema.metadata)
+                    if file_format == 'parquet':
+                        writer = pq.ParquetWriter(output_path, schema)
+                    else:
+                        writer = pa.ipc.new_file(output_path, schema)
+                writer.write_table(pa.Table.from_pandas(data_slice, schema=schema, preserve_index=False))
+            if writer is None:
+                table = pa.Table.from_pandas(self.data, preserve_index=False)
+                if file_format == 'parquet':
+                    pq.write_table(table, output_path)
+                else:
+                    with pa.ipc.new_file(output_path, table.schema) as empty_writer:
+                        empty_writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
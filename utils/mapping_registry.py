@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from config.app_config import APP_CONFIG
+
+
+def normalize_column_name(column: str) -> str:
+    """
+    Normalize a column name so that cosmetic differences (case, spacing,
+    punctuation) do not change the schema fingerprint.
+    """
+    return re.sub(r'[^a-z0-9]+', '', str(column).lower())
+
+
+class SFNMappingRegistry:
+    """
+    Local registry of user-confirmed column mappings.
+
+    Mappings are keyed by a fingerprint of the normalized column set and category.
+    An exact fingerprint match can be reused as-is; a near match (same category,
+    high column overlap) returns the reusable part of the stored mapping together
+    with the delta columns that still need to be mapped.
+    """
+
+    def __init__(self, path: Optional[str] = None, similarity_threshold: Optional[float] = None,
+                 enabled: Optional[bool] = None):
+        config = APP_CONFIG["mapping_registry"]
+        self.path = path or config["path"]
+        self.similarity_threshold = similarity_threshold if similarity_threshold is not None \
+            else config["similarity_threshold"]
+        self.enabled = enabled if enabled is not None else config["enabled"]
+        self._lock = threading.Lock()
+        if self.enabled:
+            self._init_db()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS mapping_registry ("
+                "fingerprint TEXT PRIMARY KEY, "
+                "columns_fingerprint TEXT NOT NULL, "
+                "category TEXT NOT NULL, "
+                "columns TEXT NOT NULL, "
+                "mapping TEXT NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_mapping_registry_columns "
+                "ON mapping_registry (columns_fingerprint)"
+            )
+
+    @staticmethod
+    def fingerprint(columns: List[str], category: Optional[str] = None) -> str:
+        """
+        Fingerprint a schema from its normalized column set and (optionally) its category.
+
+        :param columns: List of column names in the dataset
+        :param category: Category of the data, or None to fingerprint the columns only
+        :return: Hex digest identifying the schema
+        """
+        normalized = sorted(set(normalize_column_name(col) for col in columns))
+        payload = json.dumps({'columns': normalized, 'category': category}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def save(self, columns: List[str], category: str, mapping: Dict[str, Optional[str]]):
+        """
+        Store a confirmed mapping for a schema, replacing any previous one.
+
+        :param columns: List of column names in the dataset
+        :param category: Confirmed category of the data
+        :param mapping: Confirmed mapping of standard columns to input columns
+        """
+        if not self.enabled:
+            return
+
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO mapping_registry "
+                "(fingerprint, columns_fingerprint, category, columns, mapping, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self.fingerprint(columns, category),
+                    self.fingerprint(columns),
+                    category,
+                    json.dumps(list(columns)),
+                    json.dumps(mapping),
+                    time.time()
+                )
+            )
+
+    def lookup(self, columns: List[str], category: Optional[str] = None) -> Optional[Dict]:
+        """
+        Find a stored mapping for a schema.
+
+        :param columns: List of column names in the dataset
+        :param category: Category to restrict the search to, or None to match on columns only
+        :return: None when nothing matches, otherwise a dictionary with keys
+                 'category', 'mapping' (expressed in the current column names),
+                 'exact', 'similarity' and 'delta_columns'
+        """
+        if not self.enabled:
+            return None
+
+        with self._connect() as conn:
+            if category is None:
+                row = conn.execute(
+                    "SELECT category, columns, mapping FROM mapping_registry "
+                    "WHERE columns_fingerprint = ? ORDER BY updated_at DESC LIMIT 1",
+                    (self.fingerprint(columns),)
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT category, columns, mapping FROM mapping_registry WHERE fingerprint = ?",
+                    (self.fingerprint(columns, category),)
+                ).fetchone()
+            if row is not None:
+                return self._build_match(columns, row, exact=True, similarity=1.0)
+
+            # Near match: the stored schema of the same category with the highest column overlap
+            if category is None:
+                return None
+            rows = conn.execute(
+                "SELECT category, columns, mapping FROM mapping_registry WHERE category = ?",
+                (category,)
+            ).fetchall()
+
+        current = set(normalize_column_name(col) for col in columns)
+        best_row, best_similarity = None, 0.0
+        for candidate in rows:
+            stored = set(normalize_column_name(col) for col in json.loads(candidate[1]))
+            union = current | stored
+            similarity = len(current & stored) / len(union) if union else 0.0
+            if similarity > best_similarity:
+                best_row, best_similarity = candidate, similarity
+
+        if best_row is None or best_similarity < self.similarity_threshold:
+            return None
+        return self._build_match(columns, best_row, exact=False, similarity=best_similarity)
+
+    @staticmethod
+    def _build_match(columns: List[str], row, exact: bool, similarity: float) -> Dict:
+        category, stored_columns, stored_mapping = row[0], json.loads(row[1]), json.loads(row[2])
+        current_by_norm = {normalize_column_name(col): col for col in columns}
+        stored_norms = set(normalize_column_name(col) for col in stored_columns)
+
+        # Re-express the stored mapping in the current column names, dropping columns that disappeared
+        mapping = {}
+        for std_col, input_col in stored_mapping.items():
+            if input_col is None:
+                mapping[std_col] = None
+            else:
+                mapping[std_col] = current_by_norm.get(normalize_column_name(input_col))
+
+        delta_columns = [col for col in columns if normalize_column_name(col) not in stored_norms]
+        return {
+            'category': category,
+            'mapping': mapping,
+            'exact': exact,
+            'similarity': similarity,
+            'delta_columns': delta_columns
+        }
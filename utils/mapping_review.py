@@ -0,0 +1,78 @@
+import math
+from typing import Dict, List, Optional
+import pandas as pd
+from config.app_config import APP_CONFIG
+
+
+class SFNMappingReview:
+    """
+    Set/dict-indexed model behind the wide-schema review table.
+
+    Filtering and paging work on the standard columns only, and duplicate checks use
+    a single pass over the mapping, so a Streamlit rerun does not scale with
+    (standard columns x input columns) the way one selectbox per column does.
+    """
+
+    def __init__(self, standard_columns: List[str], mandatory_columns: List[str], input_columns: List[str],
+                 page_size: Optional[int] = None):
+        self.standard_columns = standard_columns
+        self.mandatory_columns = set(mandatory_columns)
+        self.input_columns = set(input_columns)
+        self.page_size = page_size or APP_CONFIG["review"]["page_size"]
+
+    def filter(self, mappings: Dict[str, Optional[str]], query: str = "") -> List[str]:
+        """
+        Standard columns whose name or mapped input column contains the query (case-insensitive).
+        """
+        query = (query or "").strip().lower()
+        if not query:
+            return list(self.standard_columns)
+        return [
+            std_col for std_col in self.standard_columns
+            if query in std_col.lower() or query in str(mappings.get(std_col) or "").lower()
+        ]
+
+    def page_count(self, row_count: int) -> int:
+        return max(1, math.ceil(row_count / self.page_size))
+
+    def page_frame(self, mappings: Dict[str, Optional[str]], rows: List[str], page: int) -> pd.DataFrame:
+        """
+        Build the editable table for one page of standard columns.
+        """
+        start = (page - 1) * self.page_size
+        page_rows = rows[start:start + self.page_size]
+        return pd.DataFrame({
+            "Standard Column": page_rows,
+            "Mandatory": [std_col in self.mandatory_columns for std_col in page_rows],
+            "Input Column": [mappings.get(std_col) for std_col in page_rows]
+        })
+
+    def apply_edits(self, mappings: Dict[str, Optional[str]], edited: pd.DataFrame) -> List[str]:
+        """
+        Write the edited page back into the mappings.
+
+        :param mappings: Selected mappings (standard column -> input column), updated in place
+        :param edited: Table returned by the editor
+        :return: Input columns that are now mapped to more than one standard column
+        """
+        for std_col, input_col in zip(edited["Standard Column"], edited["Input Column"]):
+            if input_col is None or (isinstance(input_col, float) and math.isnan(input_col)):
+                input_col = None
+            if input_col is not None and input_col not in self.input_columns:
+                continue
+            mappings[std_col] = input_col
+        return self.duplicate_inputs(mappings)
+
+    @staticmethod
+    def duplicate_inputs(mappings: Dict[str, Optional[str]]) -> List[str]:
+        """
+        Input columns mapped to more than one standard column, in mapping order.
+        """
+        seen, duplicates = set(), []
+        for input_col in mappings.values():
+            if input_col is None:
+                continue
+            if input_col in seen and input_col not in duplicates:
+                duplicates.append(input_col)
+            seen.add(input_col)
+        return duplicates
@@ -0,0 +1,316 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+from config.app_config import APP_CONFIG
+from utils.shared_resources import get_shared
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+
+class SFNJsonLinesSink:
+    """
+    Appends every recorded span and counter update to a JSON-lines file.
+
+    Events are buffered in memory and written in batches by a background thread, so the
+    hot paths never touch the file. When the file would grow past ``max_bytes`` it is
+    rotated to ``<path>.1`` (older files shift up to ``<path>.<backup_count>``).
+    """
+
+    aggregated = False
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3,
+                 flush_interval_seconds: float = 1.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval_seconds = flush_interval_seconds
+        self._buffer: List[Dict] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        atexit.register(self.close)
+
+    def emit(self, event: Dict):
+        with self._lock:
+            self._buffer.append(event)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='metrics-jsonl', daemon=True)
+                self._thread.start()
+
+    def flush(self, registry: Optional['SFNMetricsRegistry'] = None):
+        """Write the buffered events now."""
+        with self._lock:
+            events, self._buffer = self._buffer, []
+        if not events:
+            return
+        lines = [json.dumps(event, default=str) + "\n" for event in events]
+        with self._write_lock:
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                size = 0
+            chunk, chunk_bytes = [], 0
+            for line in lines:
+                line_bytes = len(line.encode('utf-8'))
+                if self.max_bytes and size + chunk_bytes + line_bytes > self.max_bytes and size + chunk_bytes:
+                    self._append(chunk)
+                    self._rotate()
+                    size, chunk, chunk_bytes = 0, [], 0
+                chunk.append(line)
+                chunk_bytes += line_bytes
+            self._append(chunk)
+
+    def close(self):
+        self._wake.set()
+        self.flush()
+
+    def _run(self):
+        while not self._wake.wait(self.flush_interval_seconds):
+            self.flush()
+
+    def _append(self, lines: List[str]):
+        if lines:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+
+    def _rotate(self):
+        if not os.path.exists(self.path):
+            return
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+class SFNPrometheusSink:
+    """
+    Writes the aggregated metrics in Prometheus text format.
+
+    The file is rewritten atomically, so it can be scraped through a node_exporter textfile
+    collector or served as-is.
+    """
+
+    aggregated = True
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def emit(self, event: Dict):
+        pass
+
+    def flush(self, registry: 'SFNMetricsRegistry'):
+        spans, counters = registry.snapshot()
+        lines = []
+        for name in sorted({span_name for span_name, _ in spans}):
+            metric = f"sfn_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for (span_name, labels), stats in sorted(spans.items()):
+                if span_name == name:
+                    lines.append(f"{metric}_count{self._labels(labels)} {stats['count']}")
+                    lines.append(f"{metric}_sum{self._labels(labels)} {stats['total_seconds']:.6f}")
+        for name in sorted({counter_name for counter_name, _ in counters}):
+            metric = f"sfn_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    lines.append(f"{metric}{self._labels(labels)} {value:g}")
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _labels(labels: LabelKey) -> str:
+        if not labels:
+            return ""
+        escaped = [
+            f'{name}="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+            for name, value in labels
+        ]
+        return "{" + ",".join(escaped) + "}"
+
+
+class SFNMetricsRegistry:
+    """
+    Process-wide timing spans and counters for the hot paths.
+
+    Spans aggregate count, total and max duration per name and label set; counters add up
+    values such as tokens, cache hits or parse fallbacks. Every update is passed to the sinks
+    (e.g. a JSON-lines log), and aggregated sinks (e.g. Prometheus) are rewritten at most once
+    per ``flush_interval_seconds``. Recent events are kept for the in-app diagnostics panel.
+    """
+
+    def __init__(self, sinks: Optional[List] = None, enabled: Optional[bool] = None,
+                 config: Optional[Dict] = None):
+        self.config = config or APP_CONFIG["metrics"]
+        self.enabled = enabled if enabled is not None else self.config["enabled"]
+        self.sinks = sinks if sinks is not None else self._build_sinks()
+        self._spans: Dict[Tuple[str, LabelKey], Dict] = {}
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._recent: Deque[Dict] = deque(maxlen=self.config["recent_events"])
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def _build_sinks(self) -> List:
+        sinks = []
+        if "jsonl" in self.config["sinks"]:
+            sinks.append(SFNJsonLinesSink(self.config["jsonl_path"],
+                                          max_bytes=self.config["jsonl_max_bytes"],
+                                          backup_count=self.config["jsonl_backup_count"],
+                                          flush_interval_seconds=self.config["jsonl_flush_interval_seconds"]))
+        if "prometheus" in self.config["sinks"]:
+            sinks.append(SFNPrometheusSink(self.config["prometheus_path"]))
+        return sinks
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    @contextmanager
+    def span(self, name: str, **labels) -> Iterator[Dict]:
+        """
+        Time a block of code.
+
+        The yielded dictionary can be filled with labels known only inside the block
+        (e.g. the number of rows written); they are recorded with the span.
+
+        :param name: Span name, e.g. 'llm_call'
+        :param labels: Labels identifying the span, e.g. agent='column_mapper'
+        """
+        extra = {}
+        if not self.enabled:
+            yield extra
+            return
+        start = time.perf_counter()
+        try:
+            yield extra
+        except Exception:
+            self.increment(f"{name}_errors", **labels)
+            raise
+        finally:
+            self.record_span(name, time.perf_counter() - start, **{**labels, **extra})
+
+    def record_span(self, name: str, seconds: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            stats = self._spans.setdefault(key, {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            stats['count'] += 1
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+        self._emit({'type': 'span', 'name': name, 'labels': labels, 'duration_ms': seconds * 1000})
+
+    def increment(self, name: str, value: float = 1, **labels):
+        if not self.enabled or not value:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self._emit({'type': 'counter', 'name': name, 'labels': labels, 'value': value})
+
+    def snapshot(self) -> Tuple[Dict, Dict]:
+        with self._lock:
+            return {key: dict(stats) for key, stats in self._spans.items()}, dict(self._counters)
+
+    def summary(self) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Tabular view of the aggregates, slowest spans first.
+
+        :return: Tuple of (span rows, counter rows)
+        """
+        spans, counters = self.snapshot()
+        span_rows = [
+            {
+                'Span': name,
+                'Labels': ', '.join(f"{label}={value}" for label, value in labels),
+                'Count': stats['count'],
+                'Total (ms)': round(stats['total_seconds'] * 1000, 1),
+                'Mean (ms)': round(stats['total_seconds'] * 1000 / stats['count'], 1),
+                'Max (ms)': round(stats['max_seconds'] * 1000, 1)
+            }
+            for (name, labels), stats in spans.items()
+        ]
+        span_rows.sort(key=lambda row: row['Total (ms)'], reverse=True)
+        counter_rows = [
+            {'Counter': name, 'Labels': ', '.join(f"{label}={value}" for label, value in labels), 'Value': value}
+            for (name, labels), value in sorted(counters.items())
+        ]
+        return span_rows, counter_rows
+
+    def recent_events(self) -> List[Dict]:
+        with self._lock:
+            return list(self._recent)
+
+    def flush(self, aggregated_only: bool = False):
+        """
+        Write the sinks now.
+
+        :param aggregated_only: Write only aggregated sinks; event sinks such as the JSON-lines
+            log are left to their own background thread
+        """
+        with self._flush_lock:
+            self._last_flush = time.monotonic()
+            for sink in self.sinks:
+                if not aggregated_only or getattr(sink, 'aggregated', True):
+                    sink.flush(self)
+
+    def _emit(self, event: Dict):
+        event['ts'] = time.time()
+        with self._lock:
+            self._recent.append(event)
+        for sink in self.sinks:
+            sink.emit(event)
+        if time.monotonic() - self._last_flush >= self.config["flush_interval_seconds"]:
+            self.flush(aggregated_only=True)
+
+
+def record_usage(usage, **labels):
+    """
+    Add the token counts of an LLM response to the process-wide counters.
+
+    :param usage: The response's ``usage`` object, or that of the last chunk of a stream (may be None)
+    :param labels: Labels such as agent, provider and model
+    """
+    if usage is None:
+        return
+    metrics = get_metrics()
+    metrics.increment('llm_prompt_tokens', getattr(usage, 'prompt_tokens', 0) or 0, **labels)
+    metrics.increment('llm_completion_tokens', getattr(usage, 'completion_tokens', 0) or 0, **labels)
+
+
+def record_mapping_stats(stats: Dict[str, int], **labels):
+    """
+    Add the result of ``get_mapping_stats`` to the process-wide counters.
+
+    :param stats: Mapping statistics, e.g. {'mapped_mandatory_columns': 4, ...}
+    :param labels: Labels such as category and mapping source
+    """
+    metrics = get_metrics()
+    metrics.increment('mappings', **labels)
+    for stat, value in stats.items():
+        metrics.increment('mapping_columns', value, stat=stat, **labels)
+
+
+def get_metrics() -> SFNMetricsRegistry:
+    """
+    Return the process-wide metrics registry.
+    """
+    return get_shared('metrics', SFNMetricsRegistry)
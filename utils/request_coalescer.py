@@ -0,0 +1,45 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Tuple
+
+
+class SFNRequestCoalescer:
+    """
+    Single-flight de-duplication of concurrent work.
+
+    The first caller for a key starts the work and every caller that arrives while it is
+    still running receives the same future, so a burst of identical requests costs one
+    execution. The key is forgotten as soon as the work finishes; later callers start anew
+    (and typically hit the LLM response cache or the mapping registry instead).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+
+    def submit(self, key: Hashable, start: Callable[[], Future]) -> Tuple[Future, bool]:
+        """
+        Join the in-flight work for a key, or start it.
+
+        :param key: Identity of the work, e.g. a schema fingerprint
+        :param start: Callable that starts the work and returns its future; it may raise
+                      (e.g. when a worker pool rejects the work), in which case nothing is recorded
+        :return: Tuple of (future, leader), where leader is True for the caller that started the work
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future, False
+            future = start()
+            self._in_flight[key] = future
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future, True
+
+    def _forget(self, key: Hashable, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
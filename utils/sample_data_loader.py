@@ -0,0 +1,121 @@
+from typing import Optional
+import pandas as pd
+from sfn_blueprint import SFNAgent, SFNDataLoader
+from config.app_config import APP_CONFIG
+
+
+def file_extension(name: str) -> str:
+    """
+    Lower-case extension of a file name without the dot ('REPORT.CSV' -> 'csv').
+
+    :param name: File name or path
+    :return: Extension, or an empty string when the name has none
+    """
+    base = name.replace('\\', '/').rsplit('/', 1)[-1]
+    return base.rsplit('.', 1)[-1].lower() if '.' in base else ''
+
+
+def read_json(file_obj, nrows: Optional[int] = None) -> pd.DataFrame:
+    """
+    Read a JSON document or a JSON Lines file, optionally only its first rows.
+
+    :param file_obj: Binary or text file object positioned at the start
+    :param nrows: Number of rows to read; all rows when omitted
+    :return: DataFrame
+    """
+    head = file_obj.read(64)
+    file_obj.seek(0)
+    if isinstance(head, bytes):
+        head = head.decode('utf-8', errors='ignore')
+    # Only JSON lines can be read partially; other JSON layouts need a full parse
+    if not head.lstrip().startswith('['):
+        try:
+            data = pd.read_json(file_obj, lines=True, nrows=nrows)
+            # A single object holding nested values is a column-oriented document, not JSON lines
+            if not (len(data) == 1 and any(isinstance(v, (dict, list)) for v in data.iloc[0])):
+                return data
+        except ValueError:
+            pass
+        file_obj.seek(0)
+    data = pd.read_json(file_obj)
+    return data if nrows is None else data.head(nrows)
+
+
+class SFNSampleDataLoader(SFNAgent):
+    """
+    Fast load path that reads only the header and a bounded row sample.
+
+    Category identification and column mapping only need column names and the
+    preview only needs a few rows, so this avoids parsing the full file up front.
+    The columns match what SFNFullDataLoader produces for the same file, so the full
+    dataset can be loaded later (e.g. in Step 4) and the confirmed mapping applies.
+    """
+
+    def __init__(self, sample_rows: int = None):
+        super().__init__(name="Sample Data Loader", role="Data Loading Specialist")
+        self.sample_rows = sample_rows or APP_CONFIG["lazy_loading"]["sample_rows"]
+
+    def execute_task(self, task) -> pd.DataFrame:
+        """
+        Load the header and the first rows of a file.
+
+        :param task: Task object whose data is a file object with a ``name`` attribute
+        :return: DataFrame with at most ``sample_rows`` rows
+        """
+        file_obj = task.data
+        try:
+            return self._read_sample(file_obj)
+        finally:
+            # Leave the file ready for a full read later on
+            if hasattr(file_obj, 'seek'):
+                file_obj.seek(0)
+
+    def _read_sample(self, file_obj) -> pd.DataFrame:
+        extension = file_extension(file_obj.name)
+        if extension == 'csv':
+            return pd.read_csv(file_obj, index_col=0, nrows=self.sample_rows, low_memory=False)
+        elif extension == 'xlsx':
+            return pd.read_excel(file_obj, index_col=0, nrows=self.sample_rows)
+        elif extension == 'json':
+            return read_json(file_obj, nrows=self.sample_rows)
+        elif extension == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(file_obj)
+            batch = next(parquet_file.iter_batches(batch_size=self.sample_rows), None)
+            if batch is None:
+                return parquet_file.schema_arrow.empty_table().to_pandas()
+            # The file schema carries the pandas metadata, so a stored index column is restored like
+            # pd.read_parquet; a RangeIndex is only described there and has to be rebuilt for the sample
+            sample = pa.Table.from_batches([batch], schema=parquet_file.schema_arrow).to_pandas()
+            metadata = parquet_file.schema_arrow.pandas_metadata or {}
+            index_columns = metadata.get('index_columns', [])
+            if len(index_columns) == 1 and isinstance(index_columns[0], dict) and index_columns[0].get('kind') == 'range':
+                index = index_columns[0]
+                sample.index = pd.RangeIndex(index['start'], index['start'] + len(sample) * index['step'],
+                                             index['step'], name=index.get('name'))
+            return sample
+        else:
+            raise ValueError("Unsupported file format. Please provide a CSV, Excel, JSON, Parquet file.")
+
+
+class SFNFullDataLoader(SFNDataLoader):
+    """
+    SFNDataLoader that recognizes files the way SFNSampleDataLoader does (extensions in
+    any case, JSON Lines included), so a file whose sample loaded in Steps 1-3 also loads
+    in full in Step 4.
+    """
+
+    def execute_task(self, task) -> pd.DataFrame:
+        file_obj = task.data
+        extension = file_extension(file_obj.name)
+        if extension == 'csv':
+            return pd.read_csv(file_obj, index_col=0, low_memory=False)
+        elif extension == 'xlsx':
+            return pd.read_excel(file_obj, index_col=0)
+        elif extension == 'json':
+            return read_json(file_obj)
+        elif extension == 'parquet':
+            return pd.read_parquet(file_obj)
+        else:
+            raise ValueError("Unsupported file format. Please provide a CSV, Excel, JSON, Parquet file.")
@@ -0,0 +1,216 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional
+import numpy as np
+from config.app_config import APP_CONFIG
+from utils.mapping_registry import normalize_column_name
+from utils.shared_resources import get_shared, load_json_config
+
+
+def column_ngrams(column: str, size: int) -> List[str]:
+    """
+    Character n-grams of a normalized column name, padded so prefixes and suffixes count.
+
+    The n-grams of the name's consonant skeleton are added too (marked with '~'), so
+    vowel-dropping abbreviations such as 'tmprtr_vndr' still meet 'TemperatureVendor'.
+    """
+    normalized = normalize_column_name(column)
+    grams = []
+    for marker, text in (('^', normalized), ('~', re.sub(r'[aeiou]', '', normalized))):
+        padded = f"{marker}{text}$"
+        if len(padded) <= size:
+            grams.append(padded)
+        else:
+            grams.extend(padded[start:start + size] for start in range(len(padded) - size + 1))
+    return grams
+
+
+class SFNSchemaSnapshot:
+    """
+    Compiled, immutable view of every target schema at one version.
+
+    Holds the merged standard columns per category and a similarity index: each standard
+    column and its synonyms are embedded as hashed character n-gram count vectors
+    (L2-normalized float32 rows of one NumPy matrix), so scoring input columns against
+    any subset of standard columns is a single matrix product. The version is a digest
+    of the compiled content; equal content always gives the same version.
+    """
+
+    def __init__(self, standard_columns: Dict[str, Dict], synonyms: Dict[str, List[str]],
+                 ngram_size: int, dimensions: int):
+        self.standard_columns = standard_columns
+        self.categories = list(standard_columns)
+        self.ngram_size = ngram_size
+        self.dimensions = dimensions
+        payload = json.dumps({'standard_columns': standard_columns, 'synonyms': synonyms,
+                              'index': [ngram_size, dimensions]}, sort_keys=True)
+        self.version = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]
+
+        # One row per spelling; rows of the same standard column are contiguous
+        columns, owners, spellings = [], [], []
+        self._column_position: Dict[str, int] = {}
+        for category_columns in standard_columns.values():
+            for std_col in category_columns['mandatory'] + category_columns['optional']:
+                if std_col in self._column_position:
+                    continue
+                self._column_position[std_col] = len(columns)
+                names = list(dict.fromkeys([std_col] + list(synonyms.get(std_col, []))))
+                owners.extend([len(columns)] * len(names))
+                spellings.extend(names)
+                columns.append(std_col)
+        self._columns = columns
+        self._owners = np.asarray(owners, dtype=np.int64)
+        self._vectors = self.vectorize(spellings)
+        # category -> positions of its standard columns, for ranking categories
+        self._category_columns = {
+            category: np.asarray([self._column_position[col] for col in columns['mandatory'] + columns['optional']],
+                                 dtype=np.int64)
+            for category, columns in standard_columns.items()
+        }
+
+    def vectorize(self, names: List[str]) -> np.ndarray:
+        """
+        Embed column names as L2-normalized hashed n-gram count vectors.
+
+        :param names: Column names
+        :return: float32 matrix with one row per name
+        """
+        rows, cols = [], []
+        for row, name in enumerate(names):
+            for gram in column_ngrams(name, self.ngram_size):
+                rows.append(row)
+                # crc32 is stable across processes, unlike hash()
+                cols.append(zlib.crc32(gram.encode('utf-8')) % self.dimensions)
+        vectors = np.zeros((len(names), self.dimensions), dtype=np.float32)
+        np.add.at(vectors, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)), 1.0)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=vectors, where=norms > 0)
+
+    def _column_similarity(self, input_columns: List[str], standard_columns: List[str]) -> np.ndarray:
+        # Best cosine similarity of each input column to any spelling of each standard column
+        positions = np.asarray([self._column_position[col] for col in standard_columns], dtype=np.int64)
+        rows = np.flatnonzero(np.isin(self._owners, positions))
+        similarity = self.vectorize(input_columns) @ self._vectors[rows].T
+        owners = self._owners[rows]
+        starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+        best = np.maximum.reduceat(similarity, starts, axis=1)
+        # reduceat yields owners in index order; put them back in the order asked for
+        order = np.searchsorted(owners[starts], positions)
+        return best[:, order]
+
+    def top_candidates(self, input_columns: List[str], standard_columns: List[str], top_k: int,
+                       min_similarity: float = 0.0) -> List[str]:
+        """
+        Select the standard columns that are among the top-k most similar for any input column.
+
+        :param input_columns: Input column names
+        :param standard_columns: Standard columns to choose from (must belong to this snapshot)
+        :param top_k: Candidates kept per input column
+        :param min_similarity: When an input column is less similar than this to every standard
+                               column (an opaque name like 'c17'), nothing is ruled out
+        :return: The selected standard columns, in the order given
+        """
+        if not input_columns or len(standard_columns) <= top_k:
+            return list(standard_columns)
+        similarity = self._column_similarity(input_columns, standard_columns)
+        if (similarity.max(axis=1) < min_similarity).any():
+            # Its name says nothing, so any standard column may be the one it maps to
+            return list(standard_columns)
+        top = np.argpartition(-similarity, top_k - 1, axis=1)[:, :top_k]
+        selected = np.zeros(len(standard_columns), dtype=bool)
+        selected[top.ravel()] = True
+        return [col for col, keep in zip(standard_columns, selected) if keep]
+
+    def rank_categories(self, input_columns: List[str], limit: int) -> List[str]:
+        """
+        Shortlist the categories whose standard columns best cover the input columns.
+
+        :param input_columns: Input column names
+        :param limit: Number of categories to return
+        :return: All categories in registry order when there are at most ``limit``,
+                 otherwise the ``limit`` best ones, best first
+        """
+        if len(self.categories) <= limit:
+            return list(self.categories)
+        if not input_columns:
+            return self.categories[:limit]
+        similarity = self.vectorize(input_columns) @ self._vectors.T
+        owners = self._owners
+        starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+        best = np.maximum.reduceat(similarity, starts, axis=1)
+        # A category scores the mean over input columns of the best match among its columns
+        scores = np.asarray([best[:, positions].max(axis=1).mean()
+                             for positions in self._category_columns.values()])
+        order = np.argsort(-scores, kind='stable')[:limit]
+        return [self.categories[index] for index in order]
+
+    def describe(self, category: str) -> Optional[str]:
+        return self.standard_columns.get(category, {}).get('description')
+
+
+class SFNSchemaRegistry:
+    """
+    Versioned registry of target schemas (categories and their standard columns).
+
+    Schemas come from ``standard_columns_config.json`` plus every ``*.json`` file in
+    ``schemas_dir``, each in the same ``{category: {"mandatory": [...], "optional": [...],
+    "description": "..."}}`` layout, so new categories are added by dropping in a file.
+    The sources are compiled once into an SFNSchemaSnapshot and recompiled only when a
+    source file is added, removed or modified.
+    """
+
+    def __init__(self, standard_columns_path: Optional[str] = None, schemas_dir: Optional[str] = None):
+        self.config = APP_CONFIG["schema_registry"]
+        self.standard_columns_path = standard_columns_path or self.config["standard_columns_path"]
+        self.schemas_dir = schemas_dir or self.config["schemas_dir"]
+        self._lock = threading.Lock()
+        self._signature = None
+        self._snapshot: Optional[SFNSchemaSnapshot] = None
+
+    def _sources(self) -> List[str]:
+        paths = [self.standard_columns_path]
+        if os.path.isdir(self.schemas_dir):
+            paths.extend(sorted(glob.glob(os.path.join(self.schemas_dir, '*.json'))))
+        return paths
+
+    def load(self) -> SFNSchemaSnapshot:
+        """
+        Return the compiled snapshot of the current schemas.
+
+        :return: SFNSchemaSnapshot, shared until a source file changes
+        :raises ValueError: When a category is defined twice or lacks its column lists
+        """
+        synonyms_path = APP_CONFIG["pre_matcher"]["synonyms_path"]
+        paths = self._sources() + [synonyms_path]
+        signature = tuple((path, os.path.getmtime(path)) for path in paths)
+        if signature == self._signature:
+            return self._snapshot
+        with self._lock:
+            if signature != self._signature:
+                self._snapshot = self._compile(paths[:-1], load_json_config(synonyms_path))
+                self._signature = signature
+            return self._snapshot
+
+    def _compile(self, paths: List[str], synonyms: Dict[str, List[str]]) -> SFNSchemaSnapshot:
+        standard_columns, origins = {}, {}
+        for path in paths:
+            for category, columns in load_json_config(path).items():
+                if category in standard_columns:
+                    raise ValueError(f"Category '{category}' is defined in both {origins[category]} and {path}")
+                if not isinstance(columns.get('mandatory'), list) or not isinstance(columns.get('optional'), list):
+                    raise ValueError(f"Category '{category}' in {path} needs 'mandatory' and 'optional' lists")
+                standard_columns[category] = columns
+                origins[category] = path
+        return SFNSchemaSnapshot(standard_columns, synonyms, self.config["ngram_size"], self.config["ngram_dimensions"])
+
+
+def get_schema_registry() -> SFNSchemaRegistry:
+    """
+    Return the process-wide schema registry.
+    """
+    return get_shared('schema_registry', SFNSchemaRegistry)
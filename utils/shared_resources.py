@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+# Process-wide caches shared by every Streamlit session, batch worker and service thread
+_lock = threading.RLock()
+_openai_client = None
+_file_cache: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+_instances: Dict[str, Any] = {}
+
+
+def get_shared(name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Return the process-wide instance registered under a name, creating it on first use.
+
+    :param name: Registry key
+    :param factory: Callable that builds the instance
+    :return: The shared instance
+    """
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = _instances[name] = factory()
+    return instance
+
+
+def get_openai_client():
+    """
+    Return the process-wide OpenAI client.
+
+    Every agent shares this client and therefore its HTTP connection pool, so keep-alive
+    connections to the model endpoint are reused across agents, sessions and reruns.
+    Raises the same error as SFNOpenAIClient when no API key is configured.
+    """
+    global _openai_client
+    with _lock:
+        if _openai_client is None:
+            from dotenv import load_dotenv
+            from openai import OpenAI
+            load_dotenv()
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("API key not found. Please set the OPENAI_API_KEY environment variable.")
+            _openai_client = OpenAI(api_key=api_key)
+        return _openai_client
+
+
+def load_cached(path: str, loader: Callable[[str], Any], kind: str = 'default') -> Any:
+    """
+    Load a file once per process and reload it only when its modification time changes.
+
+    :param path: File to load
+    :param loader: Callable that builds the object from the path
+    :param kind: Namespace so different loaders of the same file are cached separately
+    :return: The cached object
+    """
+    mtime = os.path.getmtime(path)
+    key = (kind, os.path.abspath(path))
+    cached = _file_cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with _lock:
+        cached = _file_cache.get(key)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, loader(path))
+            _file_cache[key] = cached
+        return cached[1]
+
+
+def load_json_config(path: str) -> Dict:
+    """
+    Load a JSON config file, cached per process and reloaded when it changes on disk.
+    """
+    def _load(config_path: str) -> Dict:
+        with open(config_path, 'r') as f:
+            return json.load(f)
+    return load_cached(path, _load, kind='json')
+
+
+def get_prompt_manager(path: str):
+    """
+    Return a prompt manager for the config file, cached per process and rebuilt when it changes.
+    """
+    from sfn_blueprint import SFNPromptManager
+    return load_cached(path, SFNPromptManager, kind='prompt_manager')
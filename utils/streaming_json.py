@@ -0,0 +1,118 @@
+import json
+from typing import List, Optional, Tuple
+
+
+class SFNIncrementalMappingParser:
+    """
+    Incremental parser for a streamed JSON mapping object.
+
+    Text is fed as it arrives and every ``"key": "value"`` (or ``"key": null``) pair is
+    returned as soon as its value closes, so a truncated stream still yields every pair
+    that was completed. Anything before the opening brace (e.g. a markdown code fence)
+    is ignored; nested objects, arrays and non-null literals are skipped.
+    """
+
+    def __init__(self):
+        self.state = 'seek_object'
+        self.started = False
+        self.complete = False
+        self._key = None
+        self._token = []
+        self._escaped = False
+        self._nesting = 0
+        self._nested_in_string = False
+
+    def feed(self, text: str) -> List[Tuple[str, Optional[str]]]:
+        """
+        Consume the next piece of the response.
+
+        :param text: Next chunk of streamed text
+        :return: Pairs completed within this chunk, in order
+        """
+        pairs = []
+        for char in text:
+            if self.complete:
+                break
+            pair = self._consume(char)
+            if pair is not None:
+                pairs.append(pair)
+        return pairs
+
+    def _consume(self, char: str) -> Optional[Tuple[str, Optional[str]]]:
+        state = self.state
+        if state == 'seek_object':
+            if char == '{':
+                self.started = True
+                self.state = 'seek_key'
+        elif state == 'seek_key':
+            if char == '"':
+                self.state = 'in_key'
+            elif char == '}':
+                self.complete = True
+        elif state in ('in_key', 'in_string_value'):
+            if self._escaped:
+                self._escaped = False
+            elif char == '\\':
+                self._escaped = True
+            elif char == '"':
+                return self._close_string()
+            self._token.append(char)
+        elif state == 'seek_colon':
+            if char == ':':
+                self.state = 'seek_value'
+        elif state == 'seek_value':
+            if char == '"':
+                self.state = 'in_string_value'
+            elif char in '{[':
+                self.state = 'in_nested'
+                self._nesting = 1
+            elif not char.isspace():
+                self.state = 'in_literal'
+                self._token.append(char)
+        elif state == 'in_literal':
+            if char in ',}' or char.isspace():
+                return self._close_literal(char)
+            self._token.append(char)
+        elif state == 'in_nested':
+            self._skip_nested(char)
+        return None
+
+    def _close_string(self) -> Optional[Tuple[str, Optional[str]]]:
+        try:
+            value = json.loads('"' + ''.join(self._token) + '"')
+        except json.JSONDecodeError:
+            value = None
+        self._token = []
+        if self.state == 'in_key':
+            self._key = value
+            self.state = 'seek_colon'
+            return None
+        self.state = 'seek_key'
+        return (self._key, value) if self._key is not None else None
+
+    def _close_literal(self, char: str) -> Optional[Tuple[str, Optional[str]]]:
+        literal = ''.join(self._token)
+        self._token = []
+        self.state = 'seek_key'
+        if char == '}':
+            self.complete = True
+        if literal == 'null' and self._key is not None:
+            return self._key, None
+        return None
+
+    def _skip_nested(self, char: str):
+        if self._nested_in_string:
+            if self._escaped:
+                self._escaped = False
+            elif char == '\\':
+                self._escaped = True
+            elif char == '"':
+                self._nested_in_string = False
+        elif char == '"':
+            self._nested_in_string = True
+        elif char in '{[':
+            self._nesting += 1
+        elif char in '}]':
+            self._nesting -= 1
+            if self._nesting == 0:
+                self.state = 'seek_key'
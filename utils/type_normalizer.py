@@ -0,0 +1,247 @@
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from config.app_config import APP_CONFIG
+from utils.metrics import get_metrics
+from utils.shared_resources import load_json_config
+
+TRUE_VALUES = ['true', 't', 'yes', 'y', '1', '1.0']
+FALSE_VALUES = ['false', 'f', 'no', 'n', '0', '0.0']
+# Arrow-backed strings run the regex and strip kernels in Arrow compute instead of Python
+TEXT_DTYPE = 'string[pyarrow]'
+# Currency codes and symbols, whitespace and accounting parentheses
+NUMBER_NOISE = r'^[A-Za-z]{3}|[A-Za-z]{3}$|[\s$€£¥₹()]'
+# Comma thousands separators are only stripped from consistently grouped numbers such as 1,234,567.50
+GROUPED_NUMBER = r'[+-]?\d{1,3}(?:,\d{3})+(?:\.\d*)?'
+# Integer IDs without leading zeros that fit in an int64
+INTEGER_ID = r'0|[1-9]\d{0,17}'
+
+
+class SFNTypeNormalizer:
+    """
+    Coerces mapped standard columns to their declared types after the rename.
+
+    Target types come from ``column_types_config.json``: 'datetime', 'decimal' (float64),
+    'integer' (smallest integer type that fits), 'id' (integer when every value is a plain
+    number, otherwise categorical or string), 'categorical' (casing variants folded into the
+    most frequent spelling), 'boolean' and 'string'. Row-wise work is done with vectorized
+    pandas operations on slices of ``chunk_rows``; decisions that need the whole column
+    (integer width, categories, the date format) are taken once per column. Values that are
+    present but cannot be converted become missing and are counted as coercion failures; so
+    are ambiguous numbers such as ``1.234,50`` and, unless ``percent_as_fraction`` is set,
+    percentages.
+    """
+
+    TARGETS = ('datetime', 'decimal', 'integer', 'id', 'categorical', 'boolean', 'string')
+
+    def __init__(self, column_types: Optional[Dict[str, str]] = None, chunk_rows: Optional[int] = None,
+                 datetime_formats: Optional[List[str]] = None, max_category_ratio: Optional[float] = None,
+                 datetime_sample_rows: Optional[int] = None, percent_as_fraction: Optional[bool] = None):
+        config = APP_CONFIG["normalization"]
+        if column_types is None:
+            column_types = load_json_config(config["types_path"])
+        unknown = {target for target in column_types.values() if target not in self.TARGETS}
+        if unknown:
+            raise ValueError(f"Unknown target types: {', '.join(sorted(unknown))}")
+        self.column_types = column_types
+        self.chunk_rows = chunk_rows or config["chunk_rows"]
+        self.datetime_formats = datetime_formats or config["datetime_formats"]
+        self.max_category_ratio = max_category_ratio if max_category_ratio is not None else config["max_category_ratio"]
+        self.datetime_sample_rows = datetime_sample_rows or config["datetime_sample_rows"]
+        self.percent_as_fraction = (percent_as_fraction if percent_as_fraction is not None
+                                    else config["percent_as_fraction"])
+
+    def normalize(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Dict]]:
+        """
+        Coerce every standard column of a mapped DataFrame to its target type.
+
+        Columns without a declared type are passed through untouched and share their data with ``df``.
+
+        :param df: DataFrame whose columns carry the standard column names
+        :return: Tuple of (typed DataFrame, per-column report with the target, resulting dtype,
+                 number of present values, failures and failure rate)
+        """
+        result = df.copy(deep=False)
+        report = []
+        metrics = get_metrics()
+        with metrics.span('normalize'):
+            for position, column in enumerate(df.columns):
+                target = self.column_types.get(column)
+                if target is None:
+                    continue
+                series = df.iloc[:, position]
+                coerced = self.coerce(series, target)
+                present = self._present(series)
+                values = int(present.sum())
+                failures = int((present & coerced.isna().to_numpy()).sum())
+                result.isetitem(position, coerced.array)
+                report.append({
+                    'column': column,
+                    'target': target,
+                    'dtype': str(coerced.dtype),
+                    'values': values,
+                    'failures': failures,
+                    'failure_rate': round(failures / values, 4) if values else 0.0
+                })
+                metrics.increment('normalization_values', values, column=column, target=target)
+                metrics.increment('normalization_failures', failures, column=column, target=target)
+        return result, report
+
+    def coerce(self, series: pd.Series, target: str) -> pd.Series:
+        """
+        Coerce one column to a target type.
+
+        :param series: Column to convert
+        :param target: One of TARGETS
+        :return: Converted column with the same index
+        """
+        if target == 'categorical':
+            return self._categorize(self._chunked(series, self._text))
+        if target == 'id':
+            return self._to_id(series)
+        if target == 'integer':
+            return self._downcast_integer(self._chunked(series, self._to_integral))
+        if target == 'datetime':
+            return self._chunked(series, partial(self._to_datetime, date_format=self._datetime_format(series)))
+        return self._chunked(series, getattr(self, f"_to_{target}"))
+
+    def _chunked(self, series: pd.Series, convert: Callable[[pd.Series], pd.Series]) -> pd.Series:
+        if len(series) <= self.chunk_rows:
+            return convert(series)
+        return pd.concat([
+            convert(series.iloc[start:start + self.chunk_rows])
+            for start in range(0, len(series), self.chunk_rows)
+        ])
+
+    @staticmethod
+    def _present(series: pd.Series) -> np.ndarray:
+        # Blank strings count as missing, not as failed conversions
+        present = series.notna().to_numpy()
+        if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+            present = present & series.astype(TEXT_DTYPE).str.strip().ne('').fillna(False).to_numpy(dtype=bool)
+        return present
+
+    @staticmethod
+    def _text(chunk: pd.Series) -> pd.Series:
+        text = chunk.astype(TEXT_DTYPE).str.strip()
+        return text.mask(text.eq('').fillna(False))
+
+    def _to_string(self, chunk: pd.Series) -> pd.Series:
+        return self._text(chunk)
+
+    def _datetime_format(self, series: pd.Series) -> Optional[str]:
+        """
+        Pick the one format used for the whole column: the one that parses most of a sample.
+
+        Day-first and month-first dates are indistinguishable value by value, so a column is
+        never parsed with a mix of formats; ties go to the format listed first.
+        """
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            return None
+        present = series.dropna()
+        step = max(len(present) // self.datetime_sample_rows, 1)
+        sample = self._text(present.iloc[::step].iloc[:self.datetime_sample_rows]).dropna()
+        best_format, best_hits = None, 0
+        for date_format in self.datetime_formats:
+            hits = int(pd.to_datetime(sample, format=date_format, errors='coerce', utc=True).notna().sum())
+            if hits > best_hits:
+                best_format, best_hits = date_format, hits
+                if hits == len(sample):
+                    break
+        return best_format
+
+    def _to_datetime(self, chunk: pd.Series, date_format: Optional[str] = None) -> pd.Series:
+        if pd.api.types.is_datetime64_any_dtype(chunk.dtype):
+            return chunk.dt.tz_convert(None) if chunk.dt.tz is not None else chunk
+        if date_format is None:
+            # No format parses any sampled value
+            return pd.Series(pd.NaT, index=chunk.index, name=chunk.name, dtype='datetime64[ns]')
+        # Keep the resolution pandas parsed into; forcing nanoseconds would overflow for far-off dates
+        parsed = pd.to_datetime(self._text(chunk), format=date_format, errors='coerce', utc=True)
+        return parsed.dt.tz_convert(None).rename(chunk.name)
+
+    def _to_decimal(self, chunk: pd.Series) -> pd.Series:
+        if pd.api.types.is_numeric_dtype(chunk.dtype) and not pd.api.types.is_bool_dtype(chunk.dtype):
+            return chunk.astype('float64')
+        text = self._text(chunk)
+        negative = text.str.match(r'^\(.*\)$').fillna(False).to_numpy(dtype=bool)
+        text = text.str.replace(NUMBER_NOISE, '', regex=True)
+        percent = text.str.endswith('%').fillna(False).to_numpy(dtype=bool)
+        if percent.any():
+            text = text.str.replace(r'%$', '', regex=True)
+        grouped = text.str.contains(',', regex=False).fillna(False)
+        if grouped.any():
+            # A comma anywhere else (decimal comma, uneven groups) makes the value ambiguous
+            consistent = text.str.fullmatch(GROUPED_NUMBER).fillna(False)
+            text = text.str.replace(',', '', regex=False).mask(grouped & ~consistent)
+        values = self._to_float(text)
+        values[negative] = -values[negative]
+        if self.percent_as_fraction:
+            values[percent] /= 100
+        else:
+            values[percent] = np.nan
+        return pd.Series(values, index=chunk.index, name=chunk.name)
+
+    @staticmethod
+    def _to_float(text: pd.Series) -> np.ndarray:
+        try:
+            # A clean slice converts in one cast; only slices with bad values need element-wise coercion
+            return text.astype('float64').to_numpy(copy=True)
+        except ValueError:
+            numbers = pd.to_numeric(text, errors='coerce')
+            return numbers.astype('Float64').to_numpy(dtype='float64', na_value=np.nan)
+
+    def _to_integral(self, chunk: pd.Series) -> pd.Series:
+        values = self._to_decimal(chunk)
+        # Fractional values are not valid counts
+        return values.where(values.isna() | (values == np.floor(values)))
+
+    def _to_boolean(self, chunk: pd.Series) -> pd.Series:
+        if pd.api.types.is_bool_dtype(chunk.dtype):
+            return chunk.astype('boolean')
+        text = self._text(chunk).str.casefold()
+        values = pd.Series(pd.NA, index=chunk.index, name=chunk.name, dtype='boolean')
+        values[text.isin(TRUE_VALUES).fillna(False).to_numpy(dtype=bool)] = True
+        values[text.isin(FALSE_VALUES).fillna(False).to_numpy(dtype=bool)] = False
+        return values
+
+    def _to_id(self, series: pd.Series) -> pd.Series:
+        if pd.api.types.is_integer_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            return self._downcast_integer(series)
+        if pd.api.types.is_float_dtype(series.dtype):
+            integral = self._chunked(series, self._to_integral)
+            if integral.isna().sum() == series.isna().sum():
+                return self._downcast_integer(integral)
+        text = self._chunked(series, self._text)
+        is_integer = text.str.fullmatch(INTEGER_ID)
+        if text.notna().any() and is_integer.fillna(True).all():
+            return self._downcast_integer(text.astype('Int64'))
+        return self._categorize(text, fold_case=False)
+
+    def _downcast_integer(self, values: pd.Series) -> pd.Series:
+        finite = values.dropna()
+        if finite.empty:
+            return values.astype('Int8')
+        low, high = finite.min(), finite.max()
+        for dtype in (np.int8, np.int16, np.int32, np.int64):
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                # Nullable integers keep missing values without falling back to float
+                return values.astype(dtype if len(finite) == len(values) else dtype.__name__.capitalize())
+        return values
+
+    def _categorize(self, text: pd.Series, fold_case: bool = True) -> pd.Series:
+        counts = text.value_counts()
+        if fold_case and len(counts):
+            # value_counts is sorted by frequency, so the first spelling of each case-folded value wins
+            spellings = pd.Series(counts.index, index=counts.index)
+            canonical = spellings.groupby(counts.index.str.casefold(), sort=False).transform('first')
+            text = text.map(dict(zip(counts.index, canonical)))
+            distinct = canonical.nunique()
+        else:
+            distinct = len(counts)
+        if distinct > self.max_category_ratio * max(int(counts.sum()), 1):
+            # Mostly distinct values: a category would be larger than the strings
+            return text
+        return text.astype('category')
@@ -1,5 +1,6 @@
 from sfn_blueprint.views.streamlit_view import SFNStreamlitView
-from typing import List, Optional
+from typing import Any, List, Optional
+import pandas as pd
 import streamlit as st
 
 class StreamlitView(SFNStreamlitView):
@@ -7,4 +8,39 @@ class StreamlitView(SFNStreamlitView):
     def select_box(self, label: str, options: List[str], key: Optional[str] = None) -> str:
         return st.selectbox(label, options, key=key)
 
-    
\ No newline at end of file
+    def text_input(self, label: str, value: str = "", key: Optional[str] = None) -> str:
+        return st.text_input(label, value=value, key=key)
+
+    def checkbox(self, label: str, value: bool = False, key: Optional[str] = None) -> bool:
+        return st.checkbox(label, value=value, key=key)
+
+    def number_input(self, label: str, min_value: int, max_value: int, value: int, key: Optional[str] = None) -> int:
+        return st.number_input(label, min_value=min_value, max_value=max_value, value=value, step=1, key=key)
+
+    def mapping_editor(self, data: pd.DataFrame, input_options: List[Any], key: Optional[str] = None) -> pd.DataFrame:
+        """Editable mapping table: one row per standard column, the input column picked from a dropdown."""
+        return st.data_editor(
+            data,
+            column_config={
+                "Input Column": st.column_config.SelectboxColumn("Input Column", options=input_options, required=False)
+            },
+            disabled=["Standard Column", "Mandatory"],
+            hide_index=True,
+            use_container_width=True,
+            key=key
+        )
+
+    def update_table(self, element: Any, data: Any):
+        """Replace the content of a placeholder with a read-only table."""
+        element.dataframe(data, hide_index=True, use_container_width=True)
+
+    def metrics_panel(self, span_rows: List[dict], counter_rows: List[dict]):
+        """Sidebar diagnostics: where time and tokens went in this process."""
+        with st.sidebar.expander("Diagnostics", expanded=False):
+            if not span_rows and not counter_rows:
+                st.caption("No metrics recorded yet.")
+                return
+            st.markdown("**Timings**")
+            st.dataframe(span_rows, hide_index=True, use_container_width=True)
+            st.markdown("**Counters**")
+            st.dataframe(counter_rows, hide_index=True, use_container_width=True)